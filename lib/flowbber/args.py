@@ -19,6 +19,7 @@
 Argument management module.
 """
 
+import sys
 from pathlib import Path
 
 from . import __version__
@@ -41,6 +42,32 @@ def validate_args(args):
     setup_logging(args.verbose)
     log.debug('Raw arguments:\n{}'.format(args))
 
+    # Collect the pipeline definition files of the daemon
+    if args.command == 'daemon':
+        pipelines = []
+
+        for path in map(Path, args.pipelines):
+            if path.is_dir():
+                pipelines.extend(sorted(
+                    definition for definition in path.iterdir()
+                    if definition.suffix in ('.toml', '.json') and
+                    definition.is_file()
+                ))
+                continue
+
+            if not path.is_file():
+                log.error('No such file or directory {}'.format(path))
+                exit(1)
+
+            pipelines.append(path)
+
+        if not pipelines:
+            log.error('No pipeline definition files found')
+            exit(1)
+
+        args.pipelines = [pipeline.resolve() for pipeline in pipelines]
+        return args
+
     # Check if pipeline file exists
     args.pipeline = Path(args.pipeline)
 
@@ -50,13 +77,198 @@ def validate_args(args):
 
     args.pipeline = args.pipeline.resolve()
 
+    # Check the time window of the journal command
+    if args.command == 'journal':
+        from pytimeparse import parse
+
+        for option in ('since', 'until'):
+            value = getattr(args, option)
+            if value is None:
+                continue
+
+            seconds = parse(value)
+            if seconds is None:
+                log.error('Invalid --{} time {}'.format(option, value))
+                exit(1)
+
+            setattr(args, option, seconds)
+
     return args
 
 
+def add_verbose(parser, default=0):
+    """
+    Add the verbosity flag to a parser.
+
+    :param parser: The parser to add the flag to.
+    :type parser: :py:class:`argparse.ArgumentParser`
+    :param default: Default verbosity level.
+    """
+    parser.add_argument(
+        '-v', '--verbose',
+        help='Increase verbosity level',
+        default=default,
+        action='count'
+    )
+
+
+def add_run_parser(subparsers):
+    """
+    Add the parser of the run command, the default command.
+
+    :param subparsers: The subparsers to add the parser to.
+    """
+    from argparse import SUPPRESS
+
+    parser = subparsers.add_parser(
+        'run',
+        help='Run a pipeline (default)',
+        description='Run a pipeline, once or on its schedule.',
+    )
+    parser.set_defaults(command='run')
+    add_verbose(parser, default=SUPPRESS)
+
+    parser.add_argument(
+        '-d', '--dry-run',
+        help='Dry run the pipeline',
+        default=False,
+        action='store_true'
+    )
+    parser.add_argument(
+        '-p', '--profile',
+        help='Profile the executions of the components with cProfile',
+        dest='profile',
+        default=None,
+        action='store_const',
+        const='deterministic',
+    )
+    parser.add_argument(
+        '--profile-sampling',
+        help='Profile the executions of the components sampling their stacks',
+        dest='profile',
+        action='store_const',
+        const='sampling',
+    )
+    parser.add_argument(
+        'pipeline',
+        help='Pipeline definition file'
+    )
+
+
+def add_journal_parser(subparsers):
+    """
+    Add the parser of the journal command.
+
+    :param subparsers: The subparsers to add the parser to.
+    """
+    from argparse import SUPPRESS
+
+    parser = subparsers.add_parser(
+        'journal',
+        help='Report statistics of the saved journals of a pipeline',
+        description=(
+            'Report statistics of the executions of the components of a '
+            'pipeline from its saved journals.'
+        ),
+    )
+    parser.set_defaults(command='journal')
+    add_verbose(parser, default=SUPPRESS)
+
+    parser.add_argument(
+        '-s', '--since',
+        help='Report the executions since this long ago, like 1h or 7d',
+        default='1d',
+    )
+    parser.add_argument(
+        '-u', '--until',
+        help='Report the executions until this long ago, like 1h or 7d',
+        default=None,
+    )
+    parser.add_argument(
+        '-a', '--all-pipelines',
+        help='Report the executions of all the pipelines sharing the journal',
+        default=False,
+        action='store_true'
+    )
+    parser.add_argument(
+        '-j', '--json',
+        help='Output the report in JSON',
+        default=False,
+        action='store_true'
+    )
+    parser.add_argument(
+        'pipeline',
+        help='Pipeline definition file'
+    )
+
+
+def add_daemon_parser(subparsers):
+    """
+    Add the parser of the daemon command.
+
+    :param subparsers: The subparsers to add the parser to.
+    """
+    from argparse import SUPPRESS
+
+    parser = subparsers.add_parser(
+        'daemon',
+        help='Run the schedules of many pipelines in a single process',
+        description=(
+            'Run the schedules of many pipelines in a single process, '
+            'sharing one pool of worker processes.'
+        ),
+    )
+    parser.set_defaults(command='daemon')
+    add_verbose(parser, default=SUPPRESS)
+
+    parser.add_argument(
+        '-d', '--dry-run',
+        help='Load the pipelines without running them',
+        default=False,
+        action='store_true'
+    )
+    parser.add_argument(
+        '-w', '--workers',
+        help='Maximum number of workers shared by all the pipelines',
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        '--pool-max-runs',
+        help='Number of executions after which a worker is recycled',
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        '--pool-max-rss',
+        help='Resident memory, in megabytes, above which a worker is recycled',
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        'pipelines',
+        help=(
+            'Pipeline definition files, or directories with pipeline '
+            'definition files'
+        ),
+        nargs='+',
+    )
+
+
+COMMANDS = ('run', 'journal', 'daemon')
+"""
+Commands of the command line application.
+"""
+
+
 def parse_args(argv=None):
     """
     Argument parsing routine.
 
+    Running a pipeline is the default command, so ``flowbber pipeline.toml``
+    is the same as ``flowbber run pipeline.toml``. A pipeline definition file
+    named like a command must be run with the explicit ``run`` command.
+
     :param argv: A list of argument strings.
     :type argv: list
 
@@ -65,34 +277,37 @@ def parse_args(argv=None):
     """
     from argparse import ArgumentParser
 
+    if argv is None:
+        argv = sys.argv[1:]
+
+    argv = list(argv)
+    first = next((arg for arg in argv if not arg.startswith('-')), None)
+    if first is not None and first not in COMMANDS:
+        argv.insert(0, 'run')
+
     parser = ArgumentParser(
         description=(
             'Flowbber is a generic tool and framework that allows to execute '
             'custom pipelines for data gathering, publishing and analysis.'
         )
     )
-    parser.add_argument(
-        '-v', '--verbose',
-        help='Increase verbosity level',
-        default=0,
-        action='count'
-    )
+    add_verbose(parser)
     parser.add_argument(
         '--version',
         action='version',
         version='Flowbber v{}'.format(__version__)
     )
 
-    parser.add_argument(
-        '-d', '--dry-run',
-        help='Dry run the pipeline',
-        default=False,
-        action='store_true'
-    )
-    parser.add_argument(
-        'pipeline',
-        help='Pipeline definition file'
+    subparsers = parser.add_subparsers(
+        title='commands',
+        dest='command',
+        metavar='{run,journal,daemon}',
     )
+    subparsers.required = True
+
+    add_run_parser(subparsers)
+    add_journal_parser(subparsers)
+    add_daemon_parser(subparsers)
 
     args = parser.parse_args(argv)
     args = validate_args(args)
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2018 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+On-disk cache for the results of sources.
+
+Many sources are pure functions of some files on disk, for example a source
+that parses a coverage report. Those sources can declare their input files
+(see :meth:`flowbber.components.Source.inputs`) and their results are then
+cached using a key made of the type of the source, its configuration and a
+fingerprint of its input files.
+
+The fingerprint of a file is either its path, size and modification time, or
+a hash of its contents.
+"""
+
+from time import time
+from json import dumps
+from hashlib import sha256
+from pathlib import Path
+from tempfile import mkstemp
+from os import walk, replace, unlink, utime
+from pickle import dump, load, HIGHEST_PROTOCOL
+
+from .logging import get_logger
+
+
+log = get_logger(__name__)
+
+
+def hash_file(path, blocksize=65536):
+    """
+    Compute the hash of the contents of a file.
+
+    :param Path path: Path to the file.
+    :param int blocksize: Size of the blocks to read.
+
+    :return: The hexadecimal SHA-256 digest of the file.
+    :rtype: str
+    """
+    digest = sha256()
+    with path.open('rb') as fd:
+        for block in iter(lambda: fd.read(blocksize), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Cache of results of sources stored in a directory.
+
+    :param str directory: Directory to store the cache entries in.
+    :param int max_size: Maximum size of the cache, in megabytes. The least
+     recently used entries are evicted when the cache grows above this size.
+     ``None`` means no limit.
+    :param int max_age: Time in seconds after which an entry that wasn't used
+     is evicted. ``None`` means no limit.
+    :param bool content_hash: Fingerprint the input files by hashing their
+     contents instead of using their size and modification time.
+    """
+
+    def __init__(
+            self, directory,
+            max_size=None, max_age=None, content_hash=False):
+        self._directory = Path(directory)
+        self._max_size = max_size
+        self._max_age = max_age
+        self._content_hash = content_hash
+
+        self._directory.mkdir(parents=True, exist_ok=True)
+
+    def fingerprint(self, inputs):
+        """
+        Fingerprint a collection of input files.
+
+        Directories are walked recursively.
+
+        :param list inputs: Paths to the input files or directories.
+
+        :return: A list of tuples with the path of each file and either its
+         size and modification time or the hash of its contents.
+        :rtype: list
+        """
+        files = []
+
+        for path in map(Path, inputs):
+            if path.is_dir():
+                for root, dirs, filenames in walk(str(path)):
+                    dirs.sort()
+                    files.extend(
+                        Path(root) / filename for filename in sorted(filenames)
+                    )
+                continue
+
+            files.append(path)
+
+        fingerprint = []
+
+        for path in files:
+            if not path.is_file():
+                fingerprint.append((str(path), None))
+                continue
+
+            if self._content_hash:
+                fingerprint.append((str(path), hash_file(path)))
+                continue
+
+            stat = path.stat()
+            fingerprint.append((str(path), stat.st_size, stat.st_mtime_ns))
+
+        return fingerprint
+
+    def key(self, source):
+        """
+        Compute the cache key of a source.
+
+        :param source: The source to compute the key of.
+        :type source: :class:`flowbber.components.Source`
+
+        :return: The key, or ``None`` if the source doesn't declare its input
+         files and thus cannot be cached.
+        :rtype: str
+        """
+        inputs = source.inputs()
+        if inputs is None:
+            return None
+
+        config = {
+            key: option.value
+            for key, option in source.config._asdict().items()
+        }
+
+        material = dumps([
+            source._type_,
+            config,
+            self.fingerprint(inputs),
+        ], sort_keys=True, default=str)
+
+        return sha256(material.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return self._directory / '{}.cache'.format(key)
+
+    def get(self, key):
+        """
+        Get a result from the cache.
+
+        :param str key: The key of the entry.
+
+        :return: The cached result, or ``None`` if not found.
+        :rtype: dict
+        """
+        path = self._path(key)
+
+        try:
+            with path.open('rb') as fd:
+                data = load(fd)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            log.exception('Corrupted cache entry {}'.format(path))
+            self._remove(path)
+            return None
+
+        # Mark the entry as recently used
+        utime(str(path))
+        return data
+
+    def put(self, key, data):
+        """
+        Store a result in the cache and evict old entries.
+
+        :param str key: The key of the entry.
+        :param dict data: The result to store.
+        """
+        fd, tmp = mkstemp(
+            prefix='.', suffix='.tmp', dir=str(self._directory)
+        )
+
+        # Write atomically
+        try:
+            with open(fd, 'wb') as tmpfd:
+                dump(data, tmpfd, protocol=HIGHEST_PROTOCOL)
+            replace(tmp, str(self._path(key)))
+        except Exception:
+            self._remove(Path(tmp))
+            raise
+
+        self.evict()
+
+    def _remove(self, path):
+        try:
+            unlink(str(path))
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        """
+        Evict the entries older than the maximum age and the least recently
+        used entries until the cache size is below the maximum.
+        """
+        if self._max_size is None and self._max_age is None:
+            return
+
+        entries = []
+        for path in self._directory.glob('*.cache'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        # Most recently used first
+        entries.sort(reverse=True)
+
+        now = time()
+        size = 0
+        max_size = None
+        if self._max_size is not None:
+            max_size = self._max_size * 1024 * 1024
+
+        for mtime, entry_size, path in entries:
+            if self._max_age is not None and now - mtime > self._max_age:
+                log.debug('Evicting expired cache entry {}'.format(path))
+                self._remove(path)
+                continue
+
+            size += entry_size
+            if max_size is not None and size > max_size:
+                log.debug('Evicting cache entry {} by size'.format(path))
+                self._remove(path)
+
+
+__all__ = ['ResultCache']
@@ -21,11 +21,21 @@ Module implementating the Aggregator base class.
 All custom Flowbber aggregators must extend from the Aggregator class.
 """
 
+from time import time
+from copy import deepcopy
 from abc import abstractmethod
+from contextlib import contextmanager
+from signal import signal, setitimer, SIGALRM, ITIMER_REAL
 
+from setproctitle import setproctitle
+
+from ..logging import get_logger
 from .base import Component
 
 
+log = get_logger(__name__)
+
+
 class Aggregator(Component):
     """
     Main base class to implement an Aggregator.
@@ -33,11 +43,16 @@ class Aggregator(Component):
 
     def __init__(
         self, index, type_, id_,
-        optional=False, timeout=None, config=None
+        optional=False, timeout=None, executor='process', config=None,
+        reads=None, writes=None, cpu_affinity=None, nice=None,
+        max_rss=None, max_cpu_seconds=None, shed_first=False
     ):
         super().__init__(
             index, type_, id_,
-            optional=optional, timeout=timeout, config=config
+            optional=optional, timeout=timeout, executor=executor,
+            config=config, reads=reads, writes=writes,
+            cpu_affinity=cpu_affinity, nice=nice, max_rss=max_rss,
+            max_cpu_seconds=max_cpu_seconds, shed_first=shed_first
         )
 
     def _component_execute(self, data):
@@ -83,4 +98,142 @@ class Aggregator(Component):
         pass
 
 
-__all__ = ['Aggregator']
+class AlarmError(Exception):
+    """
+    Exception raised in a fused aggregator when its timeout expired.
+    """
+    pass
+
+
+@contextmanager
+def alarm(timeout):
+    """
+    Raise an :class:`AlarmError` in the current process if the block takes
+    longer than the given timeout.
+
+    This context manager must be used from the main thread of the process.
+
+    :param float timeout: Timeout in seconds. ``None`` means no timeout.
+    """
+    if timeout is None:
+        yield
+        return
+
+    def handler(signum, frame):
+        raise AlarmError()
+
+    previous = signal(SIGALRM, handler)
+    setitimer(ITIMER_REAL, timeout)
+    try:
+        yield
+    finally:
+        setitimer(ITIMER_REAL, 0)
+        signal(SIGALRM, previous)
+
+
+class AggregatorChain(Component):
+    """
+    Execute a chain of aggregators sequentially in a single process.
+
+    The collected data is handed to the process once and passed in memory
+    from one ``accumulate()`` call to the next, instead of being serialized
+    back and forth for each aggregator.
+
+    The timeout of each aggregator is enforced in the process that executes
+    the chain. The data is snapshot before executing an optional aggregator so
+    that if it fails the chain continues with the data as it was before it.
+    The chain stops at the first non optional aggregator that fails.
+
+    The chain returns the final data along with a report of the execution of
+    each aggregator.
+
+    :param list aggregators: The aggregators to execute, in order.
+    """
+
+    def __init__(self, aggregators):
+        # The timeouts are enforced by the chain itself. The timeout of the
+        # chain is only a safety net in case the process hangs.
+        timeouts = [aggregator.timeout for aggregator in aggregators]
+        timeout = None
+        if None not in timeouts:
+            timeout = sum(timeouts) + len(timeouts)
+
+        # The chain is not part of the pipeline definition, so it has no
+        # index
+        super().__init__(
+            None, 'chain', 'aggregators',
+            timeout=timeout,
+        )
+
+        self._aggregators = aggregators
+
+    @property
+    def aggregators(self):
+        """
+        Aggregators executed by this chain.
+        """
+        return self._aggregators
+
+    def _component_execute(self, data):
+        """
+        Aggregator chain execute override.
+
+        Execute all the aggregators of the chain in order.
+        """
+        report = []
+
+        for aggregator in self._aggregators:
+            setproctitle(str(aggregator))
+
+            snapshot = None
+            if aggregator.optional:
+                snapshot = deepcopy(data)
+
+            start = time()
+            usage = self._usage()
+            status = 'succeeded'
+
+            try:
+                with alarm(aggregator.timeout):
+                    aggregator.accumulate(data)
+
+            except AlarmError:
+                status = 'timed out'
+
+            except Exception:
+                log.exception('Component {} crashed'.format(aggregator))
+                status = 'crashed'
+
+            entry = {
+                'index': aggregator.index,
+                'status': status,
+                'duration': time() - start,
+                'started': start,
+            }
+            entry.update(self._accounting(usage, self._usage()))
+
+            # The peak memory of the process includes the previous
+            # aggregators
+            entry.pop('max_rss', None)
+            report.append(entry)
+
+            if status == 'succeeded':
+                continue
+
+            if not aggregator.optional:
+                break
+
+            data = snapshot
+
+        return {
+            'data': data,
+            'report': report,
+        }
+
+    def __str__(self):
+        return '{} ({} aggregators)'.format(
+            self.__class__.__name__, len(self._aggregators)
+        )
+
+
+__all__ = ['Aggregator', 'AggregatorChain']
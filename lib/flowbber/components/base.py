@@ -21,20 +21,33 @@ Base class for all Flowbber components.
 All Flowbber components extend from the Component class.
 """
 
+import os
 from time import time
-from queue import Empty
+from copy import deepcopy
+from signal import signal, SIGXCPU, SIGKILL
+from resource import (
+    setrlimit, getrusage, RLIMIT_AS, RLIMIT_CPU, RUSAGE_SELF
+)
 from abc import ABCMeta, abstractmethod
-from multiprocessing import Queue, Process
+from queue import Empty, Queue as ThreadQueue
 
 from setproctitle import setproctitle
 
 from ..config import Configurator
 from ..logging import get_logger
+from .executors import EXECUTORS
+from .transport import Transport, ResultPipe
 
 
 log = get_logger(__name__)
 
 
+try:
+    from resource import RUSAGE_THREAD
+except ImportError:
+    RUSAGE_THREAD = None
+
+
 class ComponentError(Exception):
     """
     Generic exception raised when a component fails.
@@ -59,26 +72,64 @@ class CrashError(ComponentError):
     pass
 
 
+class CPULimitError(Exception):
+    """
+    Raised in the process executing a component when it exceeded its CPU
+    time limit.
+    """
+    pass
+
+
 class ExecutionInfo:
     """
     Component execution information object.
 
     :var status: Word used to describe the status of the execution.
-     For example: ``succeeded``, ``crashed``, ``killed``, ``hanged`` or
-     ``timed out``.
+     For example: ``succeeded``, ``crashed``, ``killed``, ``hanged``,
+     ``timed out``, ``oom-limited``, ``cpu-limited`` or ``cached``.
     :var duration: Duration time in seconds of the execution of the process.
     :var pid: Pid of the executing process.
     :var exitcode: Exit code of the executing process.
-     Can be None if status is ``hanged``.
+     Can be None if status is ``hanged`` or if the component was executed by
+     a persistent worker of a pool.
     :var data: Data returned by the executing process, if any.
+    :var payload: Size in bytes of the serialized data, if serialized.
+    :var serialization: Time in seconds spent serializing the data in the
+     executing process, if serialized.
+    :var deserialization: Time in seconds spent deserializing the data, if
+     serialized.
+    :var spawn: Time in seconds since the component was started until its
+     execution began, including the time to fork the process or to acquire a
+     worker.
+    :var cpu_user: User CPU time in seconds spent in the execution.
+    :var cpu_system: System CPU time in seconds spent in the execution.
+    :var max_rss: Peak resident memory in megabytes of the executing process.
+     Only available for components executed in a process of their own.
+    :var join_wait: Time in seconds the result waited to be joined by the
+     pipeline since the execution ended.
+    :var started: Timestamp in seconds since the epoch of the beginning of
+     the execution.
     """
 
-    def __init__(self, status, duration, pid, exitcode, data):
+    def __init__(
+            self, status, duration, pid, exitcode, data,
+            payload=None, serialization=None, deserialization=None,
+            spawn=None, cpu_user=None, cpu_system=None, max_rss=None,
+            join_wait=None, started=None):
         self.status = status
         self.duration = duration
         self.pid = pid
         self.exitcode = exitcode
         self.data = data
+        self.payload = payload
+        self.serialization = serialization
+        self.deserialization = deserialization
+        self.spawn = spawn
+        self.cpu_user = cpu_user
+        self.cpu_system = cpu_system
+        self.max_rss = max_rss
+        self.join_wait = join_wait
+        self.started = started
 
     def __str__(self):
         return (
@@ -116,9 +167,29 @@ class Component(metaclass=NamedABCMeta):
     :var str id: Unique identifier for this component.
     :var bool optional: Successful execution of this component is optional.
      That is, it is allowed to fail and the pipeline won't fail.
+    :var bool shed_first: This optional component is the first to be left
+     out of the runs of the pipeline when they fall behind their schedule.
     :var int timeout: Execution timeout for this component, in seconds.
      None means no timeout, wait forever.
+    :var str executor: How this component is executed. Either ``process``,
+     ``thread`` or ``inline``.
+    :var tuple reads: Keys of the data this component reads, or None if not
+     declared.
+    :var tuple writes: Keys of the data this component writes, or None if not
+     declared.
+    :var tuple cpu_affinity: CPUs the process executing this component is
+     pinned to, or None.
+    :var int nice: Niceness increment of the process executing this
+     component, or None.
+    :var int max_rss: Memory limit, in megabytes, of the process executing
+     this component, or None.
+    :var int max_cpu_seconds: CPU time limit, in seconds, of the process
+     executing this component, or None.
     :var namedtuple Component.config: Frozen configuration after validation.
+    :var tuple preload: Names of the modules this component imports when
+     executed. Class attribute that components can override so the pipeline
+     imports those modules once, before forking the processes that execute
+     the components.
 
     **Parameters**:
 
@@ -126,25 +197,71 @@ class Component(metaclass=NamedABCMeta):
     :param str type_: Type key used to fetch this component.
     :param str id_: Value to set the id property.
     :param bool optional: Value to set the optional property.
+    :param bool shed_first: Value to set the shed_first property.
     :param int timeout: Value to set the timeout property.
+    :param str executor: Value to set the executor property.
     :param dict config: User configuration for this component.
+    :param list reads: Value to set the reads property.
+    :param list writes: Value to set the writes property.
+    :param list cpu_affinity: Value to set the cpu_affinity property.
+    :param int nice: Value to set the nice property.
+    :param int max_rss: Value to set the max_rss property.
+    :param int max_cpu_seconds: Value to set the max_cpu_seconds property.
     """
 
+    preload = ()
+
     @abstractmethod
     def __init__(
         self, index, type_, id_,
-        optional=False, timeout=None, config=None
+        optional=False, timeout=None, executor='process', config=None,
+        reads=None, writes=None, cpu_affinity=None, nice=None,
+        max_rss=None, max_cpu_seconds=None, shed_first=False
     ):
+        if executor not in EXECUTORS:
+            raise ValueError('Unknown executor "{}"'.format(executor))
+
+        limits = (cpu_affinity, nice, max_rss, max_cpu_seconds)
+        if executor != 'process' and any(
+            limit is not None for limit in limits
+        ):
+            raise ValueError(
+                'CPU affinity, niceness and resource limits can only be '
+                'applied to components executed in a process'
+            )
+
+        if cpu_affinity is not None and not hasattr(os, 'sched_setaffinity'):
+            raise ValueError('CPU affinity is not supported in this platform')
+
+        if shed_first and not optional:
+            raise ValueError('Only optional components can be shed first')
+
         self._index = index
         self._type_ = type_
         self._id = id_
         self._optional = optional
+        self._shed_first = shed_first
         self._timeout = timeout
+        self._executor = executor
+        self._reads = None if reads is None else tuple(reads)
+        self._writes = None if writes is None else tuple(writes)
+        self._cpu_affinity = (
+            None if cpu_affinity is None else tuple(cpu_affinity)
+        )
+        self._nice = nice
+        self._max_rss = max_rss
+        self._max_cpu_seconds = max_cpu_seconds
 
         self._result = None
         self._start = None
         self._process = None
 
+        self._pool = None
+        self._pool_key = None
+
+        self._transport = Transport()
+        self._profiler = None
+
         configurator = Configurator()
         self.declare_config(configurator)
 
@@ -171,6 +288,14 @@ class Component(metaclass=NamedABCMeta):
         """
         return self._optional
 
+    @property
+    def shed_first(self):
+        """
+        Component is left out first when the pipeline falls behind its
+        schedule.
+        """
+        return self._shed_first
+
     @property
     def timeout(self):
         """
@@ -178,6 +303,110 @@ class Component(metaclass=NamedABCMeta):
         """
         return self._timeout
 
+    @property
+    def executor(self):
+        """
+        Executor for this component.
+        """
+        return self._executor
+
+    @property
+    def reads(self):
+        """
+        Keys of the data read by this component, if declared.
+        """
+        return self._reads
+
+    @property
+    def writes(self):
+        """
+        Keys of the data written by this component, if declared.
+        """
+        return self._writes
+
+    @property
+    def declared(self):
+        """
+        This component declared the keys of the data it reads or writes.
+        """
+        return self._reads is not None or self._writes is not None
+
+    @property
+    def cpu_affinity(self):
+        """
+        CPUs the process executing this component is pinned to.
+        """
+        return self._cpu_affinity
+
+    @property
+    def nice(self):
+        """
+        Niceness increment of the process executing this component.
+        """
+        return self._nice
+
+    @property
+    def max_rss(self):
+        """
+        Memory limit, in megabytes, of the process executing this component.
+        """
+        return self._max_rss
+
+    @property
+    def max_cpu_seconds(self):
+        """
+        CPU time limit, in seconds, of the process executing this component.
+        """
+        return self._max_cpu_seconds
+
+    @property
+    def limited(self):
+        """
+        This component declared a CPU affinity, a niceness or resource limits
+        for the process executing it.
+
+        Limited components are always executed in their own process, as the
+        limits cannot be lifted once applied.
+        """
+        return (
+            self._cpu_affinity is not None or
+            self._nice is not None or
+            self._max_rss is not None or
+            self._max_cpu_seconds is not None
+        )
+
+    def attach(self, pool):
+        """
+        Attach this component to a pool of persistent worker processes.
+
+        Once attached, executions of this component are dispatched to the
+        workers of the pool instead of forking a new process each time.
+
+        :param pool: The pool to attach this component to.
+        :type pool: :class:`flowbber.components.pool.WorkerPool`
+        """
+        self._pool = pool
+        self._pool_key = pool.register(self)
+
+    def attach_transport(self, transport):
+        """
+        Set the transport used to send the results of this component back to
+        the pipeline.
+
+        :param transport: The transport to use.
+        :type transport: :class:`flowbber.components.transport.Transport`
+        """
+        self._transport = transport
+
+    def attach_profiler(self, profiler):
+        """
+        Set the profiler used to profile the executions of this component.
+
+        :param profiler: The profiler to use.
+        :type profiler: :class:`flowbber.components.profiler.Profiler`
+        """
+        self._profiler = profiler
+
     def declare_config(self, config):
         """
         Declare the configuration options of this component.
@@ -198,28 +427,138 @@ class Component(metaclass=NamedABCMeta):
         """
         pass
 
+    def _apply_limits(self):
+        """
+        Apply the CPU affinity, niceness and resource limits of this
+        component to the current process.
+
+        The memory limit is enforced on the address space of the process, as
+        the resident set size limit is not enforced by Linux. The CPU time
+        limit sends ``SIGXCPU`` when exceeded, which is turned into a
+        :class:`CPULimitError`, and ``SIGKILL`` one second later.
+        """
+        if self._cpu_affinity is not None:
+            os.sched_setaffinity(0, self._cpu_affinity)
+
+        if self._nice is not None:
+            os.nice(self._nice)
+
+        if self._max_rss is not None:
+            limit = self._max_rss * 1024 * 1024
+            setrlimit(RLIMIT_AS, (limit, limit))
+
+        if self._max_cpu_seconds is not None:
+            signal(SIGXCPU, self._cpu_exceeded)
+            setrlimit(RLIMIT_CPU, (
+                self._max_cpu_seconds, self._max_cpu_seconds + 1
+            ))
+
+    def _cpu_exceeded(self, signum, frame):
+        """
+        Handler of the ``SIGXCPU`` signal.
+        """
+        raise CPULimitError()
+
+    def _usage(self):
+        """
+        Get the resource usage of the context executing this component.
+
+        :return: The resource usage of the process, or of the thread if
+         executed in a thread, or None if it can't be measured.
+        :rtype: :py:class:`resource.struct_rusage`
+        """
+        if self._executor == 'thread':
+            if RUSAGE_THREAD is None:
+                return None
+            return getrusage(RUSAGE_THREAD)
+        return getrusage(RUSAGE_SELF)
+
+    def _accounting(self, before, after):
+        """
+        Compute the resources used by an execution of this component.
+
+        :param before: Resource usage before the execution.
+        :param after: Resource usage after the execution.
+
+        :return: A dictionary to merge in the result message, with the
+         ``cpu_user`` and ``cpu_system`` times in seconds and the ``max_rss``
+         in megabytes.
+        :rtype: dict
+        """
+        if before is None or after is None:
+            return {}
+
+        accounting = {
+            'cpu_user': after.ru_utime - before.ru_utime,
+            'cpu_system': after.ru_stime - before.ru_stime,
+        }
+
+        # Threads and inline executions share the memory of the pipeline, and
+        # the peak memory of a worker of a pool includes its previous
+        # executions
+        if self._executor == 'process' and self._pool is None:
+            accounting['max_rss'] = after.ru_maxrss / 1024
+
+        return accounting
+
     def _process_execute(self, *args):
         """
         Execute this component.
 
-        This method MUST be run in a subprocess.
+        This method MUST be run in a subprocess, or by one of the executors
+        in :mod:`flowbber.components.executors`.
         """
-        setproctitle(str(self))
+        if self._executor == 'process':
+            setproctitle(str(self))
 
-        assert self._result.empty()
+        # Keep a reference to the queue, as an abandoned thread may finish
+        # after the component was reset for another execution
+        result = self._result
+        assert result.empty()
 
         # We reset the start time so that the measurement is more accurate
         # and will not account for the time the process took to start
-        self.start = time()
+        start = time()
+        usage = self._usage()
         data = None
+        status = None
 
         try:
-            data = self._component_execute(*args)
+            if self.limited:
+                self._apply_limits()
+
+            if self._profiler is not None:
+                data = self._profiler.run(
+                    self, self._component_execute, *args
+                )
+            else:
+                data = self._component_execute(*args)
+
+        except MemoryError:
+            if self._max_rss is None:
+                raise
+            log.error('{} exceeded its memory limit'.format(self))
+            status = 'oom-limited'
+
+        except CPULimitError:
+            log.error('{} exceeded its CPU time limit'.format(self))
+            status = 'cpu-limited'
 
         finally:
-            self._result.put(
-                (time() - self.start, data)
-            )
+            message = {
+                'duration': time() - start,
+                'data': data,
+                'status': status,
+                'started': start,
+            }
+            message.update(self._accounting(usage, self._usage()))
+
+            # Serialize the data once, large payloads are not sent through
+            # the queue
+            if self._executor == 'process':
+                message.update(self._transport.pack(data))
+
+            result.put(message)
 
     def _reset(self, procargs):
         """
@@ -227,9 +566,23 @@ class Component(metaclass=NamedABCMeta):
 
         :param tuple procargs: Process execution arguments.
         """
-        self._result = Queue(maxsize=1)
         self._start = time()
-        self._process = Process(
+
+        if self._pool is not None:
+            self._process = self._pool.acquire(self._pool_key, procargs)
+            self._result = self._process.result
+            return
+
+        if self._executor == 'process':
+            self._result = ResultPipe()
+
+        # Non-process executors share the memory of the pipeline, copy the
+        # arguments so the component can't alter the pipeline data
+        else:
+            self._result = ThreadQueue(maxsize=1)
+            procargs = deepcopy(procargs)
+
+        self._process = EXECUTORS[self._executor](
             target=self._process_execute,
             name=str(self),
             args=procargs,
@@ -242,6 +595,54 @@ class Component(metaclass=NamedABCMeta):
         self._reset(args)
         self._process.start()
 
+    def remaining(self):
+        """
+        Get the time left before the timeout of this component expires.
+
+        :return: Time left in seconds, including the grace period of the
+         executor, or None if the component has no timeout.
+        :rtype: float
+        """
+        if self.timeout is None:
+            return None
+
+        elapsed = time() - self._start
+        return max(0, self.timeout + self._process.grace - elapsed)
+
+    def waitables(self):
+        """
+        Get the objects that become ready when the execution of this
+        component ends.
+
+        :return: The reading end of the result pipe and the sentinel of the
+         driving process, suitable for
+         :py:func:`multiprocessing.connection.wait`. Empty if the execution
+         cannot be waited on, for example if executed in a thread.
+        :rtype: list
+        """
+        sentinel = self._process.sentinel
+        if sentinel is None:
+            return []
+        return [self._result.reader, sentinel]
+
+    def done(self):
+        """
+        Check if the execution of this component ended, that is, if calling
+        :meth:`join` will not block.
+
+        :return: True if the execution ended, either because the component
+         submitted its result, its driving process died or its timeout
+         expired.
+        :rtype: bool
+        """
+        if not self._result.empty():
+            return True
+
+        if self.remaining() == 0:
+            return True
+
+        return not self._process.is_alive()
+
     def stop(self):
         """
         Force stop this component.
@@ -260,27 +661,65 @@ class Component(metaclass=NamedABCMeta):
         """
 
         # Calculate timeout from elapsed time
-        timeout = None
-        if self.timeout is not None:
-            timeout = max([0, self.timeout - (time() - self.start)])
+        timeout = self.remaining()
+
+        # If the driving process already died, its result is either already
+        # available or will never be
+        if not self._process.is_alive():
+            timeout = 0
 
         # Get results
         try:
-            duration, data = self._result.get(True, timeout)
+            result = self._result.get(True, timeout)
+            joined = time()
+            duration = result['duration']
+            status = result.get('status', None)
+
+            try:
+                data, deserialization = self._transport.unpack(result)
+            except Exception:
+                log.exception(
+                    'Unable to receive the data of {}'.format(self)
+                )
+                data = deserialization = None
+
+            accounting = self._join_accounting(result, joined)
+            accounting['deserialization'] = deserialization
+
+            # Got data back, release the executor (wait for the process to
+            # die, return the worker to the pool, etc)
+            self._process.release()
+
+            # Inline executions can't be interrupted, check the timeout
+            # after the fact
+            if (
+                self._executor == 'inline' and
+                self.timeout is not None and
+                duration > self.timeout
+            ):
+                status = 'timed out'
+
+            # Executor interrupted the execution because of the timeout
+            if status == 'timed out':
+                execution = ExecutionInfo(
+                    status, duration,
+                    self._process.pid,
+                    self._process.exitcode,
+                    None,
+                    **accounting
+                )
+                raise TimeExceededError(execution)
 
-            # Got data back, wait for the process to die
-            self._process.join(0.1)
-            if self._process.is_alive():
-                log.warning(
-                    '{name} #{component.index} "{component.id}" driving '
-                    'process with PID {process.pid} took too long to die '
-                    'after submitting its result. Exit code might '
-                    'be None'.format(
-                        name=self.__class__.__name__,
-                        component=self,
-                        process=self._process,
-                    )
+            # Execution interrupted because it exceeded a resource limit
+            if status is not None:
+                execution = ExecutionInfo(
+                    status, duration,
+                    self._process.pid,
+                    self._process.exitcode,
+                    None,
+                    **accounting
                 )
+                raise CrashError(execution)
 
             # Standard Python crash
             if data is None:
@@ -288,7 +727,8 @@ class Component(metaclass=NamedABCMeta):
                     'crashed', duration,
                     self._process.pid,
                     self._process.exitcode,
-                    None
+                    None,
+                    **accounting
                 )
                 raise CrashError(execution)
 
@@ -297,7 +737,8 @@ class Component(metaclass=NamedABCMeta):
                 'succeeded', duration,
                 self._process.pid,
                 self._process.exitcode,
-                data
+                data,
+                **accounting
             )
             return execution
 
@@ -320,7 +761,21 @@ class Component(metaclass=NamedABCMeta):
                     )
                 )
 
-                status = 'killed'
+                status = self._killed_status()
+
+            # Threads can't be killed, abandon it
+            elif self._executor == 'thread':
+                log.warning(
+                    'Execution of {name} #{component.index} '
+                    '"{component.id}" timed out. Its driving thread cannot be '
+                    'killed and will be abandoned'.format(
+                        name=self.__class__.__name__.lower(),
+                        component=self,
+                    )
+                )
+
+                duration = time() - self._start
+                status = 'timed out'
 
             # Real timeout, process still alive, lets kill it
             else:
@@ -332,7 +787,7 @@ class Component(metaclass=NamedABCMeta):
                     log.warning(
                         'Execution of {name} #{component.index} '
                         '"{component.id}" timed out and its driving process '
-                        'with PID {component.pid} seems to have hanged'.format(
+                        'with PID {process.pid} seems to have hanged'.format(
                             name=self.__class__.__name__.lower(),
                             component=self,
                             process=self._process,
@@ -343,7 +798,7 @@ class Component(metaclass=NamedABCMeta):
 
                 else:
                     # At least we can offer an estimate if we kill the process
-                    duration = time() - self.start
+                    duration = time() - self._start
                     status = 'timed out'
 
             # Note: exitcode can be None if the process hanged
@@ -355,6 +810,61 @@ class Component(metaclass=NamedABCMeta):
             )
             raise TimeExceededError(execution)
 
+    def _join_accounting(self, result, joined):
+        """
+        Gather the accounting of an execution of this component from its
+        result message.
+
+        :param dict result: The result message of the execution.
+        :param float joined: Time the result message was received.
+
+        :return: Keyword arguments for :class:`ExecutionInfo`.
+        :rtype: dict
+        """
+        accounting = {
+            'payload': result.get('payload', None),
+            'serialization': result.get('serialization', None),
+            'cpu_user': result.get('cpu_user', None),
+            'cpu_system': result.get('cpu_system', None),
+            'max_rss': result.get('max_rss', None),
+        }
+
+        started = result.get('started', None)
+        if started is not None:
+            accounting['started'] = started
+            accounting['spawn'] = max(0, started - self._start)
+            accounting['join_wait'] = max(
+                0, joined - started - result['duration']
+            )
+
+        return accounting
+
+    def _killed_status(self):
+        """
+        Determine the status of an execution whose driving process was
+        killed.
+
+        :return: ``cpu-limited`` if the process was killed because it
+         exceeded its CPU time limit, ``killed`` otherwise.
+        :rtype: str
+        """
+        exitcode = self._process.exitcode
+
+        if exitcode == -SIGXCPU:
+            return 'cpu-limited'
+
+        # The hard limit kills the process if it doesn't handle SIGXCPU in
+        # time, for example while executing native code. The CPU time can't
+        # exceed the wall time, so that is a necessary condition.
+        if (
+            exitcode == -SIGKILL and
+            self._max_cpu_seconds is not None and
+            time() - self._start >= self._max_cpu_seconds
+        ):
+            return 'cpu-limited'
+
+        return 'killed'
+
     def __lt__(self, other):
         """
         "Less than" magic method allows to sort a collection of this objects
@@ -0,0 +1,420 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2018 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Executors for components.
+
+Components are executed in their own process by default. For trivial
+components the cost of forking a process and sending the result back through a
+queue is far greater than the cost of the execution itself. The executors in
+this module allow to run a component in a thread or inline, in the calling
+process.
+
+Sources that implement ``collect()`` as a coroutine are executed together by
+an :class:`AsyncGroup`, in a single event loop in a single process. The CPU
+time of each of them is measured on each step of its coroutine.
+
+All executors mimic the interface of :py:class:`multiprocessing.Process` so
+they can be driven by :class:`flowbber.components.base.Component` the same way
+as a process.
+"""
+
+from time import time
+from os import getpid
+from resource import getrusage, RUSAGE_SELF
+from threading import Thread
+from multiprocessing import Process
+from asyncio import new_event_loop, gather, wait_for, TimeoutError
+
+from setproctitle import setproctitle
+
+from ..logging import get_logger
+
+
+log = get_logger(__name__)
+
+
+try:
+    from resource import RUSAGE_THREAD
+except ImportError:
+    RUSAGE_THREAD = None
+
+
+class Executor:
+    """
+    Mixin that completes the interface of :py:class:`multiprocessing.Process`
+    expected by components.
+
+    :var float grace: Additional time, in seconds, the component will wait
+     for a result after its timeout expired. Used by executors that enforce
+     the timeout themselves so they have a chance to report it.
+    """
+
+    grace = 0.0
+
+    def release(self):
+        """
+        Release the executor once the component submitted its result.
+        """
+        pass
+
+
+class ProcessExecutor(Executor, Process):
+    """
+    Execute a component in its own process.
+    """
+
+    def release(self):
+        """
+        Wait for the process to die after it submitted its result.
+        """
+        self.join(0.1)
+        if self.is_alive():
+            log.warning(
+                '{executor.name} driving process with PID {executor.pid} '
+                'took too long to die after submitting its result. Exit code '
+                'might be None'.format(executor=self)
+            )
+
+
+class ThreadExecutor(Executor, Thread):
+    """
+    Execute a component in a thread of the calling process.
+
+    Threads cannot be killed. A thread that exceeds its timeout is abandoned
+    and left running as a daemon thread.
+    """
+
+    def __init__(self, target, name, args):
+        super().__init__(target=target, name=name, args=args, daemon=True)
+
+    @property
+    def pid(self):
+        return getpid()
+
+    @property
+    def exitcode(self):
+        return None
+
+    @property
+    def sentinel(self):
+        """
+        Threads have no sentinel to wait on.
+        """
+        return None
+
+    def run(self):
+        try:
+            super().run()
+        except Exception:
+            log.exception('Component {} crashed'.format(self.name))
+
+    def terminate(self):
+        """
+        Threads cannot be terminated. This method does nothing.
+        """
+        pass
+
+
+class InlineExecutor(Executor):
+    """
+    Execute a component synchronously in the calling process.
+
+    The execution happens completely when :meth:`start` is called. As the
+    execution cannot be interrupted, the timeout of the component can only be
+    checked once the execution ended.
+    """
+
+    def __init__(self, target, name, args):
+        self.name = name
+        self._target = target
+        self._args = args
+
+    @property
+    def pid(self):
+        return getpid()
+
+    @property
+    def exitcode(self):
+        return None
+
+    @property
+    def sentinel(self):
+        """
+        Inline executions have no sentinel to wait on.
+        """
+        return None
+
+    def start(self):
+        try:
+            self._target(*self._args)
+        except Exception:
+            log.exception('Component {} crashed'.format(self.name))
+
+    def is_alive(self):
+        return False
+
+    def join(self, timeout=None):
+        pass
+
+    def terminate(self):
+        pass
+
+
+class AsyncMember(Executor):
+    """
+    Handle of a source executed by an :class:`AsyncGroup`.
+
+    All the members of a batch share the same driving process. The timeout of
+    each member is enforced in the event loop, so a grace period is given for
+    it to be reported before the shared process is terminated.
+
+    :param batch: The batch this member belongs to.
+    :type batch: :class:`AsyncBatch`
+    """
+
+    grace = 1.0
+
+    def __init__(self, batch):
+        self._batch = batch
+
+    @property
+    def pid(self):
+        return self._batch.process.pid
+
+    @property
+    def exitcode(self):
+        return self._batch.process.exitcode
+
+    @property
+    def sentinel(self):
+        return self._batch.process.sentinel
+
+    def start(self):
+        """
+        Members are started all at once when the group is launched.
+        """
+        pass
+
+    def is_alive(self):
+        return self._batch.process.is_alive()
+
+    def join(self, timeout=None):
+        self._batch.process.join(timeout)
+
+    def terminate(self):
+        self._batch.process.terminate()
+
+
+class AsyncBatch:
+    """
+    Sources dispatched to an :class:`AsyncGroup` for one execution.
+
+    :var list members: List of tuples with the source and the queue to
+     submit its result to.
+    :var process: The process driving this batch, once launched.
+    """
+
+    def __init__(self):
+        self.members = []
+        self.process = None
+
+
+class Metered:
+    """
+    Awaitable that drives a coroutine and measures the CPU time spent in each
+    of its steps.
+
+    As the coroutines of an event loop are executed one step at a time in
+    the same thread, the CPU time of the steps of a coroutine is the CPU time
+    it used, excluding the time it waited and the time of the others.
+
+    :param coroutine: The coroutine to drive.
+    :param session: Profiling session to resume on each step of the
+     coroutine, if any.
+    :type session: :class:`flowbber.components.profiler.Session`
+    """
+
+    def __init__(self, coroutine, session=None):
+        self._coroutine = coroutine
+        self._session = session
+        self.cpu_user = 0.0
+        self.cpu_system = 0.0
+
+    def _step(self, method, value):
+        """
+        Resume the coroutine and account the CPU time it used.
+        """
+        who = RUSAGE_SELF if RUSAGE_THREAD is None else RUSAGE_THREAD
+        before = getrusage(who)
+
+        if self._session is not None:
+            self._session.resume()
+
+        try:
+            return method(value)
+        finally:
+            if self._session is not None:
+                self._session.suspend()
+
+            after = getrusage(who)
+            self.cpu_user += after.ru_utime - before.ru_utime
+            self.cpu_system += after.ru_stime - before.ru_stime
+
+    def __await__(self):
+        method, value = self._coroutine.send, None
+
+        while True:
+            try:
+                future = self._step(method, value)
+            except StopIteration as e:
+                return e.value
+
+            try:
+                method, value = self._coroutine.send, (yield future)
+            except GeneratorExit:
+                self._coroutine.close()
+                raise
+            except BaseException as e:
+                method, value = self._coroutine.throw, e
+
+
+class AsyncGroup:
+    """
+    Execute several sources with a coroutine ``collect()`` concurrently, in
+    one event loop, in a single process.
+
+    Sources are dispatched to the group when started, and all the sources
+    dispatched are executed when the group is launched.
+
+    :param str name: Name of the driving process.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._batch = None
+
+    def dispatch(self, source, result):
+        """
+        Dispatch a source for execution in the next launch of the group.
+
+        :param source: The source to execute.
+        :type source: :class:`flowbber.components.Source`
+        :param result: The queue to submit the result of the source to.
+
+        :return: The handle to drive the execution of the source.
+        :rtype: :class:`AsyncMember`
+        """
+        if self._batch is None:
+            self._batch = AsyncBatch()
+
+        self._batch.members.append((source, result))
+        return AsyncMember(self._batch)
+
+    def launch(self):
+        """
+        Start the driving process for all the sources dispatched.
+        """
+        batch, self._batch = self._batch, None
+
+        if batch is None:
+            return
+
+        batch.process = Process(
+            target=self._run,
+            name=self._name,
+            args=(batch.members, ),
+        )
+        batch.process.start()
+
+    def _run(self, members):
+        """
+        Driving process target function.
+        """
+        setproctitle(self._name)
+
+        loop = new_event_loop()
+        try:
+            loop.run_until_complete(self._gather(members))
+        finally:
+            loop.close()
+
+    async def _gather(self, members):
+        """
+        Execute all sources concurrently.
+        """
+        await gather(*(
+            self._collect(source, result)
+            for source, result in members
+        ))
+
+    async def _collect(self, source, result):
+        """
+        Execute one source and submit its result.
+        """
+        start = time()
+        session = None
+        if source._profiler is not None:
+            session = source._profiler.session(source)
+        metered = Metered(source._async_execute(), session)
+        data = None
+        status = None
+
+        try:
+            data = await wait_for(metered, source.timeout)
+
+        except TimeoutError:
+            status = 'timed out'
+
+        except Exception:
+            log.exception('Component {} crashed'.format(source))
+
+        finally:
+            # Write the profile before the pipeline collects the profiles
+            if session is not None:
+                session.close()
+
+            message = {
+                'duration': time() - start,
+                'status': status,
+                'started': start,
+                'cpu_user': metered.cpu_user,
+                # The peak memory of the process is shared by all the sources
+                # of the group, so it is not reported
+                'cpu_system': metered.cpu_system,
+            }
+            message.update(source._transport.pack(data))
+            result.put(message)
+
+
+EXECUTORS = {
+    'process': ProcessExecutor,
+    'thread': ThreadExecutor,
+    'inline': InlineExecutor,
+}
+
+
+__all__ = [
+    'Executor',
+    'ProcessExecutor',
+    'ThreadExecutor',
+    'InlineExecutor',
+    'AsyncMember',
+    'Metered',
+    'AsyncGroup',
+    'EXECUTORS',
+]
@@ -0,0 +1,426 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2018 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Pool of persistent worker processes to execute components.
+
+By default each execution of a component forks a brand new process. When a
+pipeline is run many times, for example by the
+:class:`flowbber.scheduler.Scheduler`, this means that every tick pays for the
+fork and for the import of the libraries each component uses.
+
+The :class:`WorkerPool` keeps a set of long-lived worker processes instead.
+Components are dispatched to an idle worker, and the worker is returned to the
+pool once the component submitted its result. Workers are recycled after a
+number of runs or when their resident memory grows above a ceiling.
+
+The pool can be bounded. Once it reached its maximum size, a component waits
+for a worker to be released instead of forking a new one.
+"""
+
+from os import sysconf
+from atexit import register
+from threading import RLock, Condition, get_ident
+from itertools import count
+from collections import OrderedDict
+from multiprocessing import Queue, Process
+
+from setproctitle import setproctitle
+
+from ..logging import get_logger
+from .executors import Executor
+from .transport import ResultPipe
+
+
+log = get_logger(__name__)
+
+
+POLL_INTERVAL = 0.5
+"""
+Time in seconds between checks for dead workers while waiting for a worker
+of a full pool.
+"""
+
+
+def get_rss(pid):
+    """
+    Get the resident set size of a process.
+
+    :param int pid: PID of the process.
+
+    :return: The resident set size of the process in bytes, or ``None`` if it
+     cannot be determined.
+    :rtype: int
+    """
+    try:
+        with open('/proc/{}/statm'.format(pid)) as fd:
+            pages = int(fd.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+
+    return pages * sysconf('SC_PAGE_SIZE')
+
+
+class Worker(Executor):
+    """
+    Persistent worker process.
+
+    Instances of this class mimic the interface of
+    :py:class:`multiprocessing.Process` so that components can drive them the
+    same way they drive their own processes.
+
+    :param pool: The pool this worker belongs to.
+    :type pool: :class:`WorkerPool`
+    :param int generation: Number of components registered in the pool when
+     this worker was forked. The worker can only execute components with a
+     key lower than this number.
+    :param function target: Worker loop function.
+    :param str name: Name of the worker process.
+    """
+
+    def __init__(self, pool, generation, target, name):
+        self.pool = pool
+        self.generation = generation
+        self.runs = 0
+        self.owner = None
+        self.tasks = Queue()
+        self.result = ResultPipe()
+
+        self._task = None
+        self._process = Process(
+            target=target,
+            name=name,
+            args=(self.tasks, self.result),
+        )
+        self._process.start()
+
+    @property
+    def pid(self):
+        return self._process.pid
+
+    @property
+    def exitcode(self):
+        return self._process.exitcode
+
+    @property
+    def sentinel(self):
+        return self._process.sentinel
+
+    def is_alive(self):
+        return self._process.is_alive()
+
+    def assign(self, key, args):
+        """
+        Assign the next task to execute by this worker.
+
+        :param int key: Key of the component in the pool registry.
+        :param tuple args: Arguments to pass to the component.
+        """
+        self._task = (key, args)
+
+    def start(self):
+        """
+        Dispatch the assigned task to the worker process.
+        """
+        assert self._task is not None
+        self.tasks.put(self._task)
+        self._task = None
+
+    def join(self, timeout=None):
+        self._process.join(timeout)
+
+    def terminate(self):
+        self._process.terminate()
+
+    def release(self):
+        """
+        Return this worker to its pool.
+        """
+        self.pool.release(self)
+
+    def stop(self, timeout=1.0):
+        """
+        Request the worker to finish and wait for it to exit.
+
+        :param float timeout: Time to wait for a graceful exit before
+         terminating the process.
+        """
+        if self._process.is_alive():
+            self.tasks.put(None)
+            self._process.join(timeout)
+
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join(timeout)
+
+    def __str__(self):
+        return 'worker PID {} ({} runs)'.format(self.pid, self.runs)
+
+
+class WorkerPool:
+    """
+    Pool of persistent worker processes.
+
+    Workers are forked from the process that owns the pool, so they inherit
+    the components registered before they were created. Only a key and the
+    execution arguments are sent to the worker for each execution.
+
+    :param str app: Name of the application. Used to set the process name of
+     the idle workers.
+    :param int max_runs: Number of executions after which a worker is
+     recycled. ``None`` means that workers are never recycled because of the
+     number of runs.
+    :param int max_rss: Resident memory ceiling, in megabytes, above which a
+     worker is recycled after an execution. ``None`` means no ceiling.
+    :param int max_workers: Maximum number of workers of the pool. ``None``
+     means that a worker is forked whenever none is idle.
+    """
+
+    def __init__(
+            self, app='flowbber', max_runs=None, max_rss=None,
+            max_workers=None):
+        self._app = app
+        self._max_runs = max_runs
+        self._max_rss = max_rss
+        self._max_workers = max_workers
+
+        self._keys = count()
+        self._registry = OrderedDict()
+        self._workers = []
+        self._idle = []
+
+        # Components can be started and joined from several threads
+        self._lock = RLock()
+        self._released = Condition(self._lock)
+
+        register(self.close)
+
+    def register(self, component):
+        """
+        Register a component in the pool.
+
+        :param component: The component to register.
+        :type component: :class:`flowbber.components.base.Component`
+
+        :return: The key of the component in the pool.
+        :rtype: int
+        """
+        key = next(self._keys)
+        self._registry[key] = component
+        return key
+
+    def _worker_loop(self, tasks, result):
+        """
+        Worker process target function.
+
+        Wait for tasks, execute them and submit their results until a ``None``
+        is submitted to the tasks queue.
+        """
+        title = '{} - idle worker'.format(self._app)
+        setproctitle(title)
+
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+
+            key, args = task
+            component = self._registry[key]
+
+            # Submit the result to the queue of this worker
+            component._result = result
+
+            try:
+                component._process_execute(*args)
+            except Exception:
+                log.exception(
+                    'Component {} crashed in worker'.format(component)
+                )
+
+            setproctitle(title)
+
+    def _spawn(self):
+        """
+        Fork a new worker.
+
+        :return: The new worker.
+        :rtype: :class:`Worker`
+        """
+        worker = Worker(
+            self,
+            len(self._registry),
+            self._worker_loop,
+            '{} worker'.format(self._app),
+        )
+        self._workers.append(worker)
+
+        log.debug('Spawned {}'.format(worker))
+        return worker
+
+    def _retire(self, worker, reason):
+        """
+        Stop a worker and remove it from the pool.
+
+        :param worker: The worker to retire.
+        :type worker: :class:`Worker`
+        :param str reason: Human readable reason for logging.
+        """
+        log.debug('Recycling {}: {}'.format(worker, reason))
+        worker.stop()
+        self._workers.remove(worker)
+
+    def _prune(self):
+        """
+        Discard the dead workers (killed, or terminated because of a
+        timeout).
+        """
+        self._workers = [
+            worker for worker in self._workers if worker.is_alive()
+        ]
+        self._idle = [
+            worker for worker in self._idle if worker in self._workers
+        ]
+
+    def _full(self):
+        return (
+            self._max_workers is not None and
+            len(self._workers) >= self._max_workers
+        )
+
+    def saturated(self):
+        """
+        Check if a component would have to wait for a worker.
+
+        :return: ``True`` if the pool reached its maximum size and no worker
+         is idle.
+        :rtype: bool
+        """
+        with self._lock:
+            self._prune()
+            return self._full() and not self._idle
+
+    def acquire(self, key, args):
+        """
+        Acquire a worker to execute a component.
+
+        If no idle worker is able to execute the component, a new one is
+        forked, unless the pool reached its maximum size. Then, idle workers
+        forked before the component was registered are recycled, or the call
+        blocks until a worker is released.
+
+        A thread that holds workers never blocks, as the workers it holds are
+        only released by itself. A worker is forked above the maximum size
+        instead, and recycled once released.
+
+        :param int key: Key of the component in the pool registry.
+        :param tuple args: Arguments to pass to the component.
+
+        :return: The acquired worker, ready to be started.
+        :rtype: :class:`Worker`
+        """
+        owner = get_ident()
+
+        with self._released:
+            while True:
+                self._prune()
+
+                worker = next((
+                    worker for worker in self._idle
+                    if key < worker.generation
+                ), None)
+
+                if worker is not None:
+                    self._idle.remove(worker)
+                    break
+
+                if not self._full():
+                    worker = self._spawn()
+                    break
+
+                if self._idle:
+                    self._retire(
+                        self._idle.pop(0),
+                        'forked before component was registered',
+                    )
+                    continue
+
+                if any(worker.owner == owner for worker in self._workers):
+                    log.debug(
+                        'Pool is full, forking a worker above its maximum '
+                        'size for a thread holding workers'
+                    )
+                    worker = self._spawn()
+                    break
+
+                self._released.wait(POLL_INTERVAL)
+
+            worker.owner = owner
+            worker.assign(key, args)
+            return worker
+
+    def release(self, worker):
+        """
+        Return a worker to the pool after it submitted a result.
+
+        The worker is recycled if it reached the maximum number of runs or its
+        resident memory is above the ceiling.
+
+        :param worker: The worker to release.
+        :type worker: :class:`Worker`
+        """
+        with self._released:
+            worker.runs += 1
+            worker.owner = None
+            self._released.notify_all()
+
+            if self._max_runs is not None and worker.runs >= self._max_runs:
+                self._retire(worker, 'maximum number of runs reached')
+                return
+
+            if self._max_rss is not None:
+                rss = get_rss(worker.pid)
+                if rss is not None and rss > self._max_rss * 1024 * 1024:
+                    self._retire(
+                        worker, 'RSS of {} bytes above ceiling'.format(rss)
+                    )
+                    return
+
+            if (
+                self._max_workers is not None and
+                len(self._workers) > self._max_workers
+            ):
+                self._retire(worker, 'pool above its maximum size')
+                return
+
+            self._idle.append(worker)
+
+    def close(self):
+        """
+        Stop all workers of the pool.
+        """
+        with self._lock:
+            for worker in list(self._workers):
+                worker.stop()
+
+            self._workers.clear()
+            self._idle.clear()
+
+    def __len__(self):
+        return len(self._workers)
+
+
+__all__ = ['Worker', 'WorkerPool']
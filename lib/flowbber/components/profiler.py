@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2018 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Profiling of the executions of components.
+
+Two profiling modes are available:
+
+``deterministic``
+    The execution is profiled with :py:mod:`cProfile`. Each execution dumps a
+    ``.pstats`` file.
+
+``sampling``
+    A thread samples the stack of the thread executing the component at a
+    fixed interval. The overhead is low and independent of the number of
+    function calls. Each execution dumps a ``.collapsed`` file with one line
+    per stack, the frames separated by semicolons, followed by the number of
+    samples, suitable for flame graph tools.
+
+Sources with a coroutine ``collect()`` share a thread with the other sources
+of their event loop, so their profile is only recorded while the steps of
+their coroutine are executed.
+
+Components executed in a thread or inline run in the pipeline process, along
+with other components and the runs of other replicas of the pipeline. Only one
+:py:mod:`cProfile` profiler can be active in a process on recent Python
+versions, so those components are always profiled with the sampling profiler.
+
+The files of each execution are written to a spool directory, as persistent
+workers of a pool don't see the state of the pipeline after they are forked.
+Each profiler has its own spool directory, and as a pipeline or a replica of a
+pipeline executes one run at a time, the spool only holds the files of the run
+in progress. Once the run ends, the files are moved to a directory for the run
+and merged into a single report.
+"""
+
+import sys
+from io import StringIO
+from time import time
+from os import getpid
+from uuid import uuid4
+from pathlib import Path
+from pstats import Stats
+from cProfile import Profile
+from collections import Counter
+from threading import Thread, Event, get_ident
+
+from ..logging import get_logger
+
+
+log = get_logger(__name__)
+
+
+MODES = ('deterministic', 'sampling')
+
+EXTENSIONS = {
+    'deterministic': '.pstats',
+    'sampling': '.collapsed',
+}
+"""
+Extension of the profile files of each profiling mode.
+"""
+
+SAMPLING_INTERVAL = 0.005
+"""
+Time in seconds between samples of the sampling profiler.
+"""
+
+
+class Sampler(Thread):
+    """
+    Thread that samples the stack of another thread.
+
+    :param int ident: Identifier of the thread to sample.
+    :param float interval: Time in seconds between samples.
+    """
+
+    def __init__(self, ident, interval=SAMPLING_INTERVAL):
+        super().__init__(daemon=True)
+        self.stacks = Counter()
+        self.active = True
+        self._sampled = ident
+        self._interval = interval
+        self._finished = Event()
+
+    def run(self):
+        while not self._finished.wait(self._interval):
+            if not self.active:
+                continue
+
+            frame = sys._current_frames().get(self._sampled, None)
+            if frame is None:
+                continue
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append('{} ({}:{})'.format(
+                    code.co_name, code.co_filename, code.co_firstlineno,
+                ))
+                frame = frame.f_back
+
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        """
+        Stop sampling and wait for the thread to end.
+        """
+        self._finished.set()
+        self.join()
+
+
+class Session:
+    """
+    Profile of an execution of a component, recorded while resumed.
+
+    :param str mode: Profiling mode, either ``deterministic`` or
+     ``sampling``.
+    :param path: Path to the file to write the profile to.
+    :type path: :py:class:`pathlib.Path`
+    """
+
+    def __init__(self, mode, path):
+        self._path = path
+        self._profile = None
+        self._sampler = None
+
+        if mode == 'deterministic':
+            self._profile = Profile()
+            return
+
+        self._sampler = Sampler(get_ident())
+        self._sampler.active = False
+        self._sampler.start()
+
+    def resume(self):
+        """
+        Record the profile of the calling thread.
+        """
+        if self._profile is not None:
+            self._profile.enable()
+        else:
+            self._sampler.active = True
+
+    def suspend(self):
+        """
+        Stop recording the profile, until resumed again.
+        """
+        if self._profile is not None:
+            self._profile.disable()
+        else:
+            self._sampler.active = False
+
+    def close(self):
+        """
+        Write the profile recorded.
+        """
+        if self._profile is not None:
+            self._profile.dump_stats(str(self._path))
+            return
+
+        self._sampler.stop()
+        with self._path.open('w', encoding='utf-8') as profilefd:
+            for stack, count in self._sampler.stacks.most_common():
+                profilefd.write('{} {}\n'.format(stack, count))
+
+
+class Profiler:
+    """
+    Profiler of the executions of components.
+
+    :param str mode: Profiling mode, either ``deterministic`` or
+     ``sampling``.
+    :param str directory: Directory to write the profiles to.
+    """
+
+    def __init__(self, mode, directory):
+        if mode not in MODES:
+            raise ValueError('Unknown profiling mode "{}"'.format(mode))
+
+        self.mode = mode
+        self.directory = Path(directory)
+        self.spool = self.directory / 'spool' / uuid4().hex
+
+        self.spool.mkdir(parents=True, exist_ok=True)
+
+    def mode_for(self, component):
+        """
+        Get the profiling mode of the executions of a component.
+
+        :param component: The component to profile.
+
+        :return: The mode of this profiler, or ``sampling`` if the component
+         is executed in the pipeline process.
+        :rtype: str
+        """
+        if component.executor in ('thread', 'inline'):
+            return 'sampling'
+        return self.mode
+
+    def session(self, component):
+        """
+        Create a session to profile an execution of a component.
+
+        This method is called in the process that executes the component,
+        in the thread executing it. The session must be resumed to record
+        the profile, and closed to write it.
+
+        :param component: The component being executed.
+
+        :return: The profiling session.
+        :rtype: :class:`Session`
+        """
+        mode = self.mode_for(component)
+        path = self.spool / '{}.{}.{}{}'.format(
+            component.id, getpid(), int(time() * 1000000), EXTENSIONS[mode],
+        )
+        return Session(mode, path)
+
+    def run(self, component, function, *args):
+        """
+        Profile the execution of a component.
+
+        This method is called in the process that executes the component.
+        The profile is written even if the execution fails.
+
+        :param component: The component being executed.
+        :param function: The function to profile.
+        :param args: Arguments to call the function with.
+
+        :return: The value returned by the function.
+        """
+        session = self.session(component)
+        session.resume()
+        try:
+            return function(*args)
+        finally:
+            session.suspend()
+            session.close()
+
+    def collect(self, name):
+        """
+        Move the profiles in the spool to a directory for a run and merge
+        them into a report for each profiling mode.
+
+        This method is called in the pipeline process once the run ended.
+
+        :param str name: Name of the directory for the run.
+
+        :return: Paths to the reports, empty if there were no profiles.
+        :rtype: list
+        """
+        rundir = self.directory / name
+        reports = []
+
+        for mode in MODES:
+            extension = EXTENSIONS[mode]
+            profiles = sorted(self.spool.glob('*{}'.format(extension)))
+            if not profiles:
+                continue
+
+            rundir.mkdir(parents=True, exist_ok=True)
+
+            moved = []
+            for profile in profiles:
+                destination = rundir / profile.name
+                profile.replace(destination)
+                moved.append(destination)
+
+            report = rundir / 'report{}'.format(extension)
+            if mode == 'deterministic':
+                self._merge_stats(moved, report)
+            else:
+                self._merge_stacks(moved, report)
+            reports.append(report)
+
+        return reports
+
+    def _merge_stats(self, profiles, report):
+        """
+        Merge deterministic profiles, along with a human readable summary.
+
+        :param list profiles: Paths to the ``.pstats`` files to merge.
+        :param report: Path to the report to write.
+        :type report: :py:class:`pathlib.Path`
+        """
+        stats = Stats(*[str(profile) for profile in profiles])
+        stats.dump_stats(str(report))
+
+        summary = StringIO()
+        stats.stream = summary
+        stats.sort_stats('cumulative').print_stats(50)
+        report.with_suffix('.txt').write_text(
+            summary.getvalue(), encoding='utf-8'
+        )
+
+    def _merge_stacks(self, profiles, report):
+        """
+        Merge sampling profiles.
+
+        :param list profiles: Paths to the ``.collapsed`` files to merge.
+        :param report: Path to the report to write.
+        :type report: :py:class:`pathlib.Path`
+        """
+        stacks = Counter()
+        for profile in profiles:
+            with profile.open('r', encoding='utf-8') as profilefd:
+                for line in profilefd:
+                    stack, _, count = line.rstrip('\n').rpartition(' ')
+                    stacks[stack] += int(count)
+
+        with report.open('w', encoding='utf-8') as reportfd:
+            for stack, count in stacks.most_common():
+                reportfd.write('{} {}\n'.format(stack, count))
+
+
+__all__ = ['Profiler', 'Session', 'MODES', 'EXTENSIONS']
@@ -30,26 +30,54 @@ from ..utils.filter import filter_dict
 class Sink(Component):
     """
     Main base class to implement a Sink.
+
+    A sink that subscribes to some sources is streamed the result of each of
+    them as soon as it is available, instead of being executed once with the
+    final data.
+
+    :var tuple subscribe: Ids of the sources this sink subscribes to, or None
+     if the sink is executed with the final data.
     """
 
     def __init__(
         self, index, type_, id_,
-        optional=False, timeout=None, config=None
+        optional=False, timeout=None, executor='process', config=None,
+        reads=None, writes=None, cpu_affinity=None, nice=None,
+        max_rss=None, max_cpu_seconds=None, shed_first=False, subscribe=None
     ):
         super().__init__(
             index, type_, id_,
-            optional=optional, timeout=timeout, config=config
+            optional=optional, timeout=timeout, executor=executor,
+            config=config, reads=reads, writes=writes,
+            cpu_affinity=cpu_affinity, nice=nice, max_rss=max_rss,
+            max_cpu_seconds=max_cpu_seconds, shed_first=shed_first
         )
 
-    def _component_execute(self, data):
+        self._subscribe = None if subscribe is None else tuple(subscribe)
+
+    @property
+    def subscribe(self):
+        """
+        Ids of the sources this sink subscribes to, if any.
+        """
+        return self._subscribe
+
+    def _component_execute(self, data, batch=False):
         """
         Sink component execute override.
 
         This function will just call the user provided ``distribute()``
-        function with the input data and return an empty dictionary
-        ("no data").
+        function with the input data, or ``distribute_batch()`` if given the
+        data of several runs, and return an empty dictionary ("no data").
+
+        :param data: The collected data, or a list with the collected data of
+         each run if distributing a batch.
+        :param bool batch: The data is a batch of the data of several runs.
         """
-        self.distribute(data)
+        if batch:
+            self.distribute_batch(data)
+        else:
+            self.distribute(data)
         return {}
 
     @abstractmethod
@@ -59,11 +87,31 @@ class Sink(Component):
 
         All sinks subclasses must implement this abstract method.
 
+        Sinks that subscribe to sources are called once for each result of
+        those sources, with a dictionary holding only that result.
+
         :param OrderedDict data: The collected data. This dictionary can be
          modified as required without consequences for the pipeline.
         """
         pass
 
+    def distribute_batch(self, batch):
+        """
+        Distribute the data collected by several runs of the pipeline.
+
+        Called instead of ``distribute()`` when the scheduler batches the
+        samples of the pipeline. Sinks writing to a database can override
+        this method to write all the samples in a single operation. By
+        default, ``distribute()`` is called with the data of each run, in
+        order.
+
+        :param list batch: The collected data of each run, oldest first.
+         These dictionaries can be modified as required without consequences
+         for the pipeline.
+        """
+        for data in batch:
+            self.distribute(data)
+
 
 class FilterSink(Sink):
     """
@@ -21,25 +21,83 @@ Module implementating the Source base class.
 All custom Flowbber sources must extend from the Source class.
 """
 
+from time import time
 from abc import abstractmethod
+from asyncio import new_event_loop
+from inspect import iscoroutine, iscoroutinefunction
 
 from .base import Component
+from .transport import ResultPipe
 
 
 class Source(Component):
     """
     Main base class to implement a Source.
+
+    The ``collect()`` method can be implemented as a coroutine. Sources with a
+    coroutine ``collect()`` executed in a process are all executed
+    concurrently in a single event loop, in one process.
+
+    :var int every: Time in seconds between the executions of this source, or
+     None if the source is executed on every run of the pipeline.
     """
 
     def __init__(
         self, index, type_, id_,
-        optional=False, timeout=None, config=None
+        optional=False, timeout=None, executor='process', config=None,
+        reads=None, writes=None, cpu_affinity=None, nice=None,
+        max_rss=None, max_cpu_seconds=None, shed_first=False, every=None
     ):
         super().__init__(
             index, type_, id_,
-            optional=optional, timeout=timeout, config=config
+            optional=optional, timeout=timeout, executor=executor,
+            config=config, reads=reads, writes=writes,
+            cpu_affinity=cpu_affinity, nice=nice, max_rss=max_rss,
+            max_cpu_seconds=max_cpu_seconds, shed_first=shed_first
         )
 
+        self._group = None
+        self._every = every
+
+    @property
+    def every(self):
+        """
+        Time in seconds between the executions of this source, if sampled
+        less often than the pipeline runs.
+        """
+        return self._every
+
+    @property
+    def is_async(self):
+        """
+        The ``collect()`` method of this source is a coroutine or not.
+        """
+        return iscoroutinefunction(self.collect)
+
+    def attach_group(self, group):
+        """
+        Attach this source to a group of sources executed in one event loop.
+
+        :param group: The group to attach this source to.
+        :type group: :class:`flowbber.components.executors.AsyncGroup`
+        """
+        self._group = group
+
+    def _reset(self, procargs):
+        """
+        Source component reset override.
+
+        Sources attached to a group are dispatched to it instead of creating
+        their own executor.
+        """
+        if self._group is None:
+            super()._reset(procargs)
+            return
+
+        self._start = time()
+        self._result = ResultPipe()
+        self._process = self._group.dispatch(self, self._result)
+
     def _component_execute(self):
         """
         Source component execute override.
@@ -49,6 +107,32 @@ class Source(Component):
         """
         data = self.collect()
 
+        # Coroutine collect() executed outside of a group
+        if iscoroutine(data):
+            loop = new_event_loop()
+            try:
+                data = loop.run_until_complete(data)
+            finally:
+                loop.close()
+
+        return self._validate(data)
+
+    async def _async_execute(self):
+        """
+        Execute the coroutine ``collect()`` function and validate the returned
+        value.
+        """
+        return self._validate(await self.collect())
+
+    def _validate(self, data):
+        """
+        Validate the data collected by this source.
+
+        :param dict data: The data collected.
+
+        :return: The same data.
+        :rtype: dict
+        """
         if not isinstance(data, dict):
             raise RuntimeError(
                 'Source #{source.index} "{source.id}" collected '
@@ -67,12 +151,29 @@ class Source(Component):
 
         return data
 
+    def inputs(self):
+        """
+        Files this source collects its data from.
+
+        Sources whose result depends only on their configuration and the
+        contents of some files can override this method to return the paths
+        to those files, or to the directories that contain them. The result
+        of those sources can then be cached by the pipeline and reused while
+        the files don't change.
+
+        :return: A list with the paths to the input files or directories, or
+         ``None`` if the result of this source cannot be cached.
+        :rtype: list
+        """
+        return None
+
     @abstractmethod
     def collect(self):
         """
         Collect some arbitrary data.
 
-        All sources subclasses must implement this abstract method.
+        All sources subclasses must implement this abstract method. It can be
+        implemented as a coroutine (``async def collect(self)``).
 
         :return: A dictionary with the data collected by this source.
         :rtype: dict
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2018 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Transport of the results of components back to the pipeline.
+
+The data returned by a component executed in a process is sent back to the
+pipeline through a pipe, which means it is pickled, pushed through a pipe
+and unpickled. For large payloads the pipe is the bottleneck.
+
+The :class:`Transport` pickles the data once and, if the payload is larger
+than a threshold, writes it to a temporal file in a memory backed filesystem.
+Only the name of that file travels through the pipe, and the pipeline maps
+the file to unpickle the data directly from memory.
+
+As the handle is just a file name, the transport doesn't rely on any state
+inherited from the parent process and works with any multiprocessing start
+method.
+
+The files are written to a directory private to the transport, so the files
+of the results that were never read, for example because the pipeline
+stopped before joining their components, are removed along with it.
+
+The result message itself is sent through a :class:`ResultPipe`, whose
+reading end can be waited on along with the sentinels of the processes so
+that the pipeline can react to whichever component ends first.
+"""
+
+from time import time
+from os import unlink, makedirs
+from os.path import join
+from uuid import uuid4
+from shutil import rmtree
+from queue import Empty
+from multiprocessing import Pipe
+from tempfile import mkstemp
+from mmap import mmap, ACCESS_READ
+from pickle import dumps, loads, HIGHEST_PROTOCOL
+
+from ..utils.shm import DEFAULT_THRESHOLD, get_shared_directory
+
+
+class ResultPipe:
+    """
+    Channel to send the result message of a component to the pipeline.
+
+    Instances of this class mimic the interface of
+    :py:class:`multiprocessing.Queue` used by components, but messages are
+    written directly to the pipe without a feeder thread, and the reading end
+    is exposed so it can be waited on with
+    :py:func:`multiprocessing.connection.wait`.
+
+    :var reader: Reading end of the pipe.
+    :var writer: Writing end of the pipe.
+    """
+
+    def __init__(self):
+        self.reader, self.writer = Pipe(duplex=False)
+
+    def put(self, message):
+        self.writer.send(message)
+
+    def get(self, block=True, timeout=None):
+        if not self.reader.poll(timeout if block else 0):
+            raise Empty()
+        return self.reader.recv()
+
+    def empty(self):
+        return not self.reader.poll()
+
+
+class Transport:
+    """
+    Result transport for components executed in a process.
+
+    :param int threshold: Size, in bytes, of the pickled payload above which
+     the payload is written to a file instead of being sent through the
+     result pipe. ``None`` means that payloads are always sent through the
+     pipe.
+    :param str directory: Directory to write the large payloads to. It is
+     created when the first large payload is written, and removed by
+     :meth:`close`. If ``None``, a directory private to this transport in a
+     memory backed directory is used when available.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, directory=None):
+        self.threshold = threshold
+        self.directory = directory or join(
+            get_shared_directory(), 'flowbber-{}'.format(uuid4().hex)
+        )
+
+    def pack(self, data):
+        """
+        Serialize the data returned by a component.
+
+        This method is called in the process that executed the component.
+
+        :param data: The data returned by the component.
+
+        :return: A dictionary to merge in the result message, with the
+         ``data`` pickled (or ``None``), the ``handle`` of the file the data
+         was written to (or ``None``), the ``payload`` size in bytes and the
+         ``serialization`` time in seconds.
+        :rtype: dict
+        """
+        if data is None:
+            return {'data': None}
+
+        start = time()
+        pickled = dumps(data, protocol=HIGHEST_PROTOCOL)
+        payload = len(pickled)
+        handle = None
+
+        if self.threshold is not None and payload > self.threshold:
+            makedirs(self.directory, exist_ok=True)
+            fd, handle = mkstemp(
+                prefix='flowbber-', suffix='.payload', dir=self.directory
+            )
+            with open(fd, 'wb') as payloadfd:
+                payloadfd.write(pickled)
+            pickled = None
+
+        return {
+            'data': pickled,
+            'handle': handle,
+            'payload': payload,
+            'serialization': time() - start,
+        }
+
+    def unpack(self, message):
+        """
+        Deserialize the data of a result message.
+
+        This method is called in the pipeline process. Files written for large
+        payloads are removed once read.
+
+        :param dict message: The result message.
+
+        :return: A tuple with the data and the deserialization time in seconds.
+         The deserialization time is ``None`` if the data wasn't serialized.
+        :rtype: tuple
+        """
+        if 'payload' not in message:
+            return message['data'], None
+
+        start = time()
+        handle = message['handle']
+
+        if handle is None:
+            return loads(message['data']), time() - start
+
+        try:
+            with open(handle, 'rb') as payloadfd, mmap(
+                payloadfd.fileno(), 0, access=ACCESS_READ
+            ) as mapped:
+                data = loads(mapped)
+        finally:
+            unlink(handle)
+
+        return data, time() - start
+
+    def close(self):
+        """
+        Remove the directory of the large payloads, along with the payloads
+        that were never read.
+
+        This method is called in the pipeline process once no component can
+        submit a result anymore. A new directory is created when the next
+        large payload is written.
+        """
+        rmtree(self.directory, ignore_errors=True)
+
+
+__all__ = ['ResultPipe', 'Transport', 'DEFAULT_THRESHOLD']
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2018 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Daemon running the schedules of many pipelines in a single process.
+
+Running each scheduled pipeline as its own ``flowbber`` process means one
+logging subprocess, one discovery of the plugins and one set of component
+processes for each pipeline. The :class:`Daemon` loads all the pipelines in
+one process instead, sharing the logging subprocess, the plugins discovered
+and a single :class:`flowbber.components.pool.WorkerPool`, and serves their
+schedules in one :mod:`asyncio` event loop.
+
+The runs of the pipelines are executed in threads, so the runs of different
+pipelines execute at the same time. The components of all the runs share the
+workers of the pool, which can be bounded: once all the workers are busy, a
+component waits for a worker to be released.
+
+Components that cannot be executed by a persistent worker bypass the pool:
+sources grouped in an event loop, components with resource limits, and
+components executed in a thread or inline. They are only bounded by the
+``max_workers`` of their pipeline, which the bound of the pool caps.
+"""
+
+from collections import OrderedDict
+from asyncio import new_event_loop, gather
+
+from .pipeline import Pipeline
+from .logging import get_logger
+from .scheduler import Scheduler
+from .inputs import load_pipeline
+from .local import load_configuration
+from .components.pool import WorkerPool
+
+
+log = get_logger(__name__)
+
+
+class Daemon:
+    """
+    Run the schedules of many pipelines in a single process.
+
+    All the pipelines are created before any of them runs, so the workers of
+    the pool, forked on demand, are able to execute the components of any of
+    them.
+
+    :param list paths: Paths to the definition files of the pipelines. All
+     the pipelines must be scheduled.
+    :param str app: Name of the application running the pipelines.
+    :param int workers: Maximum number of workers of the pool, shared by the
+     runs of all the pipelines. The ``max_workers`` of each pipeline is
+     capped to this number too, which bounds the components of a pipeline
+     that bypass the pool, but not the sum over all the pipelines. ``None``
+     means the pool is not bounded and each pipeline uses its own
+     ``max_workers``.
+    :param int pool_max_runs: Number of executions after which a worker of
+     the pool is recycled. ``None`` means no limit.
+    :param int pool_max_rss: Resident memory ceiling, in megabytes, above
+     which a worker of the pool is recycled. ``None`` means no ceiling.
+    """
+
+    def __init__(
+            self, paths, app='flowbber', workers=None,
+            pool_max_runs=None, pool_max_rss=None):
+        self._app = app
+        self._workers = workers
+        self._pool_max_runs = pool_max_runs
+        self._pool_max_rss = pool_max_rss
+
+        self._pool = WorkerPool(
+            app=app,
+            max_runs=pool_max_runs,
+            max_rss=pool_max_rss,
+            max_workers=workers,
+        )
+        self._schedulers = OrderedDict()
+
+        for path in paths:
+            self._load(path)
+
+    @property
+    def schedulers(self):
+        """
+        Read-only mapping of the name of each pipeline to its scheduler.
+        """
+        return self._schedulers.copy()
+
+    def _load(self, path):
+        """
+        Create a pipeline and its scheduler.
+
+        :param Path path: Path to the definition file of the pipeline.
+        """
+        name = path.stem
+        if name in self._schedulers:
+            raise ValueError(
+                'Duplicated pipeline name "{}" for {}'.format(name, path)
+            )
+
+        log.info('Loading pipeline definition from {} ...'.format(path))
+        pipeline_definition = load_pipeline(path)
+
+        schedule = pipeline_definition.get('schedule', None)
+        if schedule is None:
+            raise ValueError('Pipeline {} is not scheduled'.format(path))
+
+        log.info('Loading local configuration from {} ...'.format(
+            path.parent
+        ))
+        load_configuration(path.parent)
+
+        execution = dict(pipeline_definition['execution'])
+
+        # The pool options of the pipeline are replaced by the shared pool
+        overridden = []
+        if not execution['pool']:
+            overridden.append('pool')
+
+        for option, value in (
+            ('pool_max_runs', self._pool_max_runs),
+            ('pool_max_rss', self._pool_max_rss),
+        ):
+            if execution[option] not in (None, value):
+                overridden.append(option)
+
+        if overridden:
+            log.warning(
+                'Worker pool shared by the daemon overrides options of '
+                'pipeline {}: {}'.format(name, ', '.join(overridden))
+            )
+
+        if self._workers is not None:
+            max_workers = execution['max_workers']
+            if max_workers is None or max_workers > self._workers:
+                execution['max_workers'] = self._workers
+
+        log.info('Creating pipeline {} ...'.format(name))
+        pipeline = Pipeline(
+            pipeline_definition,
+            name,
+            app=self._app,
+            worker_pool=self._pool,
+            **execution
+        )
+
+        self._schedulers[name] = Scheduler(
+            pipeline,
+            schedule.get('frequency', None),
+            samples=schedule['samples'],
+            start=schedule['start'],
+            stop_on_failure=schedule['stop_on_failure'],
+            metrics_file=schedule['metrics_file'],
+            max_in_flight=schedule['max_in_flight'],
+            cron=schedule.get('cron', None),
+            jitter=schedule['jitter'],
+            catch_up=schedule['catch_up'],
+            batch=schedule['batch'],
+            batch_interval=schedule['batch_interval'],
+            shed_after=schedule['shed_after'],
+        )
+
+    def run(self):
+        """
+        Run the schedules of all the pipelines until all of them end.
+
+        A pipeline whose scheduler stops on failure stops being scheduled,
+        while the others keep running.
+        """
+        log.info('Starting schedules of {} pipelines ...'.format(
+            len(self._schedulers)
+        ))
+
+        loop = new_event_loop()
+        try:
+            loop.run_until_complete(self.serve())
+        finally:
+            loop.close()
+            self._pool.close()
+
+        log.info('All schedules ended')
+
+    async def serve(self):
+        """
+        Serve the schedules of all the pipelines in the running event loop
+        until all of them end.
+
+        The schedules are independent, so the runs of different pipelines
+        are executed at the same time.
+        """
+        results = await gather(
+            *(
+                scheduler_.serve()
+                for scheduler_ in self._schedulers.values()
+            ),
+            return_exceptions=True
+        )
+
+        for name, result in zip(self._schedulers, results):
+            if isinstance(result, Exception):
+                log.error(
+                    'Pipeline {} failed and its schedule was stopped: '
+                    '{}'.format(name, result)
+                )
+
+
+__all__ = ['Daemon']
@@ -0,0 +1,794 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2018 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Storage of the journals of the executions of pipelines.
+
+Three backends are available:
+
+``files``
+    Each journal is written to its own JSON file. This is the default.
+
+``jsonl``
+    Journals are appended, one per line, to a JSON Lines file that is rotated
+    when it grows above a maximum size.
+
+``sqlite``
+    Journals are appended to a SQLite database in WAL mode, with the
+    executions of the components indexed by pipeline and time so they can be
+    queried without reading every journal.
+
+All backends can report statistics of the executions of the components over
+a time window, see :meth:`JournalStore.statistics`.
+"""
+
+from time import time
+from os import getpid, fstat
+from pathlib import Path
+from fcntl import flock, LOCK_EX
+from contextlib import closing
+from collections import OrderedDict
+from tempfile import NamedTemporaryFile, gettempdir
+
+from ujson import dumps, loads
+
+from .logging import get_logger
+
+
+log = get_logger(__name__)
+
+
+BACKENDS = ('files', 'jsonl', 'sqlite')
+
+STAGES = ('sources', 'aggregators', 'sinks')
+
+FAILED = (
+    'crashed', 'killed', 'hanged', 'timed out', 'oom-limited', 'cpu-limited',
+)
+"""
+Status of the executions of the components that are considered failures.
+"""
+
+
+def percentile(values, rank):
+    """
+    Compute a percentile of a list of values, interpolating linearly between
+    the closest ranks.
+
+    :param list values: Sorted list of values.
+    :param float rank: Percentile to compute, between 0 and 100.
+
+    :return: The percentile, or ``None`` if no values.
+    :rtype: float
+    """
+    if not values:
+        return None
+
+    position = (len(values) - 1) * rank / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+
+    return values[lower] + (values[upper] - values[lower]) * (
+        position - lower
+    )
+
+
+def executions(journal):
+    """
+    Iterate the executions of the components registered in a journal.
+
+    :param dict journal: The journal of an execution of a pipeline.
+
+    :return: An iterator of tuples with the stage, the identifier of the
+     component, its status, duration and payload size.
+    """
+    for stage in STAGES:
+        for entry in journal.get(stage, ()):
+            yield (
+                stage,
+                entry['id'],
+                entry['status'],
+                entry['duration'],
+                entry.get('payload', None),
+            )
+
+
+class JournalStore:
+    """
+    Base class of the backends to store journals.
+
+    :param str location: Directory or file to store the journals in.
+    :param int max_age: Time in seconds after which a journal is discarded.
+     ``None`` means no limit.
+    """
+
+    def __init__(self, location, max_age=None):
+        self.location = Path(location)
+        self._max_age = max_age
+
+    def save(self, pipeline, journal):
+        """
+        Store the journal of an execution of a pipeline and discard the
+        journals beyond the retention limits.
+
+        :param str pipeline: Name of the pipeline.
+        :param dict journal: The journal of the execution.
+
+        :return: Location where the journal was stored, for logging.
+        :rtype: str
+        """
+        raise NotImplementedError()
+
+    def journals(self, pipeline=None, since=None, until=None):
+        """
+        Iterate the journals stored, oldest first.
+
+        :param str pipeline: Only the journals of the pipeline with this name.
+         ``None`` for all the pipelines.
+        :param float since: Only the journals saved at or after this
+         timestamp.
+        :param float until: Only the journals saved before this timestamp.
+
+        :return: An iterator of tuples with the name of the pipeline, or
+         ``None`` if unknown, the timestamp the journal was saved at and the
+         journal.
+        """
+        raise NotImplementedError()
+
+    def recent(self, pipeline, count):
+        """
+        Get the most recent journals of a pipeline.
+
+        :param str pipeline: Name of the pipeline.
+        :param int count: Maximum number of journals to get.
+
+        :return: A list of journals, oldest first.
+        :rtype: list
+        """
+        return [
+            journal for _, _, journal in self.journals(pipeline=pipeline)
+        ][-count:]
+
+    def executions(self, pipeline=None, since=None, until=None):
+        """
+        Iterate the executions of the components registered in the journals
+        stored.
+
+        :param str pipeline: Only the executions of the pipeline with this
+         name. ``None`` for all the pipelines.
+        :param float since: Only the executions saved at or after this
+         timestamp.
+        :param float until: Only the executions saved before this timestamp.
+
+        :return: An iterator of tuples with the stage, the identifier of the
+         component, its status, duration and payload size.
+        """
+        for _, _, journal in self.journals(
+            pipeline=pipeline, since=since, until=until
+        ):
+            yield from executions(journal)
+
+    def statistics(self, pipeline=None, since=None, until=None):
+        """
+        Compute statistics of the executions of each component.
+
+        :param str pipeline: Only the executions of the pipeline with this
+         name. ``None`` for all the pipelines.
+        :param float since: Only the executions saved at or after this
+         timestamp.
+        :param float until: Only the executions saved before this timestamp.
+
+        :return: A mapping of a tuple with the stage and identifier of each
+         component to a dictionary with the number of executions, the
+         failure rate, the 50th, 95th and 99th percentiles of the duration,
+         and the 50th percentile and maximum of the payload size.
+        :rtype: OrderedDict
+        """
+        collected = OrderedDict()
+
+        for stage, component, status, duration, payload in self.executions(
+            pipeline=pipeline, since=since, until=until
+        ):
+            durations, payloads, statuses = collected.setdefault(
+                (stage, component), ([], [], [])
+            )
+            statuses.append(status)
+            if duration is not None:
+                durations.append(duration)
+            if payload is not None:
+                payloads.append(payload)
+
+        statistics = OrderedDict()
+
+        for key in sorted(
+            collected, key=lambda key: (STAGES.index(key[0]), key[1])
+        ):
+            durations, payloads, statuses = collected[key]
+            durations.sort()
+            payloads.sort()
+
+            failed = sum(1 for status in statuses if status in FAILED)
+
+            statistics[key] = OrderedDict((
+                ('executions', len(statuses)),
+                ('failure_rate', failed / len(statuses)),
+                ('p50', percentile(durations, 50)),
+                ('p95', percentile(durations, 95)),
+                ('p99', percentile(durations, 99)),
+                ('payload_p50', percentile(payloads, 50)),
+                ('payload_max', payloads[-1] if payloads else None),
+            ))
+
+        return statistics
+
+
+class FilesStore(JournalStore):
+    """
+    Store each journal in its own JSON file.
+
+    The files are named after the pipeline, the PID of the process that saved
+    them and a random suffix. Files saved without the name of the pipeline
+    are only considered when querying the journals of all the pipelines.
+
+    :param str location: Directory to store the journals in.
+    :param int max_age: Time in seconds after which a journal is discarded.
+     ``None`` means no limit.
+    :param int max_runs: Maximum number of journals to keep for each
+     pipeline. ``None`` means no limit.
+    """
+
+    def __init__(self, location, max_age=None, max_runs=None):
+        super().__init__(location, max_age=max_age)
+        self._max_runs = max_runs
+
+    def save(self, pipeline, journal):
+        self.location.mkdir(parents=True, exist_ok=True)
+
+        with NamedTemporaryFile(
+            mode='wt',
+            encoding='utf-8',
+            prefix='journal-{}-{}-'.format(pipeline, getpid()),
+            suffix='.json',
+            dir=str(self.location),
+            delete=False
+        ) as jfd:
+            jfd.write(dumps(journal, indent=4, ensure_ascii=False))
+
+        self._prune(pipeline)
+        return jfd.name
+
+    def _files(self, pipeline=None):
+        """
+        List the journal files, oldest first.
+
+        :param str pipeline: Only the files of the pipeline with this name.
+         ``None`` for the files of all the pipelines.
+
+        :return: A list of tuples with the modification time, path and name
+         of the pipeline, or ``None`` if unknown, of each journal file.
+        :rtype: list
+        """
+        if not self.location.is_dir():
+            return []
+
+        files = []
+        for path in self.location.glob('journal-*.json'):
+            # journal-<pipeline>-<pid>-<random>.json, the random suffix
+            # doesn't contain dashes
+            parts = path.stem[len('journal-'):].rsplit('-', 2)
+            name = parts[0] if len(parts) == 3 else None
+
+            if pipeline is not None and name != pipeline:
+                continue
+
+            try:
+                files.append((path.stat().st_mtime, path, name))
+            except FileNotFoundError:
+                continue
+
+        return sorted(files, key=lambda entry: entry[:2])
+
+    def _read(self, path):
+        """
+        Read a journal file.
+
+        :param path: Path to the journal file.
+        :type path: :py:class:`pathlib.Path`
+
+        :return: The journal, or ``None`` if it cannot be read.
+        :rtype: dict
+        """
+        try:
+            return loads(path.read_text(encoding='utf-8'))
+        except Exception:
+            log.debug(
+                'Unable to read journal {}'.format(path), exc_info=True
+            )
+            return None
+
+    def _prune(self, pipeline):
+        if self._max_age is None and self._max_runs is None:
+            return
+
+        files = self._files(pipeline)
+        expired = []
+
+        if self._max_age is not None:
+            now = time()
+            expired = [
+                path for mtime, path, _ in files
+                if now - mtime > self._max_age
+            ]
+
+        if self._max_runs is not None and len(files) > self._max_runs:
+            expired.extend(
+                path for _, path, _ in files[:len(files) - self._max_runs]
+            )
+
+        for path in set(expired):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def journals(self, pipeline=None, since=None, until=None):
+        for mtime, path, name in self._files(pipeline):
+            if since is not None and mtime < since:
+                continue
+            if until is not None and mtime >= until:
+                continue
+
+            journal = self._read(path)
+            if journal is None:
+                continue
+
+            yield name, mtime, journal
+
+    def recent(self, pipeline, count):
+        recent = []
+
+        # Read only the newest files
+        for _, path, _ in reversed(self._files(pipeline)):
+            if len(recent) >= count:
+                break
+
+            journal = self._read(path)
+            if journal is not None:
+                recent.append(journal)
+
+        return list(reversed(recent))
+
+
+class JSONLStore(JournalStore):
+    """
+    Append the journals to a JSON Lines file.
+
+    The file is named ``journal.jsonl``. When it grows above the maximum size
+    it is rotated to ``journal.jsonl.1``, the previous ``journal.jsonl.1`` to
+    ``journal.jsonl.2``, and so on, discarding the oldest files.
+
+    :param str location: Directory to store the journals in.
+    :param int max_age: Time in seconds after which a rotated file is
+     discarded. ``None`` means no limit.
+    :param int max_size: Size, in megabytes, above which the file is rotated.
+    :param int max_files: Number of rotated files to keep.
+    """
+
+    def __init__(self, location, max_age=None, max_size=10, max_files=5):
+        super().__init__(location, max_age=max_age)
+        self._max_size = max_size * 1024 * 1024
+        self._max_files = max_files
+        self._path = self.location / 'journal.jsonl'
+
+    def _rotated(self, index):
+        return self.location / 'journal.jsonl.{}'.format(index)
+
+    def save(self, pipeline, journal):
+        self.location.mkdir(parents=True, exist_ok=True)
+
+        line = dumps({
+            'pipeline': pipeline,
+            'timestamp': time(),
+            'journal': journal,
+        }, ensure_ascii=False) + '\n'
+
+        # The lock serializes the writers of the file, including the one that
+        # rotates it
+        with self._path.open('a', encoding='utf-8') as jfd:
+            flock(jfd, LOCK_EX)
+
+            # The file was rotated while waiting for the lock
+            try:
+                inode = self._path.stat().st_ino
+            except FileNotFoundError:
+                inode = None
+
+            if inode != fstat(jfd.fileno()).st_ino:
+                return self.save(pipeline, journal)
+
+            jfd.write(line)
+            jfd.flush()
+
+            if jfd.tell() > self._max_size:
+                self._rotate()
+
+        return str(self._path)
+
+    def _rotate(self):
+        """
+        Rotate the file and discard the rotated files beyond the retention
+        limits.
+
+        Must be called with the lock of the file held.
+        """
+        log.debug('Rotating journal {}'.format(self._path))
+
+        for index in range(self._max_files, 0, -1):
+            rotated = self._rotated(index)
+            if not rotated.exists():
+                continue
+
+            if index == self._max_files:
+                rotated.unlink()
+                continue
+
+            rotated.replace(self._rotated(index + 1))
+
+        if self._max_files > 0:
+            self._path.replace(self._rotated(1))
+        else:
+            self._path.unlink()
+
+        if self._max_age is None:
+            return
+
+        now = time()
+        for index in range(1, self._max_files + 1):
+            rotated = self._rotated(index)
+            try:
+                if now - rotated.stat().st_mtime > self._max_age:
+                    rotated.unlink()
+            except FileNotFoundError:
+                continue
+
+    def journals(self, pipeline=None, since=None, until=None):
+        paths = [
+            self._rotated(index)
+            for index in range(self._max_files, 0, -1)
+        ] + [self._path]
+
+        for path in paths:
+            # Rotated files entirely before the window are skipped
+            try:
+                if since is not None and path.stat().st_mtime < since:
+                    continue
+                jfd = path.open('r', encoding='utf-8')
+            except FileNotFoundError:
+                continue
+
+            with jfd:
+                for line in jfd:
+                    try:
+                        record = loads(line)
+                    except Exception:
+                        log.debug(
+                            'Unable to read journal line in {}'.format(path),
+                            exc_info=True
+                        )
+                        continue
+
+                    timestamp = record['timestamp']
+
+                    if pipeline not in (None, record['pipeline']):
+                        continue
+                    if since is not None and timestamp < since:
+                        continue
+                    if until is not None and timestamp >= until:
+                        continue
+
+                    yield record['pipeline'], timestamp, record['journal']
+
+
+class SQLiteStore(JournalStore):
+    """
+    Append the journals to a SQLite database in WAL mode.
+
+    Besides the journals, the executions of the components are stored in
+    their own table indexed by pipeline and time.
+
+    :param str location: Path to the database file.
+    :param int max_age: Time in seconds after which a journal is discarded.
+     ``None`` means no limit.
+    :param int max_runs: Maximum number of journals to keep for each
+     pipeline. ``None`` means no limit.
+    """
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS runs ('
+        ' id INTEGER PRIMARY KEY,'
+        ' pipeline TEXT NOT NULL,'
+        ' timestamp REAL NOT NULL,'
+        ' journal TEXT NOT NULL'
+        ')',
+        'CREATE INDEX IF NOT EXISTS runs_pipeline_timestamp'
+        ' ON runs (pipeline, timestamp)',
+        'CREATE TABLE IF NOT EXISTS executions ('
+        ' run INTEGER NOT NULL,'
+        ' pipeline TEXT NOT NULL,'
+        ' timestamp REAL NOT NULL,'
+        ' stage TEXT NOT NULL,'
+        ' component TEXT NOT NULL,'
+        ' status TEXT NOT NULL,'
+        ' duration REAL,'
+        ' payload INTEGER'
+        ')',
+        'CREATE INDEX IF NOT EXISTS executions_pipeline_timestamp'
+        ' ON executions (pipeline, timestamp)',
+        'CREATE INDEX IF NOT EXISTS executions_run ON executions (run)',
+    )
+
+    def __init__(self, location, max_age=None, max_runs=None):
+        super().__init__(location, max_age=max_age)
+        self._max_runs = max_runs
+        self._initialized = False
+
+    def _connect(self):
+        """
+        Open a connection to the database.
+
+        A new connection is opened for each operation, so the store can be
+        used from forked processes and threads.
+
+        :return: The connection.
+        :rtype: :py:class:`sqlite3.Connection`
+        """
+        from sqlite3 import connect
+
+        if not self._initialized:
+            self.location.parent.mkdir(parents=True, exist_ok=True)
+
+        connection = connect(str(self.location), timeout=30)
+
+        if not self._initialized:
+            connection.execute('PRAGMA journal_mode=WAL')
+            with connection:
+                for statement in self.SCHEMA:
+                    connection.execute(statement)
+            self._initialized = True
+
+        return connection
+
+    def save(self, pipeline, journal):
+        timestamp = time()
+
+        with closing(self._connect()) as connection, connection:
+            cursor = connection.execute(
+                'INSERT INTO runs (pipeline, timestamp, journal)'
+                ' VALUES (?, ?, ?)',
+                (pipeline, timestamp, dumps(journal, ensure_ascii=False)),
+            )
+            run = cursor.lastrowid
+
+            connection.executemany(
+                'INSERT INTO executions (run, pipeline, timestamp, stage,'
+                ' component, status, duration, payload)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [
+                    (run, pipeline, timestamp) + execution
+                    for execution in executions(journal)
+                ],
+            )
+
+            self._prune(connection, pipeline, timestamp)
+
+        return '{}#{}'.format(self.location, run)
+
+    def _prune(self, connection, pipeline, now):
+        """
+        Discard the journals beyond the retention limits.
+
+        :param connection: Connection to the database, in a transaction.
+        :param str pipeline: Name of the pipeline whose journals to prune.
+        :param float now: Current timestamp.
+        """
+        expired = []
+
+        if self._max_age is not None:
+            expired.extend(row[0] for row in connection.execute(
+                'SELECT id FROM runs WHERE timestamp < ?',
+                (now - self._max_age, ),
+            ))
+
+        if self._max_runs is not None:
+            expired.extend(row[0] for row in connection.execute(
+                'SELECT id FROM runs WHERE pipeline = ?'
+                ' ORDER BY timestamp DESC LIMIT -1 OFFSET ?',
+                (pipeline, self._max_runs),
+            ))
+
+        if not expired:
+            return
+
+        expired = [(run, ) for run in set(expired)]
+        connection.executemany('DELETE FROM executions WHERE run = ?', expired)
+        connection.executemany('DELETE FROM runs WHERE id = ?', expired)
+
+    def _where(self, pipeline, since, until):
+        clauses = []
+        parameters = []
+
+        for clause, value in (
+            ('pipeline = ?', pipeline),
+            ('timestamp >= ?', since),
+            ('timestamp < ?', until),
+        ):
+            if value is not None:
+                clauses.append(clause)
+                parameters.append(value)
+
+        if not clauses:
+            return '', parameters
+
+        return ' WHERE {}'.format(' AND '.join(clauses)), parameters
+
+    def journals(self, pipeline=None, since=None, until=None):
+        if not self.location.is_file():
+            return
+
+        where, parameters = self._where(pipeline, since, until)
+
+        with closing(self._connect()) as connection:
+            for name, timestamp, journal in connection.execute(
+                'SELECT pipeline, timestamp, journal FROM runs{}'
+                ' ORDER BY timestamp'.format(where),
+                parameters,
+            ):
+                yield name, timestamp, loads(journal)
+
+    def recent(self, pipeline, count):
+        if not self.location.is_file():
+            return []
+
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                'SELECT journal FROM runs WHERE pipeline = ?'
+                ' ORDER BY timestamp DESC LIMIT ?',
+                (pipeline, count),
+            ).fetchall()
+
+        return [loads(journal) for journal, in reversed(rows)]
+
+    def executions(self, pipeline=None, since=None, until=None):
+        if not self.location.is_file():
+            return
+
+        where, parameters = self._where(pipeline, since, until)
+
+        with closing(self._connect()) as connection:
+            yield from connection.execute(
+                'SELECT stage, component, status, duration, payload'
+                ' FROM executions{} ORDER BY timestamp'.format(where),
+                parameters,
+            )
+
+
+def format_statistics(statistics):
+    """
+    Format the statistics of the executions of the components as a table.
+
+    :param dict statistics: Statistics as returned by
+     :meth:`JournalStore.statistics`.
+
+    :return: The table.
+    :rtype: str
+    """
+    if not statistics:
+        return 'No executions found'
+
+    def seconds(value):
+        return '-' if value is None else '{:.3f}s'.format(value)
+
+    def size(value):
+        if value is None:
+            return '-'
+        for unit in ('B', 'KiB', 'MiB'):
+            if value < 1024:
+                return '{:.0f}{}'.format(value, unit)
+            value /= 1024
+        return '{:.1f}GiB'.format(value)
+
+    rows = [(
+        'STAGE', 'COMPONENT', 'RUNS', 'FAILED',
+        'P50', 'P95', 'P99', 'PAYLOAD P50', 'PAYLOAD MAX',
+    )]
+    for (stage, component), values in statistics.items():
+        rows.append((
+            stage,
+            component,
+            str(values['executions']),
+            '{:.1%}'.format(values['failure_rate']),
+            seconds(values['p50']),
+            seconds(values['p95']),
+            seconds(values['p99']),
+            size(values['payload_p50']),
+            size(values['payload_max']),
+        ))
+
+    widths = [max(map(len, column)) for column in zip(*rows)]
+
+    return '\n'.join(
+        '  '.join(
+            cell.ljust(width) if index < 2 else cell.rjust(width)
+            for index, (cell, width) in enumerate(zip(row, widths))
+        ).rstrip()
+        for row in rows
+    )
+
+
+def create_store(
+        backend, location=None, app='flowbber',
+        max_age=None, max_runs=None, max_size=10, max_files=5):
+    """
+    Create the store of a journal backend.
+
+    :param str backend: Name of the backend, one of :data:`BACKENDS`.
+    :param str location: Directory to store the journals in. The ``sqlite``
+     backend creates the database ``journal.sqlite`` in it. If ``None``, a
+     directory named after the application in the temporal directory is
+     used.
+    :param str app: Name of the application saving the journals.
+    :param int max_age: Time in seconds after which a journal is discarded.
+     ``None`` means no limit.
+    :param int max_runs: Maximum number of journals to keep. Ignored by the
+     ``jsonl`` backend. ``None`` means no limit.
+    :param int max_size: Size, in megabytes, above which the file of the
+     ``jsonl`` backend is rotated.
+    :param int max_files: Number of rotated files the ``jsonl`` backend keeps.
+
+    :return: The store.
+    :rtype: :class:`JournalStore`
+    """
+    if location is None:
+        location = Path(gettempdir()) / '{}-journals'.format(app)
+    location = Path(location)
+
+    if backend == 'files':
+        return FilesStore(location, max_age=max_age, max_runs=max_runs)
+
+    if backend == 'jsonl':
+        return JSONLStore(
+            location, max_age=max_age,
+            max_size=max_size, max_files=max_files,
+        )
+
+    if backend == 'sqlite':
+        return SQLiteStore(
+            location / 'journal.sqlite', max_age=max_age, max_runs=max_runs,
+        )
+
+    raise ValueError('Unknown journal backend "{}"'.format(backend))
+
+
+__all__ = [
+    'BACKENDS',
+    'JournalStore',
+    'FilesStore',
+    'JSONLStore',
+    'SQLiteStore',
+    'create_store',
+    'format_statistics',
+]
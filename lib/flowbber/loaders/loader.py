@@ -49,6 +49,9 @@ class PluginLoader(object):
     _base_class = None
     _locally_registered = None
 
+    # Plugins discovered from the entry points, shared by all loaders
+    _discovered = {}
+
     def __init__(self, component, api_version='1.0'):
         super().__init__()
 
@@ -110,7 +113,9 @@ class PluginLoader(object):
         This function lists all available plugins by discovering installed
         plugins registered in the entry point. This can be costly or error
         prone if a plugin misbehave. Because of this a cache is stored after
-        the first call.
+        the first call. The plugins discovered from the entry points are
+        cached for all the loaders, so creating several pipelines in the same
+        process discovers them only once.
 
         :param bool cache: If ``True`` return the cached result. If ``False``
          force reload of all plugins registered for the entry point.
@@ -128,6 +133,32 @@ class PluginLoader(object):
         # Add built-in plugin types
         available = OrderedDict()
 
+        discovered = PluginLoader._discovered.get(self.entrypoint, None)
+        if cache and discovered is not None:
+            available.update(discovered)
+        else:
+            available.update(self._discover())
+            PluginLoader._discovered[self.entrypoint] = copy(available)
+
+        # Load locally registered
+        available.update(
+            self.__class__._locally_registered
+        )
+
+        # Save cache and return
+        self._plugins_cache = available
+        return copy(self._plugins_cache)
+
+    def _discover(self):
+        """
+        Discover the plugins installed for the entry point.
+
+        :return: An ordered dictionary associating the name of the plugin and
+         the class implementing it.
+        :rtype: OrderedDict
+        """
+        available = OrderedDict()
+
         # Iterate over entry points
         log.debug('Loading entrypoint {}'.format(self.entrypoint))
 
@@ -158,14 +189,7 @@ class PluginLoader(object):
 
             available[name] = plugin
 
-        # Load locally registered
-        available.update(
-            self.__class__._locally_registered
-        )
-
-        # Save cache and return
-        self._plugins_cache = available
-        return copy(self._plugins_cache)
+        return available
 
 
 __all__ = ['PluginLoader']
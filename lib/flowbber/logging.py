@@ -234,6 +234,22 @@ class LoggingManager:
         self._log_queue.put_nowait(None)
         self._log_subprocess.join()
 
+    def backlog(self):
+        """
+        Get the number of records waiting in the logging queue.
+
+        :return: The approximate number of records waiting, or None if
+         unknown.
+        :rtype: int
+        """
+        if self._log_queue is None:
+            return None
+
+        try:
+            return self._log_queue.qsize()
+        except NotImplementedError:
+            return None
+
     def enqueue_print(self, obj, fd='stdout'):
         """
         Enqueue a print to the given fd.
@@ -255,6 +271,11 @@ def setup_logging(verbosity=0):
     _INSTANCE.setup_logging(verbosity=verbosity)
 
 
+@wraps(_INSTANCE.backlog)
+def get_backlog():
+    return _INSTANCE.backlog()
+
+
 @wraps(_INSTANCE.enqueue_print)
 def print(string, fd='stdout'):
     _INSTANCE.enqueue_print(string, fd=fd)
@@ -272,4 +293,4 @@ def get_logger(name):
     return logging.getLogger(name)
 
 
-__all__ = ['setup_logging', 'print', 'get_logger']
+__all__ = ['setup_logging', 'print', 'get_logger', 'get_backlog']
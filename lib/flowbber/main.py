@@ -19,9 +19,14 @@
 Application entry point module.
 """
 
+from time import time
 from os import getpid
 
+from ujson import dumps
+
+from .daemon import Daemon
 from .pipeline import Pipeline
+from .journal import create_store, format_statistics
 from .logging import get_logger
 from .scheduler import Scheduler
 from .inputs import load_pipeline
@@ -41,6 +46,14 @@ def main(args):
     :return: Exit code.
     :rtype: int
     """
+    command = getattr(args, 'command', 'run')
+
+    if command == 'journal':
+        return report_journal(args)
+
+    if command == 'daemon':
+        return run_daemon(args)
+
     log.info('flowbber PID {} starting ...'.format(
         getpid()
     ))
@@ -55,8 +68,18 @@ def main(args):
     ))
     load_configuration(args.pipeline.parent)
 
+    # Profiling requested from the command line
+    execution = dict(pipeline_definition['execution'])
+    profile = getattr(args, 'profile', None)
+    if profile is not None:
+        execution['profile'] = profile
+
     log.info('Creating pipeline ...')
-    pipeline = Pipeline(pipeline_definition, args.pipeline.stem)
+    pipeline = Pipeline(
+        pipeline_definition,
+        args.pipeline.stem,
+        **execution
+    )
 
     # Check if scheduling was configured
     schedule = pipeline_definition.get('schedule', None)
@@ -76,10 +99,18 @@ def main(args):
 
     scheduler = Scheduler(
         pipeline,
-        schedule['frequency'],
+        schedule.get('frequency', None),
         samples=schedule['samples'],
         start=schedule['start'],
         stop_on_failure=schedule['stop_on_failure'],
+        metrics_file=schedule['metrics_file'],
+        max_in_flight=schedule['max_in_flight'],
+        cron=schedule.get('cron', None),
+        jitter=schedule['jitter'],
+        catch_up=schedule['catch_up'],
+        batch=schedule['batch'],
+        batch_interval=schedule['batch_interval'],
+        shed_after=schedule['shed_after'],
     )
 
     # Everything is ready, do not run if dry run
@@ -91,4 +122,74 @@ def main(args):
     return 0
 
 
+def run_daemon(args):
+    """
+    Run the schedules of many pipelines in a single process.
+
+    :param args: An arguments namespace.
+    :type args: :py:class:`argparse.Namespace`
+
+    :return: Exit code.
+    :rtype: int
+    """
+    log.info('flowbber daemon PID {} starting ...'.format(
+        getpid()
+    ))
+
+    daemon = Daemon(
+        args.pipelines,
+        workers=args.workers,
+        pool_max_runs=args.pool_max_runs,
+        pool_max_rss=args.pool_max_rss,
+    )
+
+    # Everything is ready, do not run if dry run
+    if args.dry_run:
+        log.info('Dry run complete! Exiting ...')
+        return 0
+
+    daemon.run()
+    return 0
+
+
+def report_journal(args):
+    """
+    Report statistics of the executions of the components of a pipeline from
+    its saved journals.
+
+    :param args: An arguments namespace.
+    :type args: :py:class:`argparse.Namespace`
+
+    :return: Exit code.
+    :rtype: int
+    """
+    pipeline_definition = load_pipeline(args.pipeline)
+    execution = pipeline_definition['execution']
+
+    store = create_store(
+        execution['journal'], execution['journal_dir'],
+        max_age=execution['journal_max_age'],
+        max_runs=execution['journal_max_runs'],
+        max_size=execution['journal_max_size'],
+        max_files=execution['journal_max_files'],
+    )
+
+    now = time()
+    statistics = store.statistics(
+        pipeline=None if args.all_pipelines else args.pipeline.stem,
+        since=now - args.since,
+        until=None if args.until is None else now - args.until,
+    )
+
+    if args.json:
+        print(dumps([
+            dict(stage=stage, component=component, **values)
+            for (stage, component), values in statistics.items()
+        ], indent=4))
+        return 0
+
+    print(format_statistics(statistics))
+    return 0
+
+
 __all__ = ['main']
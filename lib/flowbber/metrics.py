@@ -0,0 +1,447 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2018 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Metrics about the executions of a pipeline.
+
+The metrics are written in the Prometheus text exposition format, so the file
+can be collected by the textfile collector of the Prometheus node exporter.
+The file is replaced atomically so a collector never reads it half written.
+"""
+
+from time import time
+from pathlib import Path
+from tempfile import mkstemp
+from os import replace, unlink, chmod
+from collections import OrderedDict
+
+from .logging import get_logger
+
+
+log = get_logger(__name__)
+
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0,
+)
+"""
+Upper bounds, in seconds, of the buckets of the duration histograms.
+"""
+
+PAYLOAD_BUCKETS = tuple(1024 * 4 ** exponent for exponent in range(10))
+"""
+Upper bounds, in bytes, of the buckets of the payload histograms, from 1 KiB
+to 256 MiB.
+"""
+
+
+def escape(value):
+    """
+    Escape the value of a label.
+
+    :param str value: The value to escape.
+
+    :return: The value with backslashes, double quotes and new lines escaped.
+    :rtype: str
+    """
+    return str(value).replace(
+        '\\', '\\\\'
+    ).replace(
+        '"', '\\"'
+    ).replace(
+        '\n', '\\n'
+    )
+
+
+def format_labels(labels):
+    """
+    Format a set of labels.
+
+    :param labels: Sequence of tuples with the name and value of each label.
+
+    :return: The labels between braces, or an empty string if no labels.
+    :rtype: str
+    """
+    if not labels:
+        return ''
+
+    return '{{{}}}'.format(','.join(
+        '{}="{}"'.format(name, escape(value)) for name, value in labels
+    ))
+
+
+def format_value(value):
+    """
+    Format the value of a sample.
+
+    :param value: The value to format.
+
+    :return: The value formatted.
+    :rtype: str
+    """
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """
+    Base class of all metrics.
+
+    Each metric holds one series for each set of labels it was updated with.
+
+    :param str name: Name of the metric.
+    :param str help_: Description of the metric.
+    """
+
+    type_ = None
+
+    def __init__(self, name, help_):
+        self.name = name
+        self.help = help_
+        self._series = OrderedDict()
+
+    def _key(self, labels):
+        return tuple(sorted(labels.items()))
+
+    def samples(self):
+        """
+        Samples of all the series of this metric.
+
+        :return: An iterator of tuples with the name of the sample, its
+         labels and its value.
+        """
+        raise NotImplementedError()
+
+    def render(self):
+        """
+        Render this metric in the text exposition format.
+
+        :return: The lines of this metric.
+        :rtype: list
+        """
+        lines = [
+            '# HELP {} {}'.format(self.name, self.help),
+            '# TYPE {} {}'.format(self.name, self.type_),
+        ]
+        lines.extend(
+            '{}{} {}'.format(name, format_labels(labels), format_value(value))
+            for name, labels, value in self.samples()
+        )
+        return lines
+
+
+class Counter(Metric):
+    """
+    Metric whose value only goes up.
+    """
+
+    type_ = 'counter'
+
+    def inc(self, amount=1, **labels):
+        """
+        Increment the counter.
+
+        :param amount: The amount to increment the counter by.
+        :param labels: Labels of the series to increment.
+        """
+        key = self._key(labels)
+        self._series[key] = self._series.get(key, 0) + amount
+
+    def samples(self):
+        for key, value in self._series.items():
+            yield self.name, key, value
+
+
+class Gauge(Metric):
+    """
+    Metric whose value can go up and down.
+    """
+
+    type_ = 'gauge'
+
+    def set(self, value, **labels):
+        """
+        Set the value of the gauge.
+
+        :param value: The value to set.
+        :param labels: Labels of the series to set.
+        """
+        self._series[self._key(labels)] = value
+
+    def samples(self):
+        for key, value in self._series.items():
+            yield self.name, key, value
+
+
+class Histogram(Metric):
+    """
+    Metric that counts observations in cumulative buckets.
+
+    :param str name: Name of the metric.
+    :param str help_: Description of the metric.
+    :param tuple buckets: Upper bounds of the buckets, in increasing order.
+    """
+
+    type_ = 'histogram'
+
+    def __init__(self, name, help_, buckets):
+        super().__init__(name, help_)
+        self._buckets = tuple(buckets) + (float('inf'), )
+
+    def observe(self, value, **labels):
+        """
+        Observe a value.
+
+        :param value: The value observed.
+        :param labels: Labels of the series to observe the value in.
+        """
+        series = self._series.setdefault(
+            self._key(labels), [[0] * len(self._buckets), 0, 0]
+        )
+
+        counts = series[0]
+        for index, bound in enumerate(self._buckets):
+            if value <= bound:
+                counts[index] += 1
+
+        series[1] += value
+        series[2] += 1
+
+    def get(self, **labels):
+        """
+        Get the observations of a series.
+
+        :param labels: Labels of the series.
+
+        :return: A tuple with a list of tuples with the upper bound and the
+         cumulative count of each bucket, the sum and the count of the
+         observations.
+        :rtype: tuple
+        """
+        counts, total, count = self._series.get(
+            self._key(labels), [[0] * len(self._buckets), 0, 0]
+        )
+        return list(zip(self._buckets, counts)), total, count
+
+    def samples(self):
+        for key, (counts, total, count) in self._series.items():
+            for bound, bucket in zip(self._buckets, counts):
+                yield (
+                    '{}_bucket'.format(self.name),
+                    key + (('le', format_value(bound)), ),
+                    bucket,
+                )
+            yield '{}_sum'.format(self.name), key, total
+            yield '{}_count'.format(self.name), key, count
+
+
+class PipelineMetrics:
+    """
+    Metrics about the executions of a pipeline.
+
+    :param str pipeline: Name of the pipeline, set as the ``pipeline`` label
+     of all the metrics.
+    """
+
+    def __init__(self, pipeline):
+        self._pipeline = pipeline
+
+        self.runs = Counter(
+            'flowbber_runs_total',
+            'Executions of the pipeline by result.',
+        )
+        self.last_run = Gauge(
+            'flowbber_last_run_timestamp_seconds',
+            'Time the last execution of the pipeline ended.',
+        )
+        self.runs_overlapped = Counter(
+            'flowbber_runs_overlapped_total',
+            'Executions of the pipeline started while others were in flight.',
+        )
+        self.runs_shed = Counter(
+            'flowbber_runs_shed_total',
+            'Executions of the pipeline with the components that can be shed '
+            'first left out.',
+        )
+        self.lateness = Histogram(
+            'flowbber_schedule_lateness_seconds',
+            'Delay of the executions of the pipeline after their schedule.',
+            DURATION_BUCKETS,
+        )
+        self.run_duration = Histogram(
+            'flowbber_run_duration_seconds',
+            'Wall time of the successful executions of the pipeline.',
+            DURATION_BUCKETS,
+        )
+        self.stage_duration = Histogram(
+            'flowbber_stage_duration_seconds',
+            'Wall time of the stages of the pipeline.',
+            DURATION_BUCKETS,
+        )
+        self.component_executions = Counter(
+            'flowbber_component_executions_total',
+            'Executions of the components by status.',
+        )
+        self.component_duration = Histogram(
+            'flowbber_component_duration_seconds',
+            'Duration of the executions of the components.',
+            DURATION_BUCKETS,
+        )
+        self.component_payload = Histogram(
+            'flowbber_component_payload_bytes',
+            'Size of the serialized results of the components.',
+            PAYLOAD_BUCKETS,
+        )
+
+        self._metrics = [
+            self.runs,
+            self.last_run,
+            self.runs_overlapped,
+            self.runs_shed,
+            self.lateness,
+            self.run_duration,
+            self.stage_duration,
+            self.component_executions,
+            self.component_duration,
+            self.component_payload,
+        ]
+
+    def record_run(self, result):
+        """
+        Record a run of the pipeline.
+
+        :param str result: ``passed`` or ``failed`` for an execution of the
+         pipeline, or ``missed`` for an execution that missed its schedule.
+        """
+        self.runs.inc(pipeline=self._pipeline, result=result)
+
+        if result != 'missed':
+            self.last_run.set(time(), pipeline=self._pipeline)
+
+    def record_overlapped(self):
+        """
+        Record an execution of the pipeline started while other executions
+        were in flight.
+        """
+        self.runs_overlapped.inc(pipeline=self._pipeline)
+
+    def record_shed(self):
+        """
+        Record an execution of the pipeline with the components that can be
+        shed first left out.
+        """
+        self.runs_shed.inc(pipeline=self._pipeline)
+
+    def record_lateness(self, lateness):
+        """
+        Record the delay of an execution of the pipeline after its schedule.
+
+        :param float lateness: The delay in seconds.
+        """
+        self.lateness.observe(lateness, pipeline=self._pipeline)
+
+    def record_journal(self, journal):
+        """
+        Record the accounting of a journal of the pipeline.
+
+        :param dict journal: The journal of an execution of the pipeline.
+        """
+        totals = journal.get('totals', {})
+
+        run = totals.get('run', None)
+        if run is not None:
+            self.run_duration.observe(
+                run['elapsed'], pipeline=self._pipeline
+            )
+
+        for stage in ('sources', 'aggregators', 'sinks'):
+            summary = totals.get(stage, None)
+            if summary is not None and summary['elapsed'] is not None:
+                self.stage_duration.observe(
+                    summary['elapsed'], pipeline=self._pipeline, stage=stage,
+                )
+
+            for entry in journal.get(stage, ()):
+                labels = {
+                    'pipeline': self._pipeline,
+                    'stage': stage,
+                    'component': entry['id'],
+                }
+
+                self.component_executions.inc(
+                    status=entry['status'], **labels
+                )
+
+                if entry['duration'] is not None:
+                    self.component_duration.observe(
+                        entry['duration'], **labels
+                    )
+
+                if entry['payload'] is not None:
+                    self.component_payload.observe(
+                        entry['payload'], **labels
+                    )
+
+    def render(self):
+        """
+        Render all the metrics in the text exposition format.
+
+        :return: The text of all the metrics.
+        :rtype: str
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """
+        Write all the metrics to a file, atomically.
+
+        The metrics are written to a temporal file in the same directory that
+        is then renamed to the final path.
+
+        :param str path: Path to the file to write.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        fd, tmp = mkstemp(
+            prefix='.{}.'.format(path.name), suffix='.tmp',
+            dir=str(path.parent),
+        )
+
+        try:
+            with open(fd, 'w', encoding='utf-8') as metricsfd:
+                metricsfd.write(self.render())
+            chmod(tmp, 0o644)
+            replace(tmp, str(path))
+        except Exception:
+            unlink(tmp)
+            raise
+
+        log.debug('Metrics written to {}'.format(path))
+
+
+__all__ = [
+    'Counter',
+    'Gauge',
+    'Histogram',
+    'PipelineMetrics',
+]
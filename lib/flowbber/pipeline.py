@@ -19,16 +19,34 @@
 Base class for Flowbber pipeline.
 """
 
+import sys
+from time import time
 from os import getpid
+from uuid import uuid4
 from pathlib import Path
-from collections import OrderedDict
-from tempfile import NamedTemporaryFile, gettempdir
+from importlib import import_module
+from threading import Thread
+from queue import Queue as ThreadQueue
+from itertools import chain
+from statistics import median
+from collections import OrderedDict, deque
+from tempfile import gettempdir
+from multiprocessing.connection import wait
 
-from ujson import dumps
 from setproctitle import setproctitle
 
 from .logging import get_logger
+from .cache import ResultCache
+from .journal import create_store
 from .components import CrashError, TimeExceededError
+from .components.base import ComponentError
+from .components.pool import WorkerPool
+from .components.executors import AsyncGroup
+from .components.transport import Transport, DEFAULT_THRESHOLD
+from .components.profiler import Profiler
+from .trace import Tracer
+from .components.aggregator import AggregatorChain
+from .components.base import ExecutionInfo
 from .loaders import SourcesLoader, AggregatorsLoader, SinksLoader
 
 
@@ -52,18 +70,130 @@ class Pipeline:
      is used mainly to set the process name and the journals directory.
     :param bool save_journal: Save the journal to a temporal location when the
      pipeline execution ends.
+    :param bool pool: Execute the components in a pool of persistent worker
+     processes instead of forking a new process for each execution.
+    :param int pool_max_runs: Number of executions after which a worker of
+     the pool is recycled. ``None`` means no limit.
+    :param int pool_max_rss: Resident memory ceiling, in megabytes, above
+     which a worker of the pool is recycled. ``None`` means no ceiling.
+    :param int transport_threshold: Size, in bytes, of the serialized result
+     of a component above which the result is sent back through shared
+     memory instead of the result queue. ``None`` means never.
+    :param bool fuse_aggregators: Execute all the aggregators in a single
+     process, passing the data in memory from one aggregator to the next.
+     Ignored if any aggregator declares a CPU affinity, a niceness or
+     resource limits.
+    :param bool preload: Import the modules declared by the components in the
+     pipeline process, so the processes forked to execute the components
+     inherit them already imported.
+    :param bool cache: Reuse the results of the sources that declare their
+     input files while those files don't change.
+    :param str cache_dir: Directory to store the cached results in. If
+     ``None``, a directory named after the application in the temporal
+     directory is used.
+    :param int cache_max_size: Maximum size of the cache, in megabytes.
+     ``None`` means no limit.
+    :param int cache_max_age: Time in seconds after which a cached result
+     that wasn't used is evicted. ``None`` means no limit.
+    :param bool cache_hash: Hash the contents of the input files instead of
+     using their size and modification time to detect changes.
+    :param int max_workers: Maximum number of components running at the same
+     time. ``None`` means no limit.
+    :param int max_workers_sources: Maximum number of sources running at the
+     same time. ``None`` means no limit.
+    :param int max_workers_aggregators: Maximum number of aggregators running
+     at the same time. ``None`` means no limit.
+    :param int max_workers_sinks: Maximum number of sinks running at the same
+     time. ``None`` means no limit.
+    :param bool longest_first: Start first the components expected to take
+     longer, as learned from the durations registered in previous journals.
+    :param int longest_first_history: Number of previous executions to learn
+     the expected duration of the components from.
+    :param str profile: Profile the executions of the components, either
+     ``deterministic`` or ``sampling``. ``None`` means no profiling.
+    :param str profile_dir: Directory to write the profiles to. If ``None``,
+     a directory named after the application in the temporal directory is
+     used.
+    :param bool trace: Write a timeline trace of each run of the pipeline.
+    :param str trace_dir: Directory to write the traces to. If ``None``, a
+     directory named after the application in the temporal directory is
+     used.
+    :param str journal: Backend to save the journals with, either ``files``,
+     ``jsonl`` or ``sqlite``.
+    :param str journal_dir: Directory to save the journals in. If ``None``,
+     a directory named after the application in the temporal directory is
+     used.
+    :param int journal_max_age: Time in seconds after which a saved journal
+     is discarded. ``None`` means no limit.
+    :param int journal_max_runs: Maximum number of journals of the pipeline
+     to keep. Ignored by the ``jsonl`` backend. ``None`` means no limit.
+    :param int journal_max_size: Size, in megabytes, above which the file of
+     the ``jsonl`` backend is rotated.
+    :param int journal_max_files: Number of rotated files the ``jsonl``
+     backend keeps.
+    :param worker_pool: A pool of worker processes shared with other
+     pipelines to execute the components in. If given, the ``pool`` options
+     are ignored.
+    :type worker_pool: :class:`flowbber.components.pool.WorkerPool`
     """
 
-    def __init__(self, pipeline, name, app='flowbber', save_journal=True):
+    def __init__(
+            self, pipeline, name, app='flowbber', save_journal=True,
+            pool=False, pool_max_runs=None, pool_max_rss=None,
+            transport_threshold=DEFAULT_THRESHOLD, fuse_aggregators=False,
+            preload=False, cache=False, cache_dir=None, cache_max_size=None,
+            cache_max_age=None, cache_hash=False, max_workers=None,
+            max_workers_sources=None, max_workers_aggregators=None,
+            max_workers_sinks=None, longest_first=False,
+            longest_first_history=10, profile=None, profile_dir=None,
+            trace=False, trace_dir=None, journal='files', journal_dir=None,
+            journal_max_age=None, journal_max_runs=None, journal_max_size=10,
+            journal_max_files=5, worker_pool=None):
         super().__init__()
 
+        # Arguments to create replicas of this pipeline
+        self._arguments = {
+            key: value for key, value in locals().items()
+            if key not in ('self', 'pipeline', 'name', '__class__')
+        }
+
         self._pipeline = pipeline
         self._name = name
         self._app = app
         self._save_journal = save_journal
 
         self._executed = 0
+        # Distinguishes the files written by the runs of replicas
+        self._uid = uuid4().hex[:8]
         self._data = OrderedDict()
+        self._pool = None
+        self._async_group = None
+        self._chain = None
+        self._graph = None
+        self._streams = OrderedDict()
+        self._cache = None
+        self._cache_keys = {}
+        # Shared with the replicas of the pipeline, keyed by source id
+        self._last_values = {}
+        self._tick = None
+        self._shedding = False
+        self._max_workers = max_workers
+        self._stage_workers = {
+            'source': max_workers_sources,
+            'aggregator': max_workers_aggregators,
+            'sink': max_workers_sinks,
+        }
+        self._durations = None
+        self._profiler = None
+        self._tracer = None
+        self._history = longest_first_history
+        self._journal = create_store(
+            journal, journal_dir, app=app,
+            max_age=journal_max_age,
+            max_runs=journal_max_runs,
+            max_size=journal_max_size,
+            max_files=journal_max_files,
+        )
 
         log.info('Loading plugins ...')
         self._load_plugins()
@@ -71,6 +201,117 @@ class Pipeline:
         log.info('Building pipeline ...')
         self._build_pipeline()
 
+        # Aggregators executed all in the same process, unless any of them
+        # is limited, as the limits would apply to the whole chain
+        aggregators = self._aggregators
+        limited = [
+            aggregator for aggregator in self._aggregators
+            if aggregator.limited
+        ]
+        if fuse_aggregators and limited:
+            log.warning(
+                'Aggregators {} are limited. Aggregators will not be '
+                'fused'.format(', '.join(map(str, limited)))
+            )
+        elif fuse_aggregators and self._aggregators:
+            self._chain = AggregatorChain(self._aggregators)
+            aggregators = [self._chain]
+
+        # Components that declared the data they read and write are scheduled
+        # as soon as their inputs are ready
+        declared = any(
+            component.declared for component in self._aggregators
+        ) or any(
+            component.declared for component in self._sinks
+        )
+        if declared and self._chain is not None:
+            log.warning(
+                'Aggregators are fused. Data read and written by the '
+                'components will be ignored'
+            )
+        elif declared:
+            self._graph = self._build_graph()
+
+        if preload:
+            log.info('Preloading modules ...')
+            self._preload_modules(
+                chain(self._sources, aggregators, self._sinks)
+            )
+
+        self._transport = Transport(threshold=transport_threshold)
+        for component in chain(self._sources, aggregators, self._sinks):
+            component.attach_transport(self._transport)
+
+        if profile is not None:
+            if profile_dir is None:
+                profile_dir = Path(gettempdir()) / '{}-profiles'.format(app)
+
+            log.info('Profiling components to {} ...'.format(profile_dir))
+            self._profiler = Profiler(profile, profile_dir)
+            for component in chain(self._sources, aggregators, self._sinks):
+                component.attach_profiler(self._profiler)
+
+        if trace:
+            if trace_dir is None:
+                trace_dir = Path(gettempdir()) / '{}-traces'.format(app)
+
+            log.info('Tracing runs to {} ...'.format(trace_dir))
+            self._tracer = Tracer(trace_dir)
+
+        # Sources with a coroutine collect() are executed in one event loop,
+        # unless limited, as the limits apply to the whole process
+        grouped = [
+            source for source in self._sources
+            if source.executor == 'process' and source.is_async and
+            not source.limited
+        ]
+        if grouped:
+            self._async_group = AsyncGroup(
+                '{} - async sources'.format(self._app)
+            )
+            for source in grouped:
+                source.attach_group(self._async_group)
+
+        if longest_first:
+            log.info('Learning durations from previous journals ...')
+            self._durations = {}
+            self._learn_history()
+
+        if cache:
+            if cache_dir is None:
+                cache_dir = Path(gettempdir()) / '{}-cache'.format(self._app)
+
+            log.info('Using results cache at {} ...'.format(cache_dir))
+            self._cache = ResultCache(
+                cache_dir,
+                max_size=cache_max_size,
+                max_age=cache_max_age,
+                content_hash=cache_hash,
+            )
+
+        if worker_pool is not None:
+            log.info('Using shared worker pool ...')
+            self._pool = worker_pool
+
+        elif pool:
+            log.info('Creating worker pool ...')
+            self._pool = WorkerPool(
+                app=self._app,
+                max_runs=pool_max_runs,
+                max_rss=pool_max_rss,
+            )
+
+        if self._pool is not None:
+            # Limits cannot be lifted from a persistent worker once applied
+            for component in chain(self._sources, aggregators, self._sinks):
+                if (
+                    component.executor != 'process' or
+                    component in grouped or
+                    component.limited
+                ):
+                    continue
+                component.attach(self._pool)
+
     @property
     def name(self):
         """
@@ -85,6 +326,70 @@ class Pipeline:
         """
         return self._executed
 
+    @property
+    def data(self):
+        """
+        Data collected and aggregated by the last run of this pipeline.
+        """
+        return self._data
+
+    @property
+    def sheddable(self):
+        """
+        Components of this pipeline that can be shed first.
+        """
+        return [
+            component for component in chain(
+                self._sources, self._aggregators, self._sinks
+            )
+            if component.shed_first
+        ]
+
+    @property
+    def shedding(self):
+        """
+        ``True`` if the components that can be shed first are left out of the
+        runs of this pipeline.
+        """
+        return self._shedding
+
+    def shed(self, shedding=True):
+        """
+        Leave the components that can be shed first out of the next runs of
+        this pipeline, or bring them back.
+
+        While shedding, the sources that can be shed first reuse their last
+        result, stretching the interval between their executions, or are
+        left out if they never succeeded. The aggregators and sinks that can
+        be shed first are left out, and the aggregators are not fused while
+        shedding.
+
+        :param bool shedding: ``True`` to shed the components, ``False`` to
+         bring them back.
+        """
+        self._shedding = shedding
+
+    def replicate(self):
+        """
+        Create a replica of this pipeline.
+
+        The replica has its own instances of the components and its own data,
+        so it can run at the same time as this pipeline. It shares the pool
+        of workers of this pipeline, if any, and the last results of the
+        sources, so the sources sampled less often than the pipeline are
+        sampled as often across all the replicas.
+
+        :return: The replica.
+        :rtype: :class:`Pipeline`
+        """
+        arguments = dict(self._arguments)
+        if self._pool is not None:
+            arguments['worker_pool'] = self._pool
+
+        replica = Pipeline(self._pipeline, self._name, **arguments)
+        replica._last_values = self._last_values
+        return replica
+
     def __str__(self):
         return '\n'.join([
             '[Pipeline:{}]',
@@ -190,6 +495,27 @@ class Pipeline:
                     )
                 )
 
+                # Only sinks can subscribe to sources
+                kwargs = {}
+                subscribe = component.get('subscribe', None)
+                if subscribe is not None:
+                    self._check_subscription(
+                        component_name, index, component, subscribe
+                    )
+                    kwargs['subscribe'] = subscribe
+
+                # Only sources can be sampled less often than the pipeline
+                every = component.get('every', None)
+                if every is not None:
+                    if component_name != 'source':
+                        raise ValueError(
+                            'Only sources can set every, but {} #{} with id '
+                            '"{}" does'.format(
+                                component_name, index, component_id,
+                            )
+                        )
+                    kwargs['every'] = every
+
                 try:
                     instance = clss(
                         index,
@@ -197,7 +523,18 @@ class Pipeline:
                         component_id,
                         optional=component.get('optional', False),
                         timeout=component.get('timeout', None),
+                        executor=component.get('executor', 'process'),
                         config=component.get('config', None),
+                        reads=component.get('reads', None),
+                        writes=component.get('writes', None),
+                        cpu_affinity=component.get('cpu_affinity', None),
+                        nice=component.get('nice', None),
+                        max_rss=component.get('max_rss', None),
+                        max_cpu_seconds=component.get(
+                            'max_cpu_seconds', None
+                        ),
+                        shed_first=component.get('shed_first', False),
+                        **kwargs
                     )
                 except Exception as e:
                     log.critical(
@@ -212,6 +549,18 @@ class Pipeline:
                     )
                     raise e
 
+                if component_name == 'source' and instance.declared:
+                    raise ValueError(
+                        'Source #{} with id "{}" cannot declare the data it '
+                        'reads or writes'.format(index, component_id)
+                    )
+
+                if component_name == 'sink' and instance.writes is not None:
+                    raise ValueError(
+                        'Sink #{} with id "{}" cannot declare the data it '
+                        'writes'.format(index, component_id)
+                    )
+
                 destination.append(instance)
 
                 log.info('Created {} instance {}'.format(
@@ -224,13 +573,108 @@ class Pipeline:
 
             setattr(self, '_{}s'.format(component_name), destination)
 
-    def run(self):
+    def _preload_modules(self, components):
+        """
+        Import the modules declared by the components.
+
+        The processes that execute the components are forked from the
+        pipeline process, so they inherit the modules already imported
+        instead of importing them on each execution.
+
+        :param components: The components to preload the modules of.
+        """
+        dependants = OrderedDict()
+
+        for component in components:
+            if isinstance(component, AggregatorChain):
+                modules = chain.from_iterable(
+                    aggregator.preload for aggregator in component.aggregators
+                )
+            else:
+                modules = component.preload
+
+            for module in modules:
+                dependants.setdefault(module, set()).add(component)
+
+        saved = 0.0
+
+        for module, users in dependants.items():
+            if module in sys.modules:
+                log.debug('Module {} already imported'.format(module))
+                continue
+
+            start = time()
+            try:
+                import_module(module)
+            except Exception:
+                log.debug(
+                    'Unable to preload module {}'.format(module),
+                    exc_info=True,
+                )
+                continue
+            elapsed = time() - start
+
+            # Only forked processes would import the module again
+            forked = [
+                component for component in users
+                if component.executor == 'process'
+            ]
+            saved += elapsed * len(forked)
+
+            log.debug(
+                'Preloaded module {} in {:.4f} seconds for {} forked '
+                'components'.format(module, elapsed, len(forked))
+            )
+
+        log.debug(
+            'Preloading modules saves about {:.4f} seconds of imports on '
+            'each run'.format(saved)
+        )
+
+    def _check_subscription(self, component_name, index, component, subscribe):
+        """
+        Check that a component can subscribe to the given sources.
+
+        :param str component_name: Name of the component type.
+        :param int index: Index of the component in its stage.
+        :param dict component: Definition of the component.
+        :param list subscribe: Ids of the sources to subscribe to.
+        """
+        if component_name != 'sink':
+            raise ValueError(
+                'Only sinks can subscribe to sources, but {} #{} with id '
+                '"{}" does'.format(component_name, index, component['id'])
+            )
+
+        if component.get('reads', None) is not None:
+            raise ValueError(
+                'Sink #{} with id "{}" cannot subscribe to sources and '
+                'declare the data it reads'.format(index, component['id'])
+            )
+
+        unknown = set(subscribe) - {source.id for source in self._sources}
+        if unknown:
+            raise ValueError(
+                'Sink #{} with id "{}" subscribes to unknown sources '
+                '{}'.format(index, component['id'], sorted(unknown))
+            )
+
+    def run(self, scheduled=None, distribute=True):
         """
         Execute pipeline.
 
         This method can be called several times after instantiating the
         pipeline.
 
+        :param float scheduled: Timestamp in seconds since the epoch the run
+         was scheduled at, if scheduled. Used to trace the lateness of the
+         run.
+        :param bool distribute: Execute the sinks with the data of the run.
+         If ``False``, the sinks not subscribed to sources are not executed,
+         and the :attr:`data` of the run is left to be distributed along the
+         data of other runs by :meth:`distribute`, which also saves the
+         journal of the run.
+
         :return: The journal of the execution.
         :rtype: dict
         """
@@ -242,44 +686,189 @@ class Pipeline:
 
         self._executed += 1
 
+        # Time the sources sampled less often than the pipeline are compared
+        # against to decide if their last result is reused
+        self._tick = scheduled if scheduled is not None else time()
+
         journal = OrderedDict((
             ('sources', []),
             ('aggregators', []),
             ('sinks', []),
         ))
 
-        setproctitle('{} - running sources'.format(self._app))
-        log.info('Running sources ...')
-        self._run_sources(journal['sources'])
+        # Start and wall time of each stage
+        start = time()
+        stages = OrderedDict()
+
+        if self._tracer is not None:
+            self._tracer.begin(scheduled)
+
+        self._open_streams(journal['sinks'])
+
+        try:
+            if self._graph is not None:
+                setproctitle('{} - running components'.format(self._app))
+                log.info('Running components ...')
+                self._run_graph(journal, distribute)
+
+            else:
+                setproctitle('{} - running sources'.format(self._app))
+                log.info('Running sources ...')
+                stage_start = time()
+                self._run_sources(journal['sources'])
+                stages['sources'] = (stage_start, time() - stage_start)
+
+                setproctitle('{} - running aggregators'.format(self._app))
+                log.info('Running aggregators ...')
+                stage_start = time()
+                self._run_aggregators(journal['aggregators'])
+                stages['aggregators'] = (stage_start, time() - stage_start)
+
+                if distribute:
+                    setproctitle('{} - running sinks'.format(self._app))
+                    log.info('Running sinks ...')
+                    stage_start = time()
+                    self._run_sinks(journal['sinks'])
+                    stages['sinks'] = (stage_start, time() - stage_start)
+                else:
+                    log.info('Sinks deferred to distribute a batch')
+
+        finally:
+            errors = self._close_streams()
+
+            # Remove the large payloads of the components that were not
+            # joined, for example because the run stopped on a failure
+            self._transport.close()
+
+            if self._profiler is not None:
+                self._collect_profiles()
+
+            if self._tracer is not None:
+                self._write_trace(journal, stages)
+
+        # A non optional streamed sink failed
+        if errors:
+            raise errors[0]
+
+        elapsed = {
+            stage: duration for stage, (stage_start, duration)
+            in stages.items()
+        }
+        elapsed['run'] = time() - start
+        journal['totals'] = self._totals(journal, elapsed)
+
+        if self._durations is not None:
+            self._learn(journal)
+
+        # The journal is saved once the sinks distributed the data
+        if distribute:
+            self._store(journal)
 
-        setproctitle('{} - running aggregators'.format(self._app))
-        log.info('Running aggregators ...')
-        self._run_aggregators(journal['aggregators'])
+        return journal
 
-        setproctitle('{} - running sinks'.format(self._app))
-        log.info('Running sinks ...')
-        self._run_sinks(journal['sinks'])
+    def _store(self, journal):
+        """
+        Save the journal of a run, if enabled.
 
+        :param dict journal: The journal of the run.
+        """
         if not self._save_journal:
-            return journal
+            return
 
         setproctitle('{} - saving journal'.format(self._app))
         log.info('Saving journal ...')
-        journal_dir = Path(gettempdir()) / '{}-journals'.format(self._app)
-        journal_dir.mkdir(parents=True, exist_ok=True)
-
-        with NamedTemporaryFile(
-            mode='wt',
-            encoding='utf-8',
-            prefix='journal-{}-'.format(getpid()),
-            suffix='.json',
-            dir=str(journal_dir),
-            delete=False
-        ) as jfd:
-            jfd.write(dumps(journal, indent=4, ensure_ascii=False))
-        log.info('Journal saved to {}'.format(jfd.name))
+        location = self._journal.save(self._name, journal)
+        log.info('Journal saved to {}'.format(location))
 
-        return journal
+    def _collect_profiles(self):
+        """
+        Merge the profiles of the components executed in this run into a
+        single report.
+        """
+        name = '{}-{}-{}-{}'.format(
+            self._name, getpid(), self._uid, self._executed,
+        )
+
+        try:
+            reports = self._profiler.collect(name)
+        except Exception:
+            log.exception('Unable to merge the profiles of the components')
+            return
+
+        if not reports:
+            log.warning('No profiles were collected')
+            return
+
+        for report in reports:
+            log.info('Profile report saved to {}'.format(report))
+
+    def _write_trace(self, journal, stages):
+        """
+        Write the timeline trace of this run.
+
+        :param dict journal: The journal of the run.
+        :param dict stages: Start and wall time of each stage.
+        """
+        name = 'trace-{}-{}-{}-{}'.format(
+            self._name, getpid(), self._uid, self._executed,
+        )
+
+        try:
+            path = self._tracer.end(name, journal, stages)
+        except Exception:
+            log.exception('Unable to write the trace of the run')
+            return
+
+        log.info('Trace saved to {}'.format(path))
+
+    def _totals(self, journal, elapsed):
+        """
+        Compute the totals of the accounting of the components, per stage and
+        for the whole run.
+
+        :param dict journal: The journal of the run.
+        :param dict elapsed: Wall time in seconds of each stage and of the
+         whole run. Stages overlap, and thus are missing, when the components
+         are scheduled from their data dependencies.
+
+        :return: The totals of the ``sources``, ``aggregators`` and ``sinks``
+         stages and of the whole ``run``.
+        :rtype: OrderedDict
+        """
+        def summarize(entries, elapsed):
+            summary = OrderedDict((
+                ('components', len(entries)),
+                ('elapsed', elapsed),
+            ))
+
+            for key in (
+                'duration', 'spawn', 'cpu_user', 'cpu_system', 'payload',
+                'serialization', 'deserialization', 'join_wait',
+            ):
+                summary[key] = sum(
+                    entry[key] for entry in entries
+                    if entry[key] is not None
+                )
+
+            peaks = [
+                entry['max_rss'] for entry in entries
+                if entry['max_rss'] is not None
+            ]
+            summary['max_rss'] = max(peaks) if peaks else None
+
+            return summary
+
+        stages = ('sources', 'aggregators', 'sinks')
+        totals = OrderedDict(
+            (stage, summarize(journal[stage], elapsed.get(stage, None)))
+            for stage in stages
+        )
+        totals['run'] = summarize(
+            list(chain.from_iterable(journal[stage] for stage in stages)),
+            elapsed['run'],
+        )
+
+        return totals
 
     def _run_components(
         self, name, components, journal,
@@ -310,117 +899,580 @@ class Pipeline:
         # Accumulator for the mutator function
         accumulator = None
 
-        # Execution schedule
-        schedule = components
-
         def start(component):
             """
-            Helper to log and start a component.
+            Helper to start a component.
             """
-            log.info(
-                'Starting {name} #{component.index} "{component.id}"'.format(
-                    name=name,
-                    component=component,
-                )
-            )
             args = provider(accumulator, component)
-            component.start(*args)
-
-        # Start components in parallel if requested
-        if parallel:
-
-            # Re-order components using timeout in ascending order
-            schedule = sorted(components)
+            self._start_component(name, component, args)
 
+        # Start components in series if requested
+        if not parallel:
             for component in components:
+                if self._shed(name, component, journal) is not None:
+                    continue
+
                 start(component)
 
-        # Join components according to schedule
-        for component in schedule:
+                execution = self._join_component(
+                    name, component, journal, components
+                )
+
+                if execution.status == 'succeeded':
+                    accumulator = mutator(
+                        accumulator, component, execution.data
+                    )
+
+            return accumulator
+
+        # Start components in parallel, as many as the limits allow
+        pending = self._prioritize(components)
+        running = []
+
+        while pending or running:
+            inline = []
+
+            for component in list(pending):
+                if not self._admits(name, running):
+                    break
+
+                pending.remove(component)
+
+                # Components with a cached result, or shed, are not
+                # executed
+                execution = self._from_cache(name, component, journal)
+                if execution is not None:
+                    if execution.status != 'shed':
+                        accumulator = mutator(
+                            accumulator, component, execution.data
+                        )
+                    continue
+
+                if component.executor == 'inline':
+                    inline.append(component)
+                else:
+                    start(component)
+                running.append(component)
 
-            # Start components in series if requested
-            if not parallel:
+            # Sources with a coroutine collect() are started all at once
+            if self._async_group is not None:
+                self._async_group.launch()
+
+            # Inline components run to completion when started, so they are
+            # started once the others are already running
+            for component in inline:
                 start(component)
 
+            # All components started were cached
+            if not running:
+                continue
+
+            # Join components as they end
+            for component in self._wait(running):
+                running.remove(component)
+
+                execution = self._join_component(
+                    name, component, journal, running
+                )
+
+                if execution.status == 'succeeded':
+                    accumulator = mutator(
+                        accumulator, component, execution.data
+                    )
+
+        return accumulator
+
+    def _wait(self, running):
+        """
+        Wait for any of the running components to end.
+
+        The result pipes and the sentinels of the driving processes are waited
+        on, so the pipeline wakes up as soon as a component submits its
+        result, dies or reaches its timeout.
+
+        :param list running: Components currently running.
+
+        :return: The components that ended, in the same order they are in
+         ``running``.
+        :rtype: list
+        """
+        while True:
+            ended = [component for component in running if component.done()]
+            if ended:
+                return ended
+
+            waitables = []
+            timeouts = []
+
+            for component in running:
+                objects = component.waitables()
+
+                # Threads can't be waited on, poll them
+                if not objects:
+                    timeouts.append(0.01)
+
+                # Components can share a driving process
+                waitables.extend(
+                    obj for obj in objects if obj not in waitables
+                )
+
+                remaining = component.remaining()
+                if remaining is not None:
+                    timeouts.append(remaining)
+
+            wait(waitables, min(timeouts) if timeouts else None)
+
+    def _learn_history(self):
+        """
+        Learn the durations of the components from the most recent journals
+        saved.
+        """
+        try:
+            journals = self._journal.recent(self._name, self._history)
+        except Exception:
+            log.exception('Unable to read the previous journals')
+            return
+
+        for journal in journals:
+            self._learn(journal)
+
+    def _learn(self, journal):
+        """
+        Learn the durations of the components from a journal.
+
+        Only successful executions are taken into account.
+
+        :param dict journal: The journal of an execution of a pipeline.
+        """
+        for stage in ('sources', 'aggregators', 'sinks'):
+            name = stage[:-1]
+            entries = journal.get(stage, ())
+
+            for entry in entries:
+                if entry.get('status') != 'succeeded' or name not in entry:
+                    continue
+
+                durations = self._durations.setdefault(
+                    (name, entry[name]), deque(maxlen=self._history)
+                )
+                durations.append(entry['duration'])
+
+    def _prioritize(self, components, graph=None):
+        """
+        Sort the components so the ones expected to take longer are started
+        first.
+
+        The expected duration of a component is the median of its durations
+        learned from previous executions. Components without history are
+        expected to take as long as the longest known component. If a
+        dependency graph is given, components are sorted by the expected
+        duration of the longest chain of components that depend on them.
+
+        :param components: The components to sort.
+        :param dict graph: Dependency graph of the components, as returned by
+         :meth:`_build_graph`.
+
+        :return: The components sorted, in the order they are given if
+         nothing was learned.
+        :rtype: list
+        """
+        components = list(components)
+
+        if not self._durations:
+            return components
+
+        expected = {}
+        for name, stage in (
+            ('source', self._sources),
+            ('aggregator', self._aggregators),
+            ('sink', self._sinks),
+        ):
+            for component in stage:
+                durations = self._durations.get((name, str(component)))
+                if durations:
+                    expected[component] = median(durations)
+
+        if not expected:
+            return components
+
+        longest = max(expected.values())
+        priority = {
+            component: expected.get(component, longest)
+            for component in components
+        }
+
+        # Components always depend on components defined before them
+        if graph is not None:
+            for component in reversed(components):
+                dependants = [
+                    other for other in components
+                    if component in graph[other]
+                ]
+                if dependants:
+                    priority[component] += max(
+                        priority[other] for other in dependants
+                    )
+
+        return sorted(
+            components, key=lambda component: -priority[component]
+        )
+
+    def _admits(self, name, running):
+        """
+        Check if a component can be started without exceeding the limits of
+        components running at the same time.
+
+        Components are admitted in the order they are pending, and their
+        timeout starts counting when they are started, not while they wait to
+        be admitted.
+
+        :param str name: Name of the component type to start.
+        :param list running: Components currently running.
+
+        :return: True if the component can be started.
+        :rtype: bool
+        """
+        limit = self._max_workers
+        if limit is not None and len(running) >= limit:
+            return False
+
+        # Wait for the running components to return their workers to a full
+        # pool, shared with other pipelines, rather than hold them and wait
+        if running and self._pool is not None and self._pool.saturated():
+            return False
+
+        limit = self._stage_workers[name]
+        if limit is None:
+            return True
+
+        stage = getattr(self, '_{}s'.format(name))
+        return sum(
+            1 for component in running if component in stage
+        ) < limit
+
+    def _start_component(self, name, component, args):
+        """
+        Log and start a component.
+
+        :param str name: Name of the component type to start.
+        :param component: The component to start.
+        :param tuple args: Arguments to provide to the component.
+        """
+        log.info(
+            'Starting {name} #{component.index} "{component.id}"'.format(
+                name=name,
+                component=component,
+            )
+        )
+        component.start(*args)
+
+    def _join_component(self, name, component, journal, running):
+        """
+        Join a component, log the result of its execution and register it in
+        the journal.
+
+        :param str name: Name of the component type to join.
+        :param component: The component to join.
+        :param list journal: Journal to add the entry to.
+        :param list running: Components to stop if the component failed and
+         it is not optional.
+
+        :return: The execution information of the component.
+        :rtype: :class:`flowbber.components.base.ExecutionInfo`
+        """
+        log.info(
+            'Joining {name} #{component.index} "{component.id}"'.format(
+                name=name,
+                component=component
+            )
+        )
+
+        key = self._cache_keys.pop(component, None)
+
+        try:
+            execution = component.join()
+
             log.info(
-                'Joining {name} #{component.index} "{component.id}"'.format(
+                '{name} #{component.index} "{component.id}" (PID '
+                '{execution.pid}) finished successfully after '
+                '{execution.duration:.4f} seconds'.format(
+                    name=name.capitalize(),
+                    component=component,
+                    execution=execution,
+                )
+            )
+
+        except (CrashError, TimeExceededError) as e:
+            execution = e.execution
+
+            errmsg = (
+                'Process PID {execution.pid} for {name} '
+                '#{component.index} "{component.id}" {execution.status} '
+                'with exit code {execution.exitcode}'.format(
                     name=name,
-                    component=component
+                    component=component,
+                    execution=execution,
                 )
             )
 
-            try:
-                execution = component.join()
-                accumulator = mutator(
-                    accumulator, component, execution.data
+            if not component.optional:
+
+                log.fatal(errmsg)
+                log.fatal('Pipeline is shutting down ...')
+
+                # Pipeline is shuting down. Kill all child processes.
+                # This avoids a deadlock condition were still alive child
+                # processes try to put data to a queue but the master
+                # process is shuting down and blocked at waitpid() call.
+                for other in running:
+                    try:
+                        other.stop()
+                    except Exception:
+                        log.exception(
+                            'Component {} crashed when stopping.'.format(
+                                other
+                            )
+                        )
+                        continue
+                raise
+
+            log.warning(errmsg)
+            log.warning(
+                '{name} #{component.index} "{component.id}" is marked as '
+                'optional. Keep going...'.format(
+                    name=name.capitalize(),
+                    component=component,
                 )
+            )
 
-                log.info(
-                    '{name} #{component.index} "{component.id}" (PID '
-                    '{execution.pid}) finished successfully after '
-                    '{execution.duration:.4f} seconds'.format(
-                        name=name.capitalize(),
-                        component=component,
-                        execution=execution,
+        # Last result of the sources sampled less often than the pipeline,
+        # or reused while shedding, unless a replica sampled it on a later
+        # tick
+        if (
+            name == 'source' and
+            (component.every is not None or component.shed_first) and
+            execution.status == 'succeeded'
+        ):
+            sampled, _ = self._last_values.get(component.id, (None, None))
+            if sampled is None or sampled <= self._tick:
+                self._last_values[component.id] = (
+                    self._tick, execution.data,
+                )
+
+        if key is not None and execution.status == 'succeeded':
+            try:
+                self._cache.put(key, execution.data)
+            except Exception:
+                log.exception(
+                    'Unable to cache the result of {} #{} "{}"'.format(
+                        name, component.index, component.id,
                     )
                 )
 
-            except (CrashError, TimeExceededError) as e:
-                execution = e.execution
+        # Add entry to the journal
+        journal.append(self._journal_entry(
+            name, str(component), component, execution,
+            cache=None if key is None else 'miss',
+        ))
 
-                errmsg = (
-                    'Process PID {execution.pid} for {name} '
-                    '#{component.index} "{component.id}" {execution.status} '
-                    'with exit code {execution.exitcode}'.format(
-                        name=name,
-                        component=component,
-                        execution=execution,
-                    )
+        return execution
+
+    def _journal_entry(self, name, title, component, execution, cache=None):
+        """
+        Create the journal entry of the execution of a component.
+
+        :param str name: Name of the component type.
+        :param str title: Pretty name of the component.
+        :param component: The component executed, or ``None``.
+        :param execution: The execution information of the component.
+        :type execution: :class:`flowbber.components.base.ExecutionInfo`
+        :param str cache: ``hit`` if the result was taken from the cache,
+         ``miss`` if it was not cached yet, ``last`` if the last result of a
+         source sampled less often than the pipeline was reused, or ``None``
+         if the result of the component cannot be cached.
+
+        :return: The journal entry.
+        :rtype: dict
+        """
+        return {
+            'index': None if component is None else component.index,
+            'id': None if component is None else component.id,
+            name: title,
+            'pid': execution.pid,
+            'status': execution.status,
+            'exitcode': execution.exitcode,
+            'duration': execution.duration,
+            'payload': execution.payload,
+            'serialization': execution.serialization,
+            'deserialization': execution.deserialization,
+            'spawn': execution.spawn,
+            'cpu_user': execution.cpu_user,
+            'cpu_system': execution.cpu_system,
+            'max_rss': execution.max_rss,
+            'join_wait': execution.join_wait,
+            'started': execution.started,
+            'cache': cache,
+        }
+
+    def _from_cache(self, name, component, journal):
+        """
+        Get the result of a component from the cache.
+
+        Only the results of sources that declare their input files are
+        cached. On a hit, the component must not be executed and its cached
+        result is registered in the journal. On a miss, the result of the
+        component is cached when joined.
+
+        :param str name: Name of the component type.
+        :param component: The component about to be started.
+        :param list journal: Journal to add the entry to on a hit.
+
+        :return: The execution information with the cached result, or
+         ``None`` if the component must be executed.
+        :rtype: :class:`flowbber.components.base.ExecutionInfo`
+        """
+        execution = self._shed(name, component, journal)
+        if execution is not None:
+            return execution
+
+        if name != 'source':
+            return None
+
+        execution = self._from_last_value(name, component, journal)
+        if execution is not None:
+            return execution
+
+        if self._cache is None:
+            return None
+
+        start = time()
+
+        try:
+            key = self._cache.key(component)
+        except Exception:
+            log.exception(
+                'Unable to compute the cache key of source #{} "{}"'.format(
+                    component.index, component.id,
                 )
+            )
+            return None
 
-                if not component.optional:
-
-                    log.fatal(errmsg)
-                    log.fatal('Pipeline is shutting down ...')
-
-                    # Pipeline is shuting down. Kill all child processes.
-                    # This avoids a deadlock condition were still alive child
-                    # processes try to put data to a queue but the master
-                    # process is shuting down and blocked at waitpid() call.
-                    for component in schedule:
-                        try:
-                            component.stop()
-                        except Exception:
-                            log.exception(
-                                'Component {} crashed when stopping.'.format(
-                                    component
-                                )
-                            )
-                            continue
-                    raise
-
-                log.warning(errmsg)
-                log.warning(
-                    '{name} #{component.index} "{component.id}" is marked as '
-                    'optional. Keep going...'.format(
-                        name=name.capitalize(),
-                        component=component,
-                    )
+        if key is None:
+            return None
+
+        data = self._cache.get(key)
+        if data is None:
+            self._cache_keys[component] = key
+            return None
+
+        execution = ExecutionInfo(
+            'cached', time() - start, getpid(), None, data
+        )
+
+        log.info(
+            'Source #{component.index} "{component.id}" result taken from '
+            'the cache after {execution.duration:.4f} seconds'.format(
+                component=component,
+                execution=execution,
+            )
+        )
+
+        journal.append(self._journal_entry(
+            name, str(component), component, execution, cache='hit',
+        ))
+
+        return execution
+
+    def _from_last_value(self, name, component, journal):
+        """
+        Reuse the last result of a source sampled less often than the
+        pipeline, if it's not due yet.
+
+        :param str name: Name of the component type.
+        :param component: The source about to be started.
+        :param list journal: Journal to add the entry to if reused.
+
+        :return: The execution information with the last result, or ``None``
+         if the source must be executed.
+        :rtype: :class:`flowbber.components.base.ExecutionInfo`
+        """
+        if component.every is None:
+            return None
+
+        last = self._last_values.get(component.id, None)
+        if last is None:
+            return None
+
+        sampled, data = last
+        if self._tick - sampled >= component.every:
+            return None
+
+        execution = ExecutionInfo('cached', 0.0, getpid(), None, data)
+
+        log.info(
+            'Source #{component.index} "{component.id}" reused its result '
+            'sampled {ago:.1f} seconds ago'.format(
+                component=component,
+                ago=self._tick - sampled,
+            )
+        )
+
+        journal.append(self._journal_entry(
+            name, str(component), component, execution, cache='last',
+        ))
+
+        return execution
+
+    def _shed(self, name, component, journal):
+        """
+        Shed a component, if the pipeline is shedding and the component can
+        be shed first.
+
+        Sources with a last result reuse it. Other components are left out
+        with a ``shed`` status and no data.
+
+        :param str name: Name of the component type.
+        :param component: The component about to be started.
+        :param list journal: Journal to add the entry to if shed.
+
+        :return: The execution information of the component shed, or
+         ``None`` if the component must be executed.
+        :rtype: :class:`flowbber.components.base.ExecutionInfo`
+        """
+        if not self._shedding or not component.shed_first:
+            return None
+
+        last = self._last_values.get(component.id, None)
+        if name == 'source' and last is not None:
+            sampled, data = last
+            execution = ExecutionInfo('cached', 0.0, getpid(), None, data)
+
+            log.warning(
+                'Source #{component.index} "{component.id}" shed, reusing '
+                'its result sampled {ago:.1f} seconds ago'.format(
+                    component=component,
+                    ago=self._tick - sampled,
                 )
+            )
 
-            # Add entry to the journal
-            journal_entry = {
-                'index': component.index,
-                'id': component.id,
-                name: str(component),
-                'pid': execution.pid,
-                'status': execution.status,
-                'exitcode': execution.exitcode,
-                'duration': execution.duration,
-            }
-            journal.append(journal_entry)
+            journal.append(self._journal_entry(
+                name, str(component), component, execution, cache='last',
+            ))
+            return execution
 
-        return accumulator
+        execution = ExecutionInfo('shed', 0.0, getpid(), None, None)
+
+        log.warning(
+            '{name} #{component.index} "{component.id}" shed'.format(
+                name=name.capitalize(),
+                component=component,
+            )
+        )
+
+        journal.append(self._journal_entry(
+            name, str(component), component, execution,
+        ))
+        return execution
 
     def _run_sources(self, journal):
         """
@@ -431,6 +1483,7 @@ class Pipeline:
             if accumulator is None:
                 accumulator = OrderedDict()
             accumulator[component.id] = data
+            self._stream_result(component, data)
             return accumulator
 
         def provider(accumulator, component):
@@ -442,6 +1495,10 @@ class Pipeline:
             parallel=True
         )
 
+        # All sources failed, or were shed without a last result
+        if results is None:
+            return
+
         # Re-order data from scheduling
         for source in self._sources:
             if source.id in results:
@@ -455,6 +1512,16 @@ class Pipeline:
         if not self._aggregators:
             return
 
+        # Aggregators are executed one by one while shedding, so the ones
+        # that can be shed first are left out
+        sheddable = self._shedding and any(
+            aggregator.shed_first for aggregator in self._aggregators
+        )
+
+        if self._chain is not None and not sheddable:
+            self._run_chain(journal)
+            return
+
         def mutator(accumulator, component, data):
             return data
 
@@ -463,12 +1530,333 @@ class Pipeline:
                 accumulator = self._data
             return (accumulator, )
 
-        self._data = self._run_components(
+        data = self._run_components(
             'aggregator', self._aggregators, journal,
             mutator, provider,
             parallel=False
         )
 
+        # Unless all aggregators failed or were shed
+        if data is not None:
+            self._data = data
+
+    def _run_chain(self, journal):
+        """
+        Run the aggregators of the pipeline fused in a single process.
+
+        Each aggregator still gets its own entry in the journal, and the
+        failure of a non optional aggregator stops the pipeline.
+        """
+        log.info('Starting {} ...'.format(self._chain))
+        self._chain.start(self._data)
+
+        # Wait on the process too, in case it dies without a result
+        self._wait([self._chain])
+
+        try:
+            chain_execution = self._chain.join()
+
+        except (CrashError, TimeExceededError) as e:
+            execution = e.execution
+            log.fatal(
+                'Process PID {execution.pid} for {chain} {execution.status} '
+                'with exit code {execution.exitcode}'.format(
+                    chain=self._chain,
+                    execution=execution,
+                )
+            )
+            log.fatal('Pipeline is shutting down ...')
+
+            journal.append(self._journal_entry(
+                'aggregator', str(self._chain), self._chain, execution,
+            ))
+            raise
+
+        log.info(
+            '{chain} (PID {execution.pid}) finished after '
+            '{execution.duration:.4f} seconds'.format(
+                chain=self._chain,
+                execution=chain_execution,
+            )
+        )
+
+        result = chain_execution.data
+
+        for report in result['report']:
+            component = self._aggregators[report['index']]
+            execution = ExecutionInfo(
+                report['status'], report['duration'],
+                chain_execution.pid,
+                chain_execution.exitcode,
+                None,
+                cpu_user=report.get('cpu_user', None),
+                cpu_system=report.get('cpu_system', None),
+                max_rss=report.get('max_rss', None),
+                started=report['started'],
+            )
+
+            # Add entry to the journal
+            journal.append(self._journal_entry(
+                'aggregator', str(component), component, execution,
+            ))
+
+            if execution.status == 'succeeded':
+                log.info(
+                    'Aggregator #{component.index} "{component.id}" '
+                    'finished successfully after {execution.duration:.4f} '
+                    'seconds'.format(
+                        component=component,
+                        execution=execution,
+                    )
+                )
+                continue
+
+            errmsg = (
+                'Aggregator #{component.index} "{component.id}" '
+                '{execution.status} in fused process PID {execution.pid}'
+            ).format(
+                component=component,
+                execution=execution,
+            )
+
+            if not component.optional:
+                log.fatal(errmsg)
+                log.fatal('Pipeline is shutting down ...')
+
+                if execution.status == 'timed out':
+                    raise TimeExceededError(execution)
+                raise CrashError(execution)
+
+            log.warning(errmsg)
+            log.warning(
+                'Aggregator #{component.index} "{component.id}" is marked as '
+                'optional. Keep going...'.format(component=component)
+            )
+
+        self._data = result['data']
+
+    def _build_graph(self):
+        """
+        Build the dependency graph of the components of the pipeline.
+
+        Each source writes the key with its id. An aggregator depends on the
+        sources and previous aggregators that write the keys it reads or
+        writes, and on the previous aggregators that read the keys it writes.
+        A sink depends on the sources and aggregators that write the keys it
+        reads.
+
+        Components that didn't declare the data they read or write keep the
+        semantics of the stages: they depend on all components of the previous
+        stages and all the aggregators defined before them, and all
+        aggregators defined after them depend on them.
+
+        :return: A dictionary mapping each component to the set of components
+         it depends on, in the order they are defined.
+        :rtype: OrderedDict
+        """
+        graph = OrderedDict()
+
+        for source in self._sources:
+            graph[source] = set()
+
+        previous = []
+        for aggregator in self._aggregators:
+
+            if not aggregator.declared:
+                graph[aggregator] = set(self._sources) | set(previous)
+                previous.append(aggregator)
+                continue
+
+            reads = set(aggregator.reads or ())
+            writes = set(aggregator.writes or ())
+            touches = reads | writes
+
+            depends = {
+                source for source in self._sources if source.id in touches
+            }
+            for other in previous:
+                if (
+                    not other.declared or
+                    touches & set(other.writes or ()) or
+                    writes & set(other.reads or ())
+                ):
+                    depends.add(other)
+
+            graph[aggregator] = depends
+            previous.append(aggregator)
+
+        for sink in self._sinks:
+
+            # Sinks subscribed to sources are streamed their results
+            if sink.subscribe is not None:
+                continue
+
+            if sink.reads is None:
+                graph[sink] = set(self._sources) | set(self._aggregators)
+                continue
+
+            reads = set(sink.reads)
+            depends = {
+                source for source in self._sources if source.id in reads
+            }
+            for aggregator in self._aggregators:
+                if (
+                    not aggregator.declared or
+                    reads & set(aggregator.writes or ())
+                ):
+                    depends.add(aggregator)
+
+            graph[sink] = depends
+
+        for component, depends in graph.items():
+            log.debug('{} depends on {}'.format(
+                component, sorted(depends, key=str)
+            ))
+
+        return graph
+
+    def _run_graph(self, journal, distribute=True):
+        """
+        Run the components of the pipeline following the dependency graph.
+
+        Components are started as soon as all the components they depend on
+        ended, and joined as soon as they end. Components that declared the
+        data they read only get that data, and aggregators that declared the
+        data they write only update that data.
+
+        :param bool distribute: Execute the sinks. If ``False``, the sinks
+         are left out of the run.
+        """
+        names = OrderedDict()
+        for name, components in (
+            ('source', self._sources),
+            ('aggregator', self._aggregators),
+            ('sink', self._sinks),
+        ):
+            for component in components:
+                names[component] = name
+
+        pending = self._prioritize(self._graph, self._graph)
+        running = []
+
+        # Sinks are left to distribute the data of several runs at once
+        if not distribute:
+            pending = [
+                component for component in pending
+                if names[component] != 'sink'
+            ]
+        finished = set()
+        sources = set(self._sources)
+
+        def subset(keys):
+            return OrderedDict(
+                (key, value) for key, value in self._data.items()
+                if key in keys
+            )
+
+        def provider(name, component):
+            if name == 'source':
+                return ()
+
+            if not component.declared:
+                return (self._data, )
+
+            return (subset(
+                set(component.reads or ()) | set(component.writes or ())
+            ), )
+
+        def mutator(name, component, data):
+            if name == 'source':
+                self._data[component.id] = data
+                self._stream_result(component, data)
+                return
+
+            if name == 'sink':
+                return
+
+            if not component.declared:
+                self._data = data
+                return
+
+            for key in component.writes or ():
+                if key in data:
+                    self._data[key] = data[key]
+                else:
+                    self._data.pop(key, None)
+
+        while pending or running:
+            inline = []
+
+            # Start all components with their dependencies satisfied
+            for component in list(pending):
+                if not self._graph[component] <= finished:
+                    continue
+
+                name = names[component]
+                if not self._admits(name, running):
+                    continue
+
+                pending.remove(component)
+
+                # Components with a cached result, or shed, are not executed
+                execution = self._from_cache(
+                    name, component, journal['{}s'.format(name)]
+                )
+                if execution is not None:
+                    finished.add(component)
+                    if execution.status != 'shed':
+                        mutator(name, component, execution.data)
+                    continue
+
+                running.append(component)
+                if component.executor == 'inline':
+                    inline.append(component)
+                    continue
+
+                self._start_component(
+                    name, component, provider(name, component)
+                )
+
+            # Sources with a coroutine collect() are started all at once
+            if self._async_group is not None:
+                self._async_group.launch()
+
+            # Inline components run to completion when started, so they are
+            # started once the others are already running
+            for component in inline:
+                name = names[component]
+                self._start_component(
+                    name, component, provider(name, component)
+                )
+
+            # All components started were cached
+            if not running:
+                continue
+
+            for component in self._wait(running):
+                name = names[component]
+                running.remove(component)
+                finished.add(component)
+
+                execution = self._join_component(
+                    name, component,
+                    journal['{}s'.format(name)],
+                    running,
+                )
+
+                if execution.status == 'succeeded':
+                    mutator(name, component, execution.data)
+
+                # Re-order data from scheduling once all sources ended
+                if name == 'source' and sources <= finished:
+                    data = OrderedDict(
+                        (source.id, self._data[source.id])
+                        for source in self._sources
+                        if source.id in self._data
+                    )
+                    data.update(self._data)
+                    self._data = data
+
     def _run_sinks(self, journal):
         """
         Run the sinks of the pipeline.
@@ -480,11 +1868,169 @@ class Pipeline:
         def provider(accumulator, component):
             return (self._data, )
 
+        # Sinks subscribed to sources are streamed their results
+        sinks = [sink for sink in self._sinks if sink.subscribe is None]
+
         self._run_components(
-            'sink', self._sinks, journal,
+            'sink', sinks, journal,
             mutator, provider,
             parallel=True
         )
 
+    def distribute(self, batch, journals=None):
+        """
+        Execute the sinks with the data of several runs at once.
+
+        Each sink not subscribed to sources is executed once with the list of
+        the data of the runs, calling its
+        :meth:`flowbber.components.Sink.distribute_batch`. When the pipeline
+        runs following a dependency graph, the sinks that declared the data
+        they read only get that data from each run.
+
+        :param list batch: The :attr:`data` of each run executed without
+         distributing it, oldest first.
+        :param list journals: The journals returned by :meth:`run` for each
+         run of the batch. The entries of the sinks are added to each of them
+         and they are saved.
+
+        :return: The journal entries of the sinks.
+        :rtype: list
+        """
+        setproctitle('{} - distributing batch'.format(self._app))
+        log.info('Distributing batch of {} samples ...'.format(len(batch)))
+
+        journal = []
+
+        def mutator(accumulator, component, data):
+            return None
+
+        def provider(accumulator, component):
+            if self._graph is None or not component.declared:
+                return (batch, True)
+
+            reads = set(component.reads or ())
+            return ([
+                OrderedDict(
+                    (key, value) for key, value in data.items()
+                    if key in reads
+                )
+                for data in batch
+            ], True)
+
+        # Sinks subscribed to sources are streamed their results
+        sinks = [sink for sink in self._sinks if sink.subscribe is None]
+
+        start = time()
+        try:
+            self._run_components(
+                'sink', sinks, journal,
+                mutator, provider,
+                parallel=True
+            )
+        finally:
+            self._transport.close()
+        duration = time() - start
+
+        for run in journals or ():
+            run['sinks'].extend(journal)
+
+            elapsed = {
+                stage: totals['elapsed']
+                for stage, totals in run['totals'].items()
+                if totals['elapsed'] is not None
+            }
+            elapsed['sinks'] = duration
+            elapsed['run'] += duration
+            run['totals'] = self._totals(run, elapsed)
+
+            self._store(run)
+
+        return journal
+
+    def _open_streams(self, journal):
+        """
+        Start a thread for each sink subscribed to sources.
+
+        Each thread executes its sink once for each result of the sources it
+        subscribed to, one after the other, in the order the results arrive.
+
+        :param list journal: Journal to add the entries of the sinks to.
+        """
+        for sink in self._sinks:
+            if sink.subscribe is None:
+                continue
+
+            if self._shed('sink', sink, journal) is not None:
+                continue
+
+            queue = ThreadQueue()
+            errors = []
+            thread = Thread(
+                target=self._stream,
+                name='stream-{}'.format(sink.id),
+                args=(sink, queue, journal, errors),
+                daemon=True,
+            )
+            thread.start()
+
+            self._streams[sink] = (queue, thread, errors)
+
+    def _stream(self, sink, queue, journal, errors):
+        """
+        Stream thread target function.
+
+        :param sink: The sink to execute.
+        :param queue: The queue to get the data to distribute from. A
+         ``None`` ends the stream.
+        :param list journal: Journal to add the entries of the sink to.
+        :param list errors: List to append the error to if the sink failed
+         and it is not optional.
+        """
+        while True:
+            data = queue.get()
+            if data is None:
+                break
+
+            # Sink failed, ignore the remaining results
+            if errors:
+                continue
+
+            self._start_component('sink', sink, (data, ))
+
+            try:
+                self._join_component('sink', sink, journal, [])
+            except ComponentError as e:
+                errors.append(e)
+
+    def _stream_result(self, source, data):
+        """
+        Stream the result of a source to the sinks subscribed to it.
+
+        :param source: The source that ended.
+        :param dict data: The data collected by the source.
+        """
+        for sink, (queue, thread, errors) in self._streams.items():
+            if source.id in sink.subscribe:
+                queue.put(OrderedDict(((source.id, data), )))
+
+    def _close_streams(self):
+        """
+        Wait for the sinks subscribed to sources to distribute all the
+        results streamed to them.
+
+        :return: The errors of the non optional sinks that failed.
+        :rtype: list
+        """
+        for queue, thread, errors in self._streams.values():
+            queue.put(None)
+
+        failures = []
+        for queue, thread, errors in self._streams.values():
+            thread.join()
+            failures.extend(errors)
+
+        self._streams.clear()
+        return failures
+
 
 __all__ = ['Pipeline']
@@ -360,6 +360,12 @@ This option is nullable, and if null is provided (the default), the timestamp
 will be determined when submitting the data by calling Python's
 ``datetime.now().isoformat()``.
 
+When the scheduler batches the samples of the pipeline, the points of all the
+samples of a batch are inserted in a single write, and the timestamps
+determined when submitting the data are the time the batch is written, not
+the time each sample was collected. Set this option to keep the time of each
+sample.
+
 In order to have a single timestamp for your pipeline you can include the
 :ref:`Timestamp <sources-timestamp>` source and use a configuration similar to
 the following:
@@ -544,6 +550,9 @@ def transform_to_points(timestamp, flat):
 
 
 class InfluxDBSink(FilterSink):
+
+    preload = ('influxdb', )
+
     def declare_config(self, config):
         super().declare_config(config)
 
@@ -681,25 +690,37 @@ class InfluxDBSink(FilterSink):
         config.add_validator(custom_validator)
 
     def distribute(self, data):
-        from influxdb import InfluxDBClient
+        client = self._connect()
+        points = self._points(data)
 
-        # Allow to filter data
-        super().distribute(data)
+        log.info('Inserting points to InfluxDB: {}'.format([
+            point['measurement'] for point in points
+        ]))
+        client.write_points(points)
 
-        # Get key
-        if self.config.key.value is None:
-            key = datetime.now().isoformat()
+    def distribute_batch(self, batch):
+        client = self._connect()
 
-        else:
-            current = data
-            for part in self.config.key.value.split('.'):
-                current = current[part]
+        points = []
+        for data in batch:
+            points.extend(self._points(data))
 
-            key = current
+        log.info('Inserting {} points of {} samples to InfluxDB'.format(
+            len(points), len(batch),
+        ))
+        client.write_points(points)
+
+    def _connect(self):
+        """
+        Connect to the InfluxDB database.
+
+        :return: The client connected to the database.
+        :rtype: :class:`influxdb.InfluxDBClient`
+        """
+        from influxdb import InfluxDBClient
 
-        # Connect to database
         if self.config.uri.value is None:
-            client = InfluxDBClient(
+            return InfluxDBClient(
                 host=self.config.host.value,
                 path=self.config.path.value,
                 port=self.config.port.value,
@@ -709,13 +730,36 @@ class InfluxDBSink(FilterSink):
                 ssl=self.config.ssl.value,
                 verify_ssl=self.config.verify_ssl.value,
             )
+
+        return InfluxDBClient.from_dsn(
+            self.config.uri.value,
+            path=self.config.path.value,
+            database=self.config.database.value,
+            verify_ssl=self.config.verify_ssl.value,
+        )
+
+    def _points(self, data):
+        """
+        Transform the collected data into InfluxDB points.
+
+        :param dict data: The collected data.
+
+        :return: The points to insert.
+        :rtype: list
+        """
+        # Allow to filter data
+        super().distribute(data)
+
+        # Get key
+        if self.config.key.value is None:
+            key = datetime.now().isoformat()
+
         else:
-            client = InfluxDBClient.from_dsn(
-                self.config.uri.value,
-                path=self.config.path.value,
-                database=self.config.database.value,
-                verify_ssl=self.config.verify_ssl.value,
-            )
+            current = data
+            for part in self.config.key.value.split('.'):
+                current = current[part]
+
+            key = current
 
         # Flat data
         log.info('Flattening data for InfluxDB')
@@ -727,16 +771,13 @@ class InfluxDBSink(FilterSink):
         del data  # Release a bit of ram here
         log.debug('Flat data:\n{}'.format(pformat(flat)))
 
-        # Insert points
+        # Create points
         log.info('Creating points using timestamp {}'.format(key))
         points = transform_to_points(key, flat)
         del flat  # Release a bit of ram here
         log.debug('Points data:\n{}'.format(pformat(points)))
 
-        log.info('Inserting points to InfluxDB: {}'.format([
-            point['measurement'] for point in points
-        ]))
-        client.write_points(points)
+        return points
 
 
 __all__ = ['InfluxDBSink']
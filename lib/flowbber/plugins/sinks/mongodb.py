@@ -32,6 +32,10 @@ This sink will transform the keys in the collected data so its safe to submit
 it to MongoDB, for this the options ``dotreplace`` and ``dollarreplace`` are
 used to perform this transformation.
 
+When the scheduler batches the samples of the pipeline, the documents of all
+the samples of a batch are inserted with a single ``insert_many()`` for each
+collection.
+
 **Dependencies:**
 
 .. code-block:: sh
@@ -415,6 +419,8 @@ beginning of any key in the collected data (see MongoDB data safety above).
 
 """  # noqa
 
+from collections import OrderedDict
+
 from flowbber.logging import get_logger
 from flowbber.components import FilterSink
 
@@ -446,6 +452,9 @@ def mongodb_safe(data, dotreplace, dollarreplace):
 
 
 class MongoDBSink(FilterSink):
+
+    preload = ('pymongo', )
+
     def declare_config(self, config):
         super().declare_config(config)
 
@@ -574,21 +583,46 @@ class MongoDBSink(FilterSink):
         config.add_validator(custom_validator)
 
     def distribute(self, data):
-        from pymongo import MongoClient
+        database = self._connect()
 
-        # Allow to filter data
-        super().distribute(data)
+        # Insert data
+        for dbcollection, bundle in self._bundles(database, data):
+            inserted_id = dbcollection.insert_one(bundle).inserted_id
+            log.info(
+                'Inserted document with id {} in {}.{}'.format(
+                    inserted_id, database.name, dbcollection.name
+                )
+            )
 
-        # Get key
-        if self.config.key.value is None:
-            key = None
+    def distribute_batch(self, batch):
+        database = self._connect()
 
-        else:
-            current = data
-            for part in self.config.key.value.split('.'):
-                current = current[part]
+        # Group the documents of all the samples by collection
+        collections = OrderedDict()
+        for data in batch:
+            for dbcollection, bundle in self._bundles(database, data):
+                collections.setdefault(
+                    dbcollection.name, (dbcollection, [])
+                )[1].append(bundle)
 
-            key = current
+        # Insert data
+        for dbcollection, bundles in collections.values():
+            inserted_ids = dbcollection.insert_many(bundles).inserted_ids
+            log.info(
+                'Inserted {} documents of {} samples in {}.{}'.format(
+                    len(inserted_ids), len(batch),
+                    database.name, dbcollection.name
+                )
+            )
+
+    def _connect(self):
+        """
+        Connect to the MongoDB server.
+
+        :return: The database to write to.
+        :rtype: :class:`pymongo.database.Database`
+        """
+        from pymongo import MongoClient
 
         # Determine connection parameters
         options = {
@@ -609,7 +643,33 @@ class MongoDBSink(FilterSink):
         log.info('Connected to MongoDB version {}'.format(version))
 
         # Get database
-        database = client[self.config.database.value]
+        return client[self.config.database.value]
+
+    def _bundles(self, database, data):
+        """
+        Transform the collected data into the documents to insert.
+
+        :param database: The database to write to.
+        :type database: :class:`pymongo.database.Database`
+        :param dict data: The collected data.
+
+        :return: A list of tuples with the collection and the document to
+         insert in it.
+        :rtype: list
+        """
+        # Allow to filter data
+        super().distribute(data)
+
+        # Get key
+        if self.config.key.value is None:
+            key = None
+
+        else:
+            current = data
+            for part in self.config.key.value.split('.'):
+                current = current[part]
+
+            key = current
 
         # Transform data
         log.info('Converting data to be safe for MongoDB')
@@ -636,16 +696,10 @@ class MongoDBSink(FilterSink):
                 (database[collection], data)
             ]
 
-        # Insert data
         for dbcollection, bundle in bundles:
             bundle.update(document_id)
 
-            inserted_id = dbcollection.insert_one(bundle).inserted_id
-            log.info(
-                'Inserted document with id {} in {}.{}'.format(
-                    inserted_id, database.name, dbcollection.name
-                )
-            )
+        return bundles
 
 
 __all__ = ['MongoDBSink']
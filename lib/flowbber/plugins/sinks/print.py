@@ -60,6 +60,9 @@ from flowbber.components import FilterSink
 
 
 class PrintSink(FilterSink):
+
+    preload = ('pprintpp', )
+
     def declare_config(self, config):
         super().declare_config(config)
 
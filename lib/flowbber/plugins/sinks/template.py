@@ -415,6 +415,9 @@ def import_function(function_path):
 
 
 class TemplateSink(FilterSink):
+
+    preload = ('jinja2', )
+
     def declare_config(self, config):
         super().declare_config(config)
 
@@ -186,6 +186,8 @@ log = get_logger(__name__)
 
 class CoberturaSource(Source):
 
+    preload = ('pycobertura', )
+
     def declare_config(self, config):
         config.add_option(
             'xmlpath',
@@ -219,6 +221,9 @@ class CoberturaSource(Source):
             },
         )
 
+    def inputs(self):
+        return [self.config.xmlpath.value]
+
     def collect(self):
         from pycobertura import Cobertura
 
@@ -64,6 +64,9 @@ from flowbber.components import Source
 
 
 class CPUSource(Source):
+
+    preload = ('psutil', )
+
     def collect(self):
         from psutil import cpu_percent
 
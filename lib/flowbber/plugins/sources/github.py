@@ -147,6 +147,8 @@ from flowbber.components import Source
 
 class GitHubSource(Source):
 
+    preload = ('github', )
+
     def declare_config(self, config):
         config.add_option(
             'token',
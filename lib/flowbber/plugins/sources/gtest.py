@@ -191,6 +191,9 @@ class GTestSource(Source):
             },
         )
 
+    def inputs(self):
+        return [self.config.xmlpath.value]
+
     def collect(self):
         # Check if file exists
         infile = Path(self.config.xmlpath.value)
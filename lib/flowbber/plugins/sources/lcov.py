@@ -235,6 +235,8 @@ log = get_logger(__name__)
 
 class LcovSource(Source):
 
+    preload = ('lcov_cobertura', 'pycobertura')
+
     def declare_config(self, config):
         config.add_option(
             'source',
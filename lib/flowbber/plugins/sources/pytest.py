@@ -177,6 +177,9 @@ class PytestSource(Source):
             },
         )
 
+    def inputs(self):
+        return [self.config.xmlpath.value]
+
     def collect(self):
         # Check if file exists
         infile = Path(self.config.xmlpath.value)
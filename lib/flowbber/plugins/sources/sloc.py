@@ -270,6 +270,8 @@ def analyze_directory(directory, include, exclude):
 
 class SLOCSource(Source):
 
+    preload = ('pygount', )
+
     def declare_config(self, config):
 
         config.add_option(
@@ -310,6 +312,9 @@ class SLOCSource(Source):
             },
         )
 
+    def inputs(self):
+        return [self.config.directory.value]
+
     def collect(self):
         directory = self.config.directory.value
         include = self.config.include.value
@@ -122,6 +122,8 @@ log = get_logger(__name__)
 
 class SpeedSource(Source):
 
+    preload = ('pyspeedtest', )
+
     def declare_config(self, config):
         config.add_option(
             'host',
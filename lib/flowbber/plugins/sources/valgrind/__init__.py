@@ -26,6 +26,8 @@ from flowbber.components import Source
 
 class ValgrindBaseSource(Source):
 
+    preload = ('xmltodict', )
+
     def declare_config(self, config):
         config.add_option(
             'xmlpath',
@@ -35,6 +37,9 @@ class ValgrindBaseSource(Source):
             },
         )
 
+    def inputs(self):
+        return [self.config.xmlpath.value]
+
     def collect(self):
         from xmltodict import parse
 
@@ -17,14 +17,33 @@
 
 """
 Pipeline scheduler.
+
+The scheduler runs on an :mod:`asyncio` event loop, either its own when
+calling :meth:`Scheduler.run`, or any running loop when awaiting
+:meth:`Scheduler.serve`, and executes the runs of the pipeline in threads so
+the loop is free to do other work while a run is in progress.
+
+The ticks of the schedule are kept on the monotonic clock of the loop, so a
+frequency schedule doesn't drift, and isn't shifted by jumps of the wall
+clock. Cron schedules follow the wall clock, and each tick is converted to the
+monotonic clock when it is computed.
 """
 
-from sched import scheduler
-from time import time, sleep
+from math import floor
+from random import uniform
+from time import time
+from functools import partial
 from datetime import timedelta
 from traceback import format_exc
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from asyncio import (
+    new_event_loop, get_event_loop, ensure_future, gather, sleep,
+)
 
 from .logging import get_logger
+from .utils.cron import CronExpression
+from .metrics import PipelineMetrics
 
 
 log = get_logger(__name__)
@@ -40,9 +59,49 @@ class Scheduler:
     run at the expected schedule because the previous run was still running and
     will start the missed pipeline execution right away.
 
+    How the missed runs are caught up is configurable:
+
+    ``skip``
+        The missed runs are skipped, and the pipeline runs again on the next
+        tick of the schedule.
+
+    ``coalesce``
+        The missed runs are coalesced into a single run started right away.
+
+    ``burst``
+        A run is started right away for each missed run, one after the other,
+        until the scheduler catches up with the schedule.
+
+    If more than one run is allowed in flight, successive runs overlap
+    instead, each one executed by its own replica of the pipeline, and the
+    runs stay on the schedule. A tick of the schedule is missed only when the
+    maximum number of runs are still in flight, and is always skipped.
+
+    The schedule is either a fixed frequency, or a cron expression (see
+    :mod:`flowbber.utils.cron`). A random jitter can be added to the
+    schedule, so the schedulers of many hosts started at the same time don't
+    run their pipelines on the same second.
+
+    The delay of each run after its tick is observed in the :attr:`lateness`
+    histogram.
+
+    The samples can be batched, to distribute them to the sinks not
+    subscribed to sources in a single execution. The runs then leave the
+    sinks out, and the data of each successful run is buffered until the
+    batch holds the given number of samples, or its first sample is older
+    than the given interval when a run ends. The samples left are
+    distributed when the scheduler ends.
+
+    The scheduler can shed load when the runs fall behind the schedule. After
+    the given number of consecutive runs late for their next tick, the
+    optional components marked ``shed_first`` are left out of the runs, or
+    reuse their last result if they are sources, until the same number of
+    consecutive runs end on time.
+
     :param pipeline: The pipeline to execute.
     :type pipeline: :class:`flowbber.pipeline.Pipeline`.
-    :param float frequency: Sampling frequency in seconds.
+    :param float frequency: Sampling frequency in seconds. Can be ``None`` if
+     a cron expression is given.
     :param int samples: Number of samples (successful executions of the
      pipeline) to take before stopping the scheduler.
      If missing or ``None``, the scheduler will continue taking samples
@@ -53,24 +112,102 @@ class Scheduler:
      If missing or ``None``, the scheduler will start immediately.
     :param bool stop_on_failure: Stop the the scheduler if the pipeline fails
      one execution. Else keep scheduling run even on failure.
+    :param str metrics_file: Path to a file to write the metrics of the
+     executions of the pipeline to after each run.
+     If missing or ``None``, no metrics are written.
+    :param int max_in_flight: Maximum number of runs of the pipeline
+     executing at the same time.
+    :param str cron: Cron expression of the schedule, used instead of the
+     frequency.
+    :param float jitter: Maximum delay in seconds of the schedule. The
+     schedule is delayed by a random time between zero and this value, drawn
+     when the scheduler starts. If missing or ``None``, there is no jitter.
+    :param str catch_up: Policy to catch up with the missed runs, either
+     ``skip``, ``coalesce`` or ``burst``.
+    :param int batch: Number of samples to distribute to the sinks at once.
+     If missing or ``None``, and no batch interval is given, the samples are
+     not batched.
+    :param float batch_interval: Time in seconds to batch the samples for
+     before distributing them to the sinks. If missing or ``None``, and no
+     batch size is given, the samples are not batched.
+    :param int shed_after: Number of consecutive runs late for their next
+     tick after which the components that can be shed first are left out of
+     the runs, and of consecutive runs on time after which they are brought
+     back. If missing or ``None``, no components are shed.
     """
 
     def __init__(
             self, pipeline, frequency,
             samples=None, start=None,
-            stop_on_failure=False):
+            stop_on_failure=False, metrics_file=None,
+            max_in_flight=1, cron=None, jitter=None, catch_up='coalesce',
+            batch=None, batch_interval=None, shed_after=None):
+
+        if (frequency is None) == (cron is None):
+            raise ValueError(
+                'Either a frequency or a cron expression must be given'
+            )
+
+        if catch_up not in ('skip', 'coalesce', 'burst'):
+            raise ValueError(
+                'Unknown catch up policy "{}"'.format(catch_up)
+            )
 
         self._pipeline = pipeline
         self._frequency = frequency
+        self._cron = None
+        if cron is not None:
+            self._cron = CronExpression(cron)
+        self._jitter = jitter
+        self._catch_up = catch_up
         self._samples = samples
         self._start = start
         self._stop_on_failure = stop_on_failure
+        self._metrics_file = metrics_file
+        self._batch = batch
+        self._batch_interval = batch_interval
+        self._batching = batch is not None or batch_interval is not None
+        self._shed_after = shed_after
 
         self._runs_passed = 0
         self._runs_failed = 0
         self._runs_missed = 0
+        self._runs_overlapped = 0
+        self._runs_shed = 0
+        self._late = 0
+        self._on_time = 0
         self._last_run = None
-        self._scheduler = scheduler(time, sleep)
+        self._first = None
+        self._offset = 0.0
+
+        self._loop = None
+        self._max_in_flight = max_in_flight
+        self._in_flight = []
+        self._idle = [pipeline]
+        self._failure = None
+        self._executor = None
+        self._batched = []
+        self._batch_start = None
+
+        # Kept even if not written to a file, as the lateness of the runs is
+        # exposed by the scheduler
+        self._metrics = PipelineMetrics(self._pipeline.name)
+
+        if max_in_flight > 1:
+            log.info('Creating {} replicas of pipeline {} ...'.format(
+                max_in_flight - 1, self._pipeline.name,
+            ))
+            self._idle.extend(
+                pipeline.replicate() for _ in range(max_in_flight - 1)
+            )
+        self._pipelines = list(self._idle)
+
+        if shed_after is not None and not pipeline.sheddable:
+            log.warning(
+                'Pipeline {} has no components that can be shed first'.format(
+                    self._pipeline.name,
+                )
+            )
 
         log.info('Scheduler created for pipeline :\n{}'.format(self._pipeline))
 
@@ -86,76 +223,385 @@ class Scheduler:
                 'passed': 10,
                 'failed': 2,
                 'missed': 0,
+                'overlapped': 0,
+                'shed': 0,
             }
+
+        ``overlapped`` counts the runs started while other runs of the
+        pipeline were still in flight, and ``shed`` the runs executed with
+        the components that can be shed first left out.
         """
         return {
             'passed': self._runs_passed,
             'failed': self._runs_failed,
             'missed': self._runs_missed,
+            'overlapped': self._runs_overlapped,
+            'shed': self._runs_shed,
         }
 
     @property
     def last_run(self):
         """
-        Timestamp in seconds since the epoch of the last run of the pipeline.
+        Timestamp in seconds since the epoch of the tick of the last run of
+        the pipeline.
         """
-        return self._last_run
+        if self._last_run is None:
+            return None
+        return self._wall(self._last_run)
 
-    def _sched_next(self):
+    @property
+    def max_in_flight(self):
         """
-        Schedule the next work function.
+        Maximum number of runs of the pipeline executing at the same time.
         """
-        now = time()
+        return self._max_in_flight
 
-        # Check if samples have been met
-        if self._samples is not None:
-            if self._runs_passed >= self._samples:
-                log.info(
-                    'Pipeline {} collected {} samples successfully in {}. '
-                    '{} executions failed, {} executions missed. '
-                    'Exiting...'.format(
-                        self._pipeline.name,
-                        self._runs_passed,
-                        str(timedelta(seconds=now - self._start)),
-                        self._runs_failed,
-                        self._runs_missed,
-                    )
+    @property
+    def lateness(self):
+        """
+        Read-only histogram of the delay of the runs of the pipeline after
+        their tick:
+
+        ::
+
+            {
+                'buckets': OrderedDict([
+                    (0.005, 8),
+                    (0.01, 10),
+                    ...
+                    (inf, 12),
+                ]),
+                'sum': 0.52,
+                'count': 12,
+            }
+
+        The buckets are cumulative, keyed by their upper bound in seconds.
+        """
+        buckets, total, count = self._metrics.lateness.get(
+            pipeline=self._pipeline.name,
+        )
+        return {
+            'buckets': OrderedDict(buckets),
+            'sum': total,
+            'count': count,
+        }
+
+    def _wall(self, moment):
+        """
+        Convert a time of the monotonic clock of the loop to a timestamp in
+        seconds since the epoch.
+        """
+        return moment - self._loop.time() + time()
+
+    def _monotonic(self, timestamp):
+        """
+        Convert a timestamp in seconds since the epoch to a time of the
+        monotonic clock of the loop.
+        """
+        return timestamp - time() + self._loop.time()
+
+    def _sampled(self):
+        """
+        Check if the samples have been met.
+
+        :return: ``True`` if the samples have been met.
+        :rtype: bool
+        """
+        # The samples waiting in the batch are yet to be distributed
+        collected = self._runs_passed + len(self._batched)
+
+        if self._samples is None or collected < self._samples:
+            return False
+
+        log.info(
+            'Pipeline {} collected {} samples successfully in {}. '
+            '{} executions failed, {} executions missed, {} executions '
+            'overlapped, {} executions shed. Exiting...'.format(
+                self._pipeline.name,
+                collected,
+                str(timedelta(seconds=time() - self._start)),
+                self._runs_failed,
+                self._runs_missed,
+                self._runs_overlapped,
+                self._runs_shed,
+            )
+        )
+        return True
+
+    def _next_tick(self, after):
+        """
+        Compute the time of the next tick of the schedule.
+
+        :param float after: Time of the monotonic clock of the loop to search
+         from.
+
+        :return: The time of the first tick strictly after the given one.
+        :rtype: float
+        """
+        if self._cron is not None:
+            timestamp = self._cron.next(self._wall(after) - self._offset)
+            return self._monotonic(timestamp + self._offset)
+
+        ticks = max(floor((after - self._first) / self._frequency) + 1, 0)
+        tick = self._first + ticks * self._frequency
+
+        # Rounding errors
+        if tick <= after:
+            tick += self._frequency
+        return tick
+
+    def _missed(self, tick, now):
+        """
+        Count the ticks of the schedule that were missed.
+
+        :param float tick: The first tick missed.
+        :param float now: Current time of the monotonic clock of the loop.
+
+        :return: A tuple with the number of ticks missed, the time of the
+         latest tick missed and the time of the next tick.
+        :rtype: tuple
+        """
+        if self._cron is None:
+            upcoming = self._next_tick(now)
+            missed = int(round((upcoming - tick) / self._frequency))
+            return missed, upcoming - self._frequency, upcoming
+
+        missed = 0
+        while tick <= now:
+            missed += 1
+            latest = tick
+            tick = self._next_tick(tick)
+
+        return missed, latest, tick
+
+    def _record_missed(self, missed):
+        """
+        Record missed runs of the pipeline.
+
+        :param int missed: Number of runs missed.
+        """
+        self._runs_missed += missed
+        for _ in range(missed):
+            self._metrics.record_run('missed')
+
+    def _adapt(self, late):
+        """
+        Start shedding the components that can be shed first after too many
+        consecutive late runs, and stop after as many consecutive runs on
+        time.
+
+        :param bool late: ``True`` if the run, or the tick, was late for the
+         next tick of the schedule.
+        """
+        if self._shed_after is None:
+            return
+
+        if late:
+            self._late += 1
+            self._on_time = 0
+        else:
+            self._on_time += 1
+            self._late = 0
+
+        shedding = self._pipeline.shedding
+
+        if not shedding and self._late >= self._shed_after:
+            log.warning(
+                'Pipeline {} fell behind the schedule for {} runs. Shedding '
+                'components {} ...'.format(
+                    self._pipeline.name, self._late,
+                    ', '.join(
+                        '"{}"'.format(component.id)
+                        for component in self._pipeline.sheddable
+                    ),
                 )
-                return
+            )
+
+        elif shedding and self._on_time >= self._shed_after:
+            log.info(
+                'Pipeline {} back on schedule for {} runs. Restoring shed '
+                'components ...'.format(self._pipeline.name, self._on_time)
+            )
+
+        else:
+            return
+
+        for pipeline in self._pipelines:
+            pipeline.shed(not shedding)
+
+    def _next(self, scheduled):
+        """
+        Compute the tick of the next run after a run ended, catching up with
+        the ticks missed while it was running.
+
+        :param float scheduled: The tick of the run that ended.
+
+        :return: The tick of the next run, or ``None`` if the samples have
+         been met. The tick is in the past if the next run must start right
+         away.
+        :rtype: float
+        """
+        now = self._loop.time()
+
+        # Check if samples have been met
+        if self._sampled():
+            return None
 
         # If not, continue scheduling samples
-        next_time = self._last_run + self._frequency
+        next_time = self._next_tick(scheduled)
+        self._adapt(next_time <= now)
 
         # Check no ticks were missing, if next_time is in the past
-        if next_time <= now:
-            self._runs_missed += 1
+        if next_time > now:
+            log.info('Scheduling next pipeline run in {} ...'.format(
+                str(timedelta(seconds=next_time - now)),
+            ))
+            return next_time
+
+        # Run each missed tick right away
+        if self._catch_up == 'burst':
+            self._record_missed(1)
+            log.info(
+                'Next run missed. Starting {} pipeline immediately to catch '
+                'up ...'.format(self._pipeline.name)
+            )
+            return next_time
 
+        missed, latest, upcoming = self._missed(next_time, now)
+        self._record_missed(missed)
+
+        if self._catch_up == 'skip':
             log.info(
-                'Next run missed. Starting {} pipeline immediately ...'.format(
-                    self._pipeline.name
+                '{} runs missed. Skipping to the next run of {} pipeline in '
+                '{} ...'.format(
+                    missed, self._pipeline.name,
+                    str(timedelta(seconds=upcoming - now)),
                 )
             )
-            event = self._scheduler.enter(
-                0, 1, self._sched_work
+            return upcoming
+
+        log.info(
+            '{} runs missed. Starting {} pipeline immediately ...'.format(
+                missed, self._pipeline.name
             )
+        )
+        return latest
+
+    async def _work(self, scheduled):
+        """
+        Execute a run of the pipeline and compute the tick of the next one.
+
+        :param float scheduled: The tick of the run.
+
+        :return: The tick of the next run, or ``None`` if the schedule ended.
+        :rtype: float
+        """
+        await self._execute(self._idle.pop(), scheduled)
+
+        if self._failure is not None:
+            raise self._failure
+
+        return self._next(scheduled)
+
+    async def _tick(self, scheduled):
+        """
+        Start a run of the pipeline on a tick of the schedule, unless the
+        maximum number of runs are in flight, and compute the next tick.
+
+        :param float scheduled: The tick.
+
+        :return: The next tick, or ``None`` if the schedule ended.
+        :rtype: float
+        """
+        now = self._loop.time()
+        late = False
+
+        self._in_flight = [
+            task for task in self._in_flight if not task.done()
+        ]
+
+        if self._failure is not None or self._sampled():
+            await self._join()
+            if self._failure is not None:
+                raise self._failure
+            return None
+
+        pending = self._samples is not None and (
+            self._runs_passed + len(self._batched) + len(self._in_flight) >=
+            self._samples
+        )
+
+        if pending:
+            log.debug(
+                'Waiting for the runs in flight of pipeline {} to collect the '
+                'remaining samples'.format(self._pipeline.name)
+            )
+
+        elif len(self._in_flight) >= self._max_in_flight:
+            log.warning(
+                'Tick missed. {} runs of pipeline {} still running'.format(
+                    len(self._in_flight), self._pipeline.name,
+                )
+            )
+            self._record_missed(1)
+            late = True
 
         else:
-            log.info('Scheduling next pipeline run in {} ...'.format(
-                str(timedelta(seconds=next_time - now)),
+            if self._in_flight:
+                log.info(
+                    'Starting run of pipeline {} overlapping {} runs in '
+                    'flight ...'.format(
+                        self._pipeline.name, len(self._in_flight),
+                    )
+                )
+                self._runs_overlapped += 1
+                self._metrics.record_overlapped()
+
+            self._in_flight.append(ensure_future(
+                self._execute(self._idle.pop(), scheduled)
             ))
-            event = self._scheduler.enterabs(
-                next_time, 1, self._sched_work
-            )
 
-        self._last_run = event.time
+        # Stay on the schedule, skipping the ticks already past
+        next_time = self._next_tick(scheduled)
+        if next_time <= now:
+            missed, _, next_time = self._missed(next_time, now)
+            log.warning('{} ticks of pipeline {} missed'.format(
+                missed, self._pipeline.name
+            ))
+            self._record_missed(missed)
+            late = True
+
+        self._adapt(late)
+        return next_time
 
-    def _sched_work(self):
+    async def _execute(self, pipeline, scheduled):
         """
-        Execute the work function and schedule the next no matter what.
+        Execute a run of the pipeline in a thread.
+
+        A run that is batched is only counted once its batch is distributed.
+
+        :param pipeline: The pipeline, or the replica of the pipeline, to
+         execute.
+        :type pipeline: :class:`flowbber.pipeline.Pipeline`
+        :param float scheduled: The tick of the run.
         """
+        self._metrics.record_lateness(
+            max(0, self._loop.time() - scheduled)
+        )
+
+        if pipeline.shedding:
+            self._runs_shed += 1
+            self._metrics.record_shed()
+
         try:
-            self._pipeline.run()
-            self._runs_passed += 1
+            journal = await self._loop.run_in_executor(
+                self._executor,
+                partial(
+                    pipeline.run,
+                    scheduled=self._wall(scheduled),
+                    distribute=not self._batching,
+                ),
+            )
 
         except Exception as e:
             log.error(
@@ -163,44 +609,209 @@ class Scheduler:
                     self._pipeline.name, format_exc()
                 )
             )
-            self._runs_failed += 1
+            self._record_run(None)
 
-            if self._stop_on_failure:
-                raise e
+            if self._stop_on_failure and self._failure is None:
+                self._failure = e
 
-        self._sched_next()
+        else:
+            if not self._batching:
+                self._record_run(journal)
+                return
 
-    def run(self):
+            self._batched.append((pipeline.data, journal))
+            if self._batch_start is None:
+                self._batch_start = scheduled
+
+            if self._batch_full():
+                await self._flush(pipeline)
+
+        finally:
+            self._idle.append(pipeline)
+
+    def _batch_full(self):
         """
-        Start the scheduler.
+        Check if the batch of samples must be distributed.
+
+        :return: ``True`` if the batch holds enough samples, or its first
+         sample is too old.
+        :rtype: bool
         """
-        now = time()
+        if self._batch is not None and len(self._batched) >= self._batch:
+            return True
 
-        if self._start is not None:
+        return self._batch_interval is not None and (
+            self._loop.time() - self._batch_start >= self._batch_interval
+        )
 
-            if self._start < now:
-                raise ValueError(
-                    'Invalid start time {}.'.format(self._start)
-                )
+    async def _flush(self, pipeline):
+        """
+        Distribute the batch of samples to the sinks, and record the runs of
+        the batch.
 
-            log.info('Pipeline scheduled to run in {} ...'.format(
-                str(timedelta(seconds=self._start - now))
-            ))
-            event = self._scheduler.enterabs(
-                self._start, 1, self._sched_work
+        The entries of the sinks are added to the journals of the runs of the
+        batch before saving them. A failure to distribute the batch is
+        logged, and stops the scheduler if it stops on failure. The runs of a
+        batch that failed are counted as failed and their samples are lost.
+
+        :param pipeline: The pipeline, or the replica of the pipeline, to
+         distribute the batch with. It must not be running.
+        :type pipeline: :class:`flowbber.pipeline.Pipeline`
+        """
+        if not self._batched:
+            return
+
+        batch = self._batched
+        self._batched = []
+        self._batch_start = None
+
+        try:
+            await self._loop.run_in_executor(
+                self._executor,
+                partial(
+                    pipeline.distribute,
+                    [data for data, journal in batch],
+                    journals=[journal for data, journal in batch],
+                ),
             )
 
+        except Exception as e:
+            log.error(
+                'Pipeline "{}" failed to distribute a batch of {} '
+                'samples:\n{}'.format(
+                    self._pipeline.name, len(batch), format_exc()
+                )
+            )
+
+            for _ in batch:
+                self._record_run(None)
+
+            if self._stop_on_failure and self._failure is None:
+                self._failure = e
+
+            return
+
+        for data, journal in batch:
+            self._record_run(journal)
+
+    async def _join(self):
+        """
+        Wait for the runs in flight to end.
+        """
+        await gather(*self._in_flight)
+        self._in_flight = []
+
+    def _record_run(self, journal):
+        """
+        Count a run as passed or failed, and write the metrics to the metrics
+        file.
+
+        :param dict journal: The journal of the run, or ``None`` if the run
+         failed.
+        """
+        if journal is None:
+            self._runs_failed += 1
         else:
+            self._runs_passed += 1
 
+        self._metrics.record_run('failed' if journal is None else 'passed')
+
+        if journal is not None:
+            self._metrics.record_journal(journal)
+
+        if self._metrics_file is None:
+            return
+
+        try:
+            self._metrics.write(self._metrics_file)
+        except Exception:
+            log.exception(
+                'Unable to write metrics to {}'.format(self._metrics_file)
+            )
+
+    def _first_tick(self):
+        """
+        Compute the first tick of the schedule.
+
+        :return: The time of the first tick on the monotonic clock of the
+         loop.
+        :rtype: float
+        """
+        now = time()
+
+        if self._start is not None and self._start < now:
+            raise ValueError(
+                'Invalid start time {}.'.format(self._start)
+            )
+
+        if self._start is None:
             self._start = now
 
+        # Delay the whole schedule by a random time
+        if self._jitter:
+            self._offset = uniform(0, self._jitter)
+            log.info('Schedule of pipeline {} delayed {} by jitter'.format(
+                self._pipeline.name, str(timedelta(seconds=self._offset)),
+            ))
+
+        if self._cron is not None:
+            first = self._next_tick(self._monotonic(self._start))
+        else:
+            first = self._monotonic(self._start + self._offset)
+            self._first = first
+
+        delay = first - self._loop.time()
+        if delay <= 0:
             log.info('Pipeline scheduled immediately ...')
-            event = self._scheduler.enter(
-                0, 1, self._sched_work
-            )
+        else:
+            log.info('Pipeline scheduled to run in {} ...'.format(
+                str(timedelta(seconds=delay))
+            ))
+
+        return first
+
+    def run(self):
+        """
+        Run the scheduler in its own event loop until it ends.
+        """
+        loop = new_event_loop()
+        try:
+            loop.run_until_complete(self.serve())
+        finally:
+            loop.close()
+
+    async def serve(self):
+        """
+        Run the scheduler in the running event loop until it ends.
+
+        This coroutine can be awaited along other tasks, including the
+        schedulers of other pipelines. The runs of the pipeline are executed
+        in threads and don't block the loop.
+
+        :raise Exception: The exception of the run that failed, if the
+         scheduler stops on failure.
+        """
+        self._loop = get_event_loop()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self._max_in_flight,
+        )
+
+        work = self._work
+        if self._max_in_flight > 1:
+            work = self._tick
+
+        try:
+            tick = self._first_tick()
+
+            while tick is not None:
+                await sleep(max(0, tick - self._loop.time()))
+                self._last_run = tick
+                tick = await work(tick)
 
-        self._last_run = event.time
-        self._scheduler.run()
+        finally:
+            await self._join()
+            await self._flush(self._pipeline)
+            self._executor.shutdown(wait=False)
 
 
 __all__ = ['Scheduler']
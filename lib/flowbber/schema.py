@@ -22,6 +22,7 @@ Schema for the pipeline definition data structure.
 from cerberus import Validator
 
 from .logging import get_logger
+from .utils.shm import DEFAULT_THRESHOLD
 
 
 log = get_logger(__name__)
@@ -45,6 +46,11 @@ COMPONENT_SCHEMA = {
         'required': False,
         'default': False,
     },
+    'shed_first': {
+        'type': 'boolean',
+        'required': False,
+        'default': False,
+    },
     'timeout': {
         'coerce': 'timedelta_nullable',
         'required': False,
@@ -52,6 +58,77 @@ COMPONENT_SCHEMA = {
         'nullable': True,
         'min': 0,
     },
+    'executor': {
+        'required': False,
+        'type': 'string',
+        'allowed': ['process', 'thread', 'inline'],
+        'default': 'process',
+    },
+    'reads': {
+        'required': False,
+        'type': 'list',
+        'default': None,
+        'nullable': True,
+        'schema': {
+            'type': 'string',
+        },
+    },
+    'writes': {
+        'required': False,
+        'type': 'list',
+        'default': None,
+        'nullable': True,
+        'schema': {
+            'type': 'string',
+        },
+    },
+    'subscribe': {
+        'required': False,
+        'type': 'list',
+        'default': None,
+        'nullable': True,
+        'schema': SLUG_SCHEMA,
+    },
+    'cpu_affinity': {
+        'required': False,
+        'type': 'list',
+        'default': None,
+        'nullable': True,
+        'empty': False,
+        'schema': {
+            'type': 'integer',
+            'min': 0,
+        },
+    },
+    'nice': {
+        'required': False,
+        'type': 'integer',
+        'default': None,
+        'nullable': True,
+        'min': -20,
+        'max': 19,
+    },
+    'max_rss': {
+        'required': False,
+        'type': 'integer',
+        'default': None,
+        'nullable': True,
+        'min': 1,
+    },
+    'max_cpu_seconds': {
+        'required': False,
+        'type': 'integer',
+        'default': None,
+        'nullable': True,
+        'min': 1,
+    },
+    'every': {
+        'coerce': 'timedelta_nullable',
+        'required': False,
+        'default': None,
+        'nullable': True,
+        'min': 1,
+    },
     'config': {
         'required': False,
         'type': 'dict',
@@ -69,6 +146,26 @@ SCHEDULER_SCHEMA = {
     'frequency': {
         'required': True,
         'coerce': 'timedelta',
+        'excludes': 'cron',
+    },
+    'cron': {
+        'required': True,
+        'type': 'string',
+        'coerce': 'cron',
+        'excludes': 'frequency',
+    },
+    'jitter': {
+        'coerce': 'timedelta_nullable',
+        'required': False,
+        'default': None,
+        'nullable': True,
+        'min': 0,
+    },
+    'catch_up': {
+        'required': False,
+        'type': 'string',
+        'allowed': ['skip', 'coalesce', 'burst'],
+        'default': 'coalesce',
     },
     'samples': {
         'required': False,
@@ -88,7 +185,216 @@ SCHEDULER_SCHEMA = {
         'required': False,
         'type': 'boolean',
         'default': False,
-    }
+    },
+    'metrics_file': {
+        'required': False,
+        'type': 'string',
+        'empty': False,
+        'nullable': True,
+        'default': None,
+    },
+    'max_in_flight': {
+        'required': False,
+        'type': 'integer',
+        'min': 1,
+        'default': 1,
+    },
+    'batch': {
+        'required': False,
+        'type': 'integer',
+        'min': 1,
+        'nullable': True,
+        'default': None,
+    },
+    'batch_interval': {
+        'coerce': 'timedelta_nullable',
+        'required': False,
+        'default': None,
+        'nullable': True,
+        'min': 0,
+    },
+    'shed_after': {
+        'required': False,
+        'type': 'integer',
+        'min': 1,
+        'nullable': True,
+        'default': None,
+    },
+}
+
+
+EXECUTION_SCHEMA = {
+    'pool': {
+        'required': False,
+        'type': 'boolean',
+        'default': False,
+    },
+    'pool_max_runs': {
+        'required': False,
+        'type': 'integer',
+        'min': 1,
+        'nullable': True,
+        'default': None,
+    },
+    'pool_max_rss': {
+        'required': False,
+        'type': 'integer',
+        'min': 1,
+        'nullable': True,
+        'default': None,
+    },
+    'transport_threshold': {
+        'required': False,
+        'type': 'integer',
+        'min': 0,
+        'nullable': True,
+        'default': DEFAULT_THRESHOLD,
+    },
+    'fuse_aggregators': {
+        'required': False,
+        'type': 'boolean',
+        'default': False,
+    },
+    'preload': {
+        'required': False,
+        'type': 'boolean',
+        'default': False,
+    },
+    'cache': {
+        'required': False,
+        'type': 'boolean',
+        'default': False,
+    },
+    'cache_dir': {
+        'required': False,
+        'type': 'string',
+        'empty': False,
+        'nullable': True,
+        'default': None,
+    },
+    'cache_max_size': {
+        'required': False,
+        'type': 'integer',
+        'min': 1,
+        'nullable': True,
+        'default': None,
+    },
+    'cache_max_age': {
+        'coerce': 'timedelta_nullable',
+        'required': False,
+        'default': None,
+        'nullable': True,
+        'min': 1,
+    },
+    'cache_hash': {
+        'required': False,
+        'type': 'boolean',
+        'default': False,
+    },
+    'max_workers': {
+        'required': False,
+        'type': 'integer',
+        'min': 1,
+        'nullable': True,
+        'default': None,
+    },
+    'max_workers_sources': {
+        'required': False,
+        'type': 'integer',
+        'min': 1,
+        'nullable': True,
+        'default': None,
+    },
+    'max_workers_aggregators': {
+        'required': False,
+        'type': 'integer',
+        'min': 1,
+        'nullable': True,
+        'default': None,
+    },
+    'max_workers_sinks': {
+        'required': False,
+        'type': 'integer',
+        'min': 1,
+        'nullable': True,
+        'default': None,
+    },
+    'longest_first': {
+        'required': False,
+        'type': 'boolean',
+        'default': False,
+    },
+    'longest_first_history': {
+        'required': False,
+        'type': 'integer',
+        'min': 1,
+        'default': 10,
+    },
+    'profile': {
+        'required': False,
+        'type': 'string',
+        'allowed': ['deterministic', 'sampling'],
+        'nullable': True,
+        'default': None,
+    },
+    'profile_dir': {
+        'required': False,
+        'type': 'string',
+        'empty': False,
+        'nullable': True,
+        'default': None,
+    },
+    'trace': {
+        'required': False,
+        'type': 'boolean',
+        'default': False,
+    },
+    'trace_dir': {
+        'required': False,
+        'type': 'string',
+        'empty': False,
+        'nullable': True,
+        'default': None,
+    },
+    'journal': {
+        'required': False,
+        'type': 'string',
+        'allowed': ['files', 'jsonl', 'sqlite'],
+        'default': 'files',
+    },
+    'journal_dir': {
+        'required': False,
+        'type': 'string',
+        'empty': False,
+        'nullable': True,
+        'default': None,
+    },
+    'journal_max_age': {
+        'coerce': 'timedelta_nullable',
+        'required': False,
+        'default': None,
+        'nullable': True,
+        'min': 1,
+    },
+    'journal_max_runs': {
+        'required': False,
+        'type': 'integer',
+        'min': 1,
+        'nullable': True,
+        'default': None,
+    },
+    'journal_max_size': {
+        'required': False,
+        'type': 'integer',
+        'min': 1,
+        'default': 10,
+    },
+    'journal_max_files': {
+        'required': False,
+        'type': 'integer',
+        'min': 0,
+        'default': 5,
+    },
 }
 
 
@@ -98,6 +404,12 @@ PIPELINE_SCHEMA = {
         'type': 'dict',
         'schema': SCHEDULER_SCHEMA,
     },
+    'execution': {
+        'required': False,
+        'type': 'dict',
+        'default': {},
+        'schema': EXECUTION_SCHEMA,
+    },
     'sources': {
         'required': True,
         'type': 'list',
@@ -136,6 +448,8 @@ class TimedeltaValidator(Validator):
 
     For this transformation the pytimeparse library is used.
 
+    It also allows to validate cron expressions with the ``cron`` coercer.
+
     .. _pytimeparse: https://github.com/wroberts/pytimeparse
     """
 
@@ -156,5 +470,12 @@ class TimedeltaValidator(Validator):
 
         return timedelta
 
+    def _normalize_coerce_cron(self, value):
+        from .utils.cron import CronExpression
+
+        # Raises ValueError if invalid
+        CronExpression(value)
+        return value
+
 
 __all__ = ['TimedeltaValidator']
@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2018 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Timeline traces of the executions of a pipeline.
+
+Traces are written in the trace event format, the JSON format understood by
+the ``chrome://tracing`` viewer and by Perfetto.
+
+Each component gets its own track, grouped by the process that executed it,
+with spans for the spawn of the process, the execution, the serialization of
+the result and the join by the pipeline. The track of the pipeline has spans
+for the stages, and counters for the backlog of the logging queue and for the
+lateness of the scheduler.
+"""
+
+from os import getpid
+from time import time
+from pathlib import Path
+from threading import Thread, Event
+
+from ujson import dumps
+
+from .logging import get_logger, get_backlog
+
+
+log = get_logger(__name__)
+
+
+ACTIONS = {
+    'source': 'collect',
+    'aggregator': 'accumulate',
+    'sink': 'distribute',
+}
+"""
+Name of the span of the execution of each type of component.
+"""
+
+
+def microseconds(seconds):
+    """
+    Convert a time in seconds to the microseconds used by the trace format.
+
+    :param float seconds: The time in seconds.
+
+    :return: The time in microseconds.
+    :rtype: float
+    """
+    return seconds * 1000000
+
+
+class BacklogSampler(Thread):
+    """
+    Thread that samples the backlog of the logging queue.
+
+    :param float interval: Time in seconds between samples.
+    """
+
+    def __init__(self, interval):
+        super().__init__(daemon=True)
+        self.samples = []
+        self._interval = interval
+        self._finished = Event()
+
+    def run(self):
+        while True:
+            backlog = get_backlog()
+            if backlog is not None:
+                self.samples.append((time(), backlog))
+
+            if self._finished.wait(self._interval):
+                break
+
+    def stop(self):
+        """
+        Stop sampling and wait for the thread to end.
+        """
+        self._finished.set()
+        self.join()
+
+
+class Tracer:
+    """
+    Tracer of the executions of a pipeline.
+
+    :param str directory: Directory to write the traces to.
+    :param float interval: Time in seconds between samples of the counters.
+    """
+
+    def __init__(self, directory, interval=0.05):
+        self._directory = Path(directory)
+        self._interval = interval
+
+        self._start = None
+        self._scheduled = None
+        self._sampler = None
+
+        self._directory.mkdir(parents=True, exist_ok=True)
+
+    def begin(self, scheduled=None):
+        """
+        Begin tracing a run of the pipeline.
+
+        :param float scheduled: Time the run was scheduled at, if scheduled.
+        """
+        self._start = time()
+        self._scheduled = scheduled
+        self._sampler = BacklogSampler(self._interval)
+        self._sampler.start()
+
+    def end(self, name, journal, stages):
+        """
+        End tracing a run of the pipeline and write its trace.
+
+        :param str name: Name of the trace file, without extension.
+        :param dict journal: The journal of the run.
+        :param dict stages: Mapping of the name of each stage to a tuple with
+         the time it started and its duration in seconds.
+
+        :return: Path to the trace file.
+        :rtype: :py:class:`pathlib.Path`
+        """
+        self._sampler.stop()
+
+        pipeline = getpid()
+        events = [
+            self._metadata('process_name', pipeline, 0, 'flowbber pipeline'),
+            self._metadata('thread_name', pipeline, 0, 'stages'),
+        ]
+
+        for stage, (start, duration) in stages.items():
+            events.append(self._span(stage, pipeline, 0, start, duration))
+
+        # Counters
+        for timestamp, backlog in self._sampler.samples:
+            events.append(self._counter(
+                'logging backlog', pipeline, timestamp, {'records': backlog},
+            ))
+
+        if self._scheduled is not None:
+            events.append({
+                'name': 'tick',
+                'ph': 'i',
+                's': 'g',
+                'pid': pipeline,
+                'tid': 0,
+                'ts': microseconds(self._scheduled),
+            })
+            events.append(self._counter(
+                'scheduler', pipeline, self._start,
+                {'lateness': max(0, self._start - self._scheduled)},
+            ))
+
+        events.extend(self._components(journal))
+
+        path = self._directory / '{}.json'.format(name)
+        with path.open('w', encoding='utf-8') as tracefd:
+            tracefd.write(dumps({
+                'traceEvents': events,
+                'displayTimeUnit': 'ms',
+            }))
+
+        return path
+
+    def _components(self, journal):
+        """
+        Create the events of the executions of the components.
+
+        :param dict journal: The journal of the run.
+
+        :return: The list of events.
+        :rtype: list
+        """
+        events = []
+        processes = set()
+        track = 0
+
+        for stage in ('sources', 'aggregators', 'sinks'):
+            name = stage[:-1]
+
+            for entry in journal[stage]:
+                if entry['started'] is None:
+                    continue
+
+                track += 1
+                pid = entry['pid']
+
+                if pid not in processes:
+                    processes.add(pid)
+                    if pid != getpid():
+                        events.append(self._metadata(
+                            'process_name', pid, 0,
+                            'PID {}'.format(pid),
+                        ))
+
+                events.append(self._metadata(
+                    'thread_name', pid, track, entry[name],
+                ))
+
+                started = entry['started']
+                end = started + entry['duration']
+
+                if entry['spawn'] is not None:
+                    events.append(self._span(
+                        'spawn', pid, track,
+                        started - entry['spawn'], entry['spawn'],
+                    ))
+
+                span = self._span(
+                    ACTIONS[name], pid, track, started, entry['duration'],
+                )
+                span['args'] = {'status': entry['status']}
+                events.append(span)
+
+                serialization = entry['serialization'] or 0.0
+                if serialization:
+                    events.append(self._span(
+                        'serialization', pid, track, end, serialization,
+                    ))
+
+                if entry['join_wait'] is not None:
+                    events.append(self._span(
+                        'join', pid, track, end + serialization,
+                        max(0, entry['join_wait'] - serialization) + (
+                            entry['deserialization'] or 0.0
+                        ),
+                    ))
+
+        return events
+
+    def _metadata(self, name, pid, tid, value):
+        return {
+            'name': name,
+            'ph': 'M',
+            'pid': pid,
+            'tid': tid,
+            'args': {'name': value},
+        }
+
+    def _span(self, name, pid, tid, start, duration):
+        return {
+            'name': name,
+            'ph': 'X',
+            'pid': pid,
+            'tid': tid,
+            'ts': microseconds(start),
+            'dur': microseconds(duration),
+        }
+
+    def _counter(self, name, pid, timestamp, values):
+        return {
+            'name': name,
+            'ph': 'C',
+            'pid': pid,
+            'tid': 0,
+            'ts': microseconds(timestamp),
+            'args': values,
+        }
+
+
+__all__ = ['Tracer']
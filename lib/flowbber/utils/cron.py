@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2018 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Utilities for cron expressions.
+
+Expressions have the five fields of the ``crontab`` format, minute, hour,
+day of month, month and day of week, and are evaluated in local time::
+
+    */15 * * * *        every 15 minutes
+    0 3 * * mon-fri     at 3:00 on weekdays
+    30 */6 1,15 * *     every 6 hours on the 1st and 15th of each month
+
+Each field is a ``*``, a value, a range ``a-b`` or a list of them separated
+by commas, optionally followed by a step ``/n``. Months and days of week can
+also be given by their three letters English names, and both ``0`` and ``7``
+are Sunday. As in ``cron``, if both the day of month and the day of week are
+restricted, that is, they don't start with ``*``, a day matches if either of
+them matches.
+
+The ``@hourly``, ``@daily``, ``@midnight``, ``@weekly``, ``@monthly``,
+``@yearly`` and ``@annually`` shortcuts are also supported.
+"""
+
+from datetime import datetime, timedelta
+
+
+SHORTCUTS = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+    '@yearly': '0 0 1 1 *',
+    '@annually': '0 0 1 1 *',
+}
+
+MONTHS = [
+    'jan', 'feb', 'mar', 'apr', 'may', 'jun',
+    'jul', 'aug', 'sep', 'oct', 'nov', 'dec',
+]
+
+DAYS = ['sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat']
+
+FIELDS = (
+    ('minute', 0, 59, None),
+    ('hour', 0, 23, None),
+    ('day of month', 1, 31, None),
+    ('month', 1, 12, MONTHS),
+    ('day of week', 0, 7, DAYS),
+)
+"""
+Name, minimum and maximum values and names of the values of each field.
+"""
+
+SEARCH_YEARS = 5
+"""
+Number of years to search for the next time matching an expression before
+giving up, for expressions like ``0 0 30 2 *`` that never match.
+"""
+
+
+def parse_value(value, minimum, maximum, names):
+    """
+    Parse a value of a field of a cron expression.
+
+    :param str value: The value to parse.
+    :param int minimum: Minimum value of the field.
+    :param int maximum: Maximum value of the field.
+    :param list names: Names of the values of the field, starting at the
+     minimum value, or ``None``.
+
+    :return: The value as an integer.
+    :rtype: int
+    """
+    if names is not None and value.lower() in names:
+        return names.index(value.lower()) + minimum
+
+    number = int(value)
+    if not minimum <= number <= maximum:
+        raise ValueError(
+            'Value {} out of range {}-{}'.format(number, minimum, maximum)
+        )
+    return number
+
+
+def parse_field(field, minimum, maximum, names):
+    """
+    Parse a field of a cron expression.
+
+    :param str field: The field to parse.
+    :param int minimum: Minimum value of the field.
+    :param int maximum: Maximum value of the field.
+    :param list names: Names of the values of the field, starting at the
+     minimum value, or ``None``.
+
+    :return: The set of values matched by the field.
+    :rtype: set
+    """
+    values = set()
+
+    for part in field.split(','):
+        span, slash, step = part.partition('/')
+        step = int(step) if step else 1
+
+        if step < 1:
+            raise ValueError('Invalid step in {}'.format(part))
+
+        if span == '*':
+            start, end = minimum, maximum
+        elif '-' in span:
+            start, end = (
+                parse_value(value, minimum, maximum, names)
+                for value in span.split('-', 1)
+            )
+        else:
+            start = parse_value(span, minimum, maximum, names)
+            end = maximum if slash else start
+
+        if start > end:
+            raise ValueError('Invalid range in {}'.format(part))
+
+        values.update(range(start, end + 1, step))
+
+    return values
+
+
+class CronExpression:
+    """
+    Parsed cron expression.
+
+    :param str expression: The cron expression.
+
+    :raise ValueError: if the expression is invalid.
+    """
+
+    def __init__(self, expression):
+        self.expression = expression
+
+        fields = SHORTCUTS.get(expression.strip(), expression).split()
+        if len(fields) != len(FIELDS):
+            raise ValueError(
+                'Cron expression "{}" must have {} fields'.format(
+                    expression, len(FIELDS)
+                )
+            )
+
+        parsed = []
+        for field, (name, minimum, maximum, names) in zip(fields, FIELDS):
+            try:
+                parsed.append(parse_field(field, minimum, maximum, names))
+            except ValueError as e:
+                raise ValueError(
+                    'Invalid {} "{}" in cron expression "{}": {}'.format(
+                        name, field, expression, e
+                    )
+                )
+
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+
+        # Sunday is both 0 and 7, and datetime weekdays start on Monday
+        self.weekdays = {(day - 1) % 7 for day in weekdays}
+
+        self._any_day = fields[2].startswith('*')
+        self._any_weekday = fields[4].startswith('*')
+
+    def _day_matches(self, moment):
+        day = moment.day in self.days
+        weekday = moment.weekday() in self.weekdays
+
+        if self._any_day or self._any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next(self, after):
+        """
+        Compute the next time matching this expression.
+
+        :param float after: Timestamp in seconds since the epoch to search
+         from.
+
+        :return: The timestamp of the first time matching this expression
+         strictly after the given one.
+        :rtype: float
+
+        :raise ValueError: if no time matches the expression.
+        """
+        moment = datetime.fromtimestamp(after).replace(
+            second=0, microsecond=0,
+        ) + timedelta(minutes=1)
+        limit = moment.year + SEARCH_YEARS
+
+        while moment.year <= limit:
+
+            if moment.month not in self.months:
+                year, month = divmod(moment.month, 12)
+                moment = moment.replace(
+                    year=moment.year + year, month=month + 1,
+                    day=1, hour=0, minute=0,
+                )
+                continue
+
+            if not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+
+            if moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+                continue
+
+            if moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+                continue
+
+            return moment.timestamp()
+
+        raise ValueError(
+            'Cron expression "{}" never matches'.format(self.expression)
+        )
+
+    def __str__(self):
+        return self.expression
+
+
+__all__ = ['CronExpression']
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2018 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Utilities for the memory backed filesystem used to exchange large payloads.
+"""
+
+from pathlib import Path
+from tempfile import gettempdir
+
+
+# Size, in bytes, of the serialized results above which they are exchanged
+# through a file in the shared directory
+DEFAULT_THRESHOLD = 1024 * 1024
+
+
+def get_shared_directory():
+    """
+    Get the directory to write large payloads to.
+
+    :return: ``/dev/shm`` if available, or the default temporal directory
+     otherwise.
+    :rtype: str
+    """
+    shm = Path('/dev/shm')
+    if shm.is_dir():
+        return str(shm)
+    return gettempdir()
+
+
+__all__ = ['DEFAULT_THRESHOLD', 'get_shared_directory']
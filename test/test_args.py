@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2018 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Test suite for module flowbber.args.
+"""
+
+from pytest import mark, fixture
+
+from flowbber import args
+
+
+@fixture
+def parse(monkeypatch):
+    # Validation sets up the logging, which can only be done once
+    monkeypatch.setattr(args, 'validate_args', lambda namespace: namespace)
+    return args.parse_args
+
+
+@mark.parametrize(['argv', 'command', 'verbose'], [
+    [['pipeline.toml'], 'run', 0],
+    [['-vv', 'pipeline.toml'], 'run', 2],
+    [['run', '-v', 'pipeline.toml'], 'run', 1],
+    [['-v', 'journal', 'pipeline.toml'], 'journal', 1],
+    [['daemon', 'pipeline.toml', 'other.toml'], 'daemon', 0],
+])
+def test_commands(parse, argv, command, verbose):
+    namespace = parse(argv)
+    assert namespace.command == command
+    assert namespace.verbose == verbose
+
+
+def test_pipeline_named_like_command(parse):
+    namespace = parse(['run', '-d', 'journal'])
+    assert namespace.command == 'run'
+    assert namespace.pipeline == 'journal'
+    assert namespace.dry_run
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2018 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Test suite for module flowbber.components.base.
+"""
+
+from time import time
+
+from flowbber.pipeline import Pipeline
+from flowbber.inputs import validate_definition
+from flowbber.loaders import source, sink
+from flowbber.components import Source, Sink
+
+
+@source.register('test_hog')
+class HogSource(Source):
+    """
+    Source allocating the given memory, in megabytes.
+    """
+
+    def declare_config(self, config):
+        config.add_option('size', default=1024, optional=True)
+
+    def collect(self):
+        hog = bytearray(self.config.size.value * 1024 * 1024)
+        return {'size': len(hog)}
+
+
+@source.register('test_spin')
+class SpinSource(Source):
+    """
+    Source using the CPU for the given time, in seconds, either in Python
+    code or in native code.
+    """
+
+    def declare_config(self, config):
+        config.add_option('duration', default=10, optional=True)
+        config.add_option('native', default=False, optional=True)
+
+    def collect(self):
+        if self.config.native.value:
+            # Signal handlers are not run until the sum ends
+            return {'sum': sum(range(10 ** 12))}
+
+        end = time() + self.config.duration.value
+        while time() < end:
+            pass
+        return {}
+
+
+@sink.register('test_skip')
+class SkipSink(Sink):
+    """
+    Sink that does nothing with the data.
+    """
+
+    def distribute(self, data):
+        pass
+
+
+def test_limited(tmpdir):
+    """
+    The components that exceed their memory or CPU time limits end with a
+    status of their own, without affecting the others.
+    """
+    definition = validate_definition({
+        'sources': [
+            {
+                'type': 'test_hog', 'id': 'oom',
+                'max_rss': 512, 'optional': True,
+                'config': {'size': 2048},
+            },
+            {
+                'type': 'test_hog', 'id': 'fits',
+                'max_rss': 512, 'config': {'size': 16},
+            },
+            {
+                'type': 'test_spin', 'id': 'python',
+                'max_cpu_seconds': 1, 'timeout': 10, 'optional': True,
+            },
+            {
+                'type': 'test_spin', 'id': 'native',
+                'max_cpu_seconds': 1, 'timeout': 10, 'optional': True,
+                'config': {'native': True},
+            },
+        ],
+        'sinks': [{'type': 'test_skip', 'id': 'skip', 'executor': 'inline'}],
+    })
+
+    arguments = dict(definition['execution'])
+    arguments['journal_dir'] = str(tmpdir)
+    pipeline = Pipeline(definition, 'test', **arguments)
+
+    journal = pipeline.run()
+
+    assert {
+        entry['id']: entry['status'] for entry in journal['sources']
+    } == {
+        'oom': 'oom-limited',
+        'fits': 'succeeded',
+        'python': 'cpu-limited',
+        'native': 'cpu-limited',
+    }
+    assert list(pipeline.data) == ['fits']
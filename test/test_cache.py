@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2018 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Test suite for module flowbber.cache.
+"""
+
+from time import time
+from os import utime
+
+from flowbber.cache import ResultCache
+from flowbber.pipeline import Pipeline
+from flowbber.inputs import validate_definition
+from flowbber.loaders import source, sink
+from flowbber.components import Source, Sink
+
+
+@source.register('test_file')
+class FileSource(Source):
+    """
+    Source returning the contents of a file.
+    """
+
+    def declare_config(self, config):
+        config.add_option('path', optional=False)
+
+    def inputs(self):
+        return [self.config.path.value]
+
+    def collect(self):
+        with open(self.config.path.value) as fd:
+            return {'contents': fd.read()}
+
+
+@sink.register('test_ignore')
+class IgnoreSink(Sink):
+    """
+    Sink that does nothing with the data.
+    """
+
+    def distribute(self, data):
+        pass
+
+
+def test_hit_miss(tmpdir):
+    """
+    The result of a source is taken from the cache until its input file
+    changes.
+    """
+    path = tmpdir.join('input.txt')
+    path.write('first')
+
+    definition = validate_definition({
+        'execution': {'cache': True, 'cache_dir': str(tmpdir.join('cache'))},
+        'sources': [
+            {'type': 'test_file', 'id': 'file', 'config': {'path': str(path)}},
+        ],
+        'sinks': [
+            {'type': 'test_ignore', 'id': 'ignore', 'executor': 'inline'},
+        ],
+    })
+    arguments = dict(definition['execution'])
+    arguments['journal_dir'] = str(tmpdir)
+    pipeline = Pipeline(definition, 'test', **arguments)
+
+    def run():
+        entry, = pipeline.run()['sources']
+        return (
+            entry['status'], entry['cache'],
+            pipeline.data['file']['contents'],
+        )
+
+    assert run() == ('succeeded', 'miss', 'first')
+    assert run() == ('cached', 'hit', 'first')
+
+    path.write('second')
+    assert run() == ('succeeded', 'miss', 'second')
+    assert run() == ('cached', 'hit', 'second')
+
+
+def test_fingerprint(tmpdir):
+    """
+    The fingerprint of a file changes with its modification time, unless its
+    contents are hashed.
+    """
+    path = tmpdir.join('input.txt')
+    path.write('contents')
+
+    stat = ResultCache(str(tmpdir.join('stat')))
+    content = ResultCache(str(tmpdir.join('content')), content_hash=True)
+
+    inputs = [str(path)]
+    before = (stat.fingerprint(inputs), content.fingerprint(inputs))
+
+    path.setmtime(path.mtime() - 100)
+    after = (stat.fingerprint(inputs), content.fingerprint(inputs))
+
+    assert before[0] != after[0]
+    assert before[1] == after[1]
+
+
+def test_evict_age(tmpdir):
+    """
+    The entries not used for longer than the maximum age are evicted.
+    """
+    cache = ResultCache(str(tmpdir), max_age=60)
+
+    cache.put('old', {'value': 1})
+    old = time() - 120
+    utime(str(tmpdir.join('old.cache')), (old, old))
+
+    cache.put('new', {'value': 2})
+
+    assert cache.get('old') is None
+    assert cache.get('new') == {'value': 2}
+
+
+def test_evict_size(tmpdir):
+    """
+    The least recently used entries are evicted when the cache grows above
+    its maximum size.
+    """
+    cache = ResultCache(str(tmpdir), max_size=1)
+    payload = 'x' * (400 * 1024)
+
+    # The first entry is older than the second one, but used more recently
+    for age, key in ((20, 'first'), (10, 'second')):
+        cache.put(key, {'payload': payload})
+        when = time() - age
+        utime(str(tmpdir.join('{}.cache'.format(key))), (when, when))
+
+    assert cache.get('first') is not None
+
+    cache.put('third', {'payload': payload})
+
+    assert sorted(path.basename for path in tmpdir.listdir()) == [
+        'first.cache', 'third.cache',
+    ]
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2018 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Test suite for module flowbber.utils.cron.
+"""
+
+from datetime import datetime
+
+from pytest import mark, raises
+
+from flowbber.utils.cron import CronExpression
+
+
+def following(expression, moment):
+    """
+    Compute the next time matching a cron expression after a local time.
+    """
+    return datetime.fromtimestamp(
+        CronExpression(expression).next(moment.timestamp())
+    )
+
+
+@mark.parametrize(['expression', 'minutes', 'hours'], [
+    ['* * * * *', set(range(60)), set(range(24))],
+    ['5 3 * * *', {5}, {3}],
+    ['10-15 * * * *', set(range(10, 16)), set(range(24))],
+    ['*/15 */6 * * *', {0, 15, 30, 45}, {0, 6, 12, 18}],
+    ['10-30/10 1-5/2 * * *', {10, 20, 30}, {1, 3, 5}],
+    ['5/20 20/2 * * *', {5, 25, 45}, {20, 22}],
+    ['0,30,45 1,13 * * *', {0, 30, 45}, {1, 13}],
+    ['0-5/5,50-59/3 0 * * *', {0, 5, 50, 53, 56, 59}, {0}],
+])
+def test_fields(expression, minutes, hours):
+    cron = CronExpression(expression)
+
+    assert cron.minutes == minutes
+    assert cron.hours == hours
+
+
+@mark.parametrize(['expression', 'months', 'weekdays'], [
+    ['0 0 * jan,jul *', {1, 7}, set(range(7))],
+    ['0 0 * MAR-may *', {3, 4, 5}, set(range(7))],
+    # Weekdays of datetime start on Monday, Sunday is both 0 and 7
+    ['0 0 * * mon-fri', set(range(1, 13)), {0, 1, 2, 3, 4}],
+    ['0 0 * * sun', set(range(1, 13)), {6}],
+    ['0 0 * * 0', set(range(1, 13)), {6}],
+    ['0 0 * * 7', set(range(1, 13)), {6}],
+    ['0 0 * * sat,Sun', set(range(1, 13)), {5, 6}],
+])
+def test_names(expression, months, weekdays):
+    cron = CronExpression(expression)
+
+    assert cron.months == months
+    assert cron.weekdays == weekdays
+
+
+@mark.parametrize(['expression', 'equivalent'], [
+    ['@hourly', '0 * * * *'],
+    ['@daily', '0 0 * * *'],
+    ['@midnight', '0 0 * * *'],
+    ['@weekly', '0 0 * * 0'],
+    ['@monthly', '0 0 1 * *'],
+    ['@yearly', '0 0 1 1 *'],
+    ['@annually', '0 0 1 1 *'],
+])
+def test_shortcuts(expression, equivalent):
+    moment = datetime(2018, 3, 14, 15, 9)
+
+    assert following(expression, moment) == following(equivalent, moment)
+
+
+@mark.parametrize(['expression', 'moment', 'expected'], [
+    # Strictly after, on the next minute
+    [
+        '* * * * *',
+        datetime(2018, 3, 14, 15, 9, 26),
+        datetime(2018, 3, 14, 15, 10),
+    ],
+    [
+        '*/15 * * * *',
+        datetime(2018, 3, 14, 15, 0),
+        datetime(2018, 3, 14, 15, 15),
+    ],
+    [
+        '30 3 * * *',
+        datetime(2018, 3, 14, 15, 0),
+        datetime(2018, 3, 15, 3, 30),
+    ],
+    # Carry over the end of the month and of the year
+    [
+        '0 0 1 * *',
+        datetime(2018, 12, 14, 15, 0),
+        datetime(2019, 1, 1, 0, 0),
+    ],
+    [
+        '0 12 29 feb *',
+        datetime(2018, 3, 1, 0, 0),
+        datetime(2020, 2, 29, 12, 0),
+    ],
+    [
+        '0 0 31 * *',
+        datetime(2018, 4, 1, 0, 0),
+        datetime(2018, 5, 31, 0, 0),
+    ],
+    # 2018-03-14 is a Wednesday
+    [
+        '0 9 * * mon-fri',
+        datetime(2018, 3, 16, 10, 0),
+        datetime(2018, 3, 19, 9, 0),
+    ],
+])
+def test_next(expression, moment, expected):
+    assert following(expression, moment) == expected
+
+
+@mark.parametrize(['expression', 'moment', 'expected'], [
+    # Both restricted: the 20th of the month or a Monday, whichever comes
+    # first. 2018-03-14 is a Wednesday
+    [
+        '0 0 20 * mon',
+        datetime(2018, 3, 14, 12, 0),
+        datetime(2018, 3, 19, 0, 0),
+    ],
+    [
+        '0 0 15 * mon',
+        datetime(2018, 3, 14, 12, 0),
+        datetime(2018, 3, 15, 0, 0),
+    ],
+    # Only the day of month is restricted
+    [
+        '0 0 20 * *',
+        datetime(2018, 3, 14, 12, 0),
+        datetime(2018, 3, 20, 0, 0),
+    ],
+    # Only the day of week is restricted
+    [
+        '0 0 * * mon',
+        datetime(2018, 3, 14, 12, 0),
+        datetime(2018, 3, 19, 0, 0),
+    ],
+    # A wildcard with a step counts as not restricted, so both must match:
+    # the first odd day of month that is a Friday
+    [
+        '0 0 */2 * fri',
+        datetime(2018, 3, 14, 12, 0),
+        datetime(2018, 3, 23, 0, 0),
+    ],
+])
+def test_day_semantics(expression, moment, expected):
+    assert following(expression, moment) == expected
+
+
+@mark.parametrize(['expression'], [
+    [''],
+    ['* * * *'],
+    ['* * * * * *'],
+    ['60 * * * *'],
+    ['* 24 * * *'],
+    ['* * 0 * *'],
+    ['* * 32 * *'],
+    ['* * * 13 *'],
+    ['* * * * 8'],
+    ['30-10 * * * *'],
+    ['*/0 * * * *'],
+    ['a * * * *'],
+    ['* * * foo *'],
+    ['* * * * monday'],
+    ['1,,2 * * * *'],
+    ['@often'],
+])
+def test_invalid(expression):
+    with raises(ValueError):
+        CronExpression(expression)
+
+
+def test_never_matches():
+    cron = CronExpression('0 0 30 feb *')
+
+    with raises(ValueError):
+        cron.next(datetime(2018, 3, 14).timestamp())
@@ -31,6 +31,12 @@ def setup_module(module):
     ['lcov', 'pipeline.toml'],
     ['valgrind', 'pipeline.toml'],
     ['config', 'pipeline.toml'],
+    ['execution', 'executors.toml'],
+    ['execution', 'pool.toml'],
+    ['execution', 'graph.toml'],
+    ['execution', 'trace.toml'],
+    ['schedule', 'every.toml'],
+    ['schedule', 'batching.toml'],
 ])
 def test_pipelines(name, pipelinedef):
     # Exceptions ...
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2018 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Test suite for module flowbber.components.executors.
+"""
+
+from time import time
+from os import getpid
+from asyncio import sleep
+
+from flowbber.pipeline import Pipeline
+from flowbber.inputs import validate_definition
+from flowbber.loaders import source, sink
+from flowbber.components import Source, Sink
+
+
+@source.register('test_async')
+class AsyncSource(Source):
+    """
+    Source with a coroutine collect() sleeping the given time, in seconds,
+    and crashing afterwards if asked to.
+    """
+
+    def declare_config(self, config):
+        config.add_option('delay', default=0, optional=True)
+        config.add_option('crash', default=False, optional=True)
+
+    async def collect(self):
+        await sleep(self.config.delay.value)
+        if self.config.crash.value:
+            raise RuntimeError('Crashed')
+        return {'pid': getpid()}
+
+
+@sink.register('test_drop')
+class DropSink(Sink):
+    """
+    Sink that does nothing with the data.
+    """
+
+    def distribute(self, data):
+        pass
+
+
+def test_async_group(tmpdir):
+    """
+    The asynchronous sources are executed in a single process, and a source
+    that times out or crashes doesn't affect the others.
+    """
+    definition = validate_definition({
+        'sources': [
+            {
+                'type': 'test_async', 'id': 'slow',
+                'timeout': 1, 'optional': True,
+                'config': {'delay': 10},
+            },
+            {
+                'type': 'test_async', 'id': 'crash', 'optional': True,
+                'config': {'crash': True},
+            },
+            {'type': 'test_async', 'id': 'first', 'config': {'delay': 0.5}},
+            {'type': 'test_async', 'id': 'second'},
+        ],
+        'sinks': [{'type': 'test_drop', 'id': 'drop', 'executor': 'inline'}],
+    })
+
+    arguments = dict(definition['execution'])
+    arguments['journal_dir'] = str(tmpdir)
+    pipeline = Pipeline(definition, 'test', **arguments)
+
+    start = time()
+    journal = pipeline.run()
+
+    # The slow source was cancelled on its timeout, not waited for
+    assert time() - start < 5
+
+    assert {
+        entry['id']: entry['status'] for entry in journal['sources']
+    } == {
+        'slow': 'timed out',
+        'crash': 'crashed',
+        'first': 'succeeded',
+        'second': 'succeeded',
+    }
+
+    assert list(pipeline.data) == ['first', 'second']
+    assert pipeline.data['first']['pid'] == pipeline.data['second']['pid']
+    assert pipeline.data['first']['pid'] != getpid()
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2018 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Test suite for module flowbber.journal.
+"""
+
+from time import sleep
+
+from pytest import approx, mark, fixture
+
+from flowbber.journal import BACKENDS, percentile, create_store
+
+
+@mark.parametrize(['values', 'rank', 'expected'], [
+    [[], 50, None],
+    [[7], 0, 7],
+    [[7], 99, 7],
+    [[1, 2, 3, 4, 5], 0, 1],
+    [[1, 2, 3, 4, 5], 50, 3],
+    [[1, 2, 3, 4, 5], 100, 5],
+    [[1, 2, 3, 4], 50, 2.5],
+    [[0, 10], 95, 9.5],
+    [list(range(101)), 99, 99],
+    [[1.0, 2.0, 4.0, 8.0], 75, 5.0],
+])
+def test_percentile(values, rank, expected):
+    assert percentile(values, rank) == approx(expected)
+
+
+def journal(source, sink, status='succeeded'):
+    """
+    Create the journal of a run with a source and a sink.
+
+    :param float source: Duration of the source.
+    :param float sink: Duration of the sink.
+    :param str status: Status of the source.
+    """
+    return {
+        'sources': [{
+            'id': 'source', 'status': status, 'duration': source,
+            'payload': 100,
+        }],
+        'aggregators': [],
+        'sinks': [{
+            'id': 'sink', 'status': 'succeeded', 'duration': sink,
+            'payload': None,
+        }],
+    }
+
+
+@fixture(params=BACKENDS)
+def store(request, tmpdir):
+    return create_store(request.param, str(tmpdir))
+
+
+def test_statistics(store):
+    for duration in range(1, 11):
+        store.save('pipeline', journal(duration, 0.5))
+    store.save('pipeline', journal(None, 0.5, status='timed out'))
+    store.save('other', journal(100, 100))
+
+    statistics = store.statistics(pipeline='pipeline')
+
+    assert list(statistics) == [('sources', 'source'), ('sinks', 'sink')]
+
+    source = statistics[('sources', 'source')]
+    assert source['executions'] == 11
+    assert source['failure_rate'] == approx(1 / 11)
+    assert source['p50'] == approx(5.5)
+    assert source['p95'] == approx(9.55)
+    assert source['p99'] == approx(9.91)
+    assert source['payload_p50'] == 100
+    assert source['payload_max'] == 100
+
+    sink = statistics[('sinks', 'sink')]
+    assert sink['executions'] == 11
+    assert sink['failure_rate'] == 0
+    assert sink['p99'] == approx(0.5)
+    assert sink['payload_p50'] is None
+    assert sink['payload_max'] is None
+
+
+def test_recent(store):
+    for duration in range(1, 6):
+        store.save('pipeline', journal(duration, 0.5))
+        store.save('other', journal(100, 100))
+        # The files backend orders the journals by modification time
+        sleep(0.02)
+
+    recent = store.recent('pipeline', 3)
+
+    assert [
+        entry['sources'][0]['duration'] for entry in recent
+    ] == [3, 4, 5]
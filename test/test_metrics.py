@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2018 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Test suite for module flowbber.metrics.
+"""
+
+from pytest import mark
+
+from flowbber.metrics import (
+    Counter, Gauge, Histogram, PipelineMetrics, format_labels, format_value,
+)
+
+
+@mark.parametrize(['labels', 'expected'], [
+    [(), ''],
+    [(('pipeline', 'cpu'), ), '{pipeline="cpu"}'],
+    [(('a', 1), ('b', 'two')), '{a="1",b="two"}'],
+    [(('path', 'C:\\tmp'), ), '{path="C:\\\\tmp"}'],
+    [(('say', 'a "quote"'), ), '{say="a \\"quote\\""}'],
+    [(('lines', 'one\ntwo'), ), '{lines="one\\ntwo"}'],
+])
+def test_format_labels(labels, expected):
+    assert format_labels(labels) == expected
+
+
+@mark.parametrize(['value', 'expected'], [
+    [0, '0'],
+    [3, '3'],
+    [0.25, '0.25'],
+    [1e-06, '1e-06'],
+    [float('inf'), '+Inf'],
+])
+def test_format_value(value, expected):
+    assert format_value(value) == expected
+
+
+def test_counter():
+    counter = Counter('runs_total', 'Runs by result.')
+    counter.inc(result='passed')
+    counter.inc(result='failed')
+    counter.inc(2, result='passed')
+
+    assert counter.render() == [
+        '# HELP runs_total Runs by result.',
+        '# TYPE runs_total counter',
+        'runs_total{result="passed"} 3',
+        'runs_total{result="failed"} 1',
+    ]
+
+
+def test_gauge():
+    gauge = Gauge('last_seconds', 'Last run.')
+    gauge.set(10.5)
+    gauge.set(12.5)
+
+    assert gauge.render() == [
+        '# HELP last_seconds Last run.',
+        '# TYPE last_seconds gauge',
+        'last_seconds 12.5',
+    ]
+
+
+def test_histogram():
+    histogram = Histogram('duration_seconds', 'Durations.', (0.1, 1.0))
+    histogram.observe(0.05, stage='sources')
+    histogram.observe(0.5, stage='sources')
+    histogram.observe(5, stage='sources')
+
+    assert histogram.render() == [
+        '# HELP duration_seconds Durations.',
+        '# TYPE duration_seconds histogram',
+        'duration_seconds_bucket{stage="sources",le="0.1"} 1',
+        'duration_seconds_bucket{stage="sources",le="1.0"} 2',
+        'duration_seconds_bucket{stage="sources",le="+Inf"} 3',
+        'duration_seconds_sum{stage="sources"} 5.55',
+        'duration_seconds_count{stage="sources"} 3',
+    ]
+
+    buckets, total, count = histogram.get(stage='sources')
+    assert buckets == [(0.1, 1), (1.0, 2), (float('inf'), 3)]
+    assert count == 3
+
+    assert histogram.get(stage='sinks') == (
+        [(0.1, 0), (1.0, 0), (float('inf'), 0)], 0, 0
+    )
+
+
+def test_pipeline_metrics(tmpdir):
+    metrics = PipelineMetrics('cpu')
+    metrics.record_run('passed')
+    metrics.record_run('missed')
+    metrics.record_overlapped()
+    metrics.record_shed()
+    metrics.record_shed()
+    metrics.record_lateness(0.02)
+    metrics.record_journal({
+        'sources': [{
+            'id': 'cpu', 'status': 'succeeded', 'duration': 0.2,
+            'payload': 2000,
+        }],
+        'aggregators': [],
+        'sinks': [{
+            'id': 'print', 'status': 'crashed', 'duration': None,
+            'payload': None,
+        }],
+        'totals': {
+            'sources': {'elapsed': 0.3},
+            'aggregators': {'elapsed': None},
+            'sinks': {'elapsed': 0.1},
+            'run': {'elapsed': 0.5},
+        },
+    })
+
+    path = tmpdir.join('metrics', 'cpu.prom')
+    metrics.write(str(path))
+    lines = path.read_text(encoding='utf-8').splitlines()
+
+    assert lines == metrics.render().splitlines()
+    assert not [
+        entry for entry in tmpdir.join('metrics').listdir()
+        if entry.basename != 'cpu.prom'
+    ]
+
+    for line in (
+        '# TYPE flowbber_runs_total counter',
+        'flowbber_runs_total{pipeline="cpu",result="passed"} 1',
+        'flowbber_runs_total{pipeline="cpu",result="missed"} 1',
+        'flowbber_runs_overlapped_total{pipeline="cpu"} 1',
+        'flowbber_runs_shed_total{pipeline="cpu"} 2',
+        'flowbber_schedule_lateness_seconds_bucket'
+        '{pipeline="cpu",le="0.025"} 1',
+        'flowbber_run_duration_seconds_count{pipeline="cpu"} 1',
+        'flowbber_stage_duration_seconds_count'
+        '{pipeline="cpu",stage="sources"} 1',
+        'flowbber_component_executions_total'
+        '{component="print",pipeline="cpu",stage="sinks",status="crashed"} 1',
+        'flowbber_component_payload_bytes_bucket'
+        '{component="cpu",pipeline="cpu",stage="sources",le="4096"} 1',
+    ):
+        assert line in lines
+
+    # Stages without a wall time and executions without a duration are not
+    # observed
+    assert not [
+        line for line in lines
+        if 'stage="aggregators"' in line or (
+            line.startswith('flowbber_component_duration_seconds') and
+            'component="print"' in line
+        )
+    ]
@@ -0,0 +1,385 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2018 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Test suite for module flowbber.pipeline.
+"""
+
+from glob import glob
+from time import sleep
+from asyncio import sleep as async_sleep
+from os import _exit
+from os.path import join
+
+from pytest import raises
+
+from flowbber.pipeline import Pipeline
+from flowbber.inputs import validate_definition
+from flowbber.loaders import source, aggregator, sink
+from flowbber.components import (
+    Source, Aggregator, Sink, CrashError, TimeExceededError,
+)
+from flowbber.utils.shm import get_shared_directory
+
+
+@source.register('test_payload')
+class PayloadSource(Source):
+    """
+    Source returning a payload of the given size, in megabytes.
+    """
+
+    def declare_config(self, config):
+        config.add_option('size', default=3, optional=True)
+
+    def collect(self):
+        return {'payload': 'x' * (self.config.size.value * 1024 * 1024)}
+
+
+@source.register('test_crash')
+class CrashSource(Source):
+    """
+    Source crashing after the given time, in seconds.
+    """
+
+    def declare_config(self, config):
+        config.add_option('delay', default=0, optional=True)
+
+    def collect(self):
+        sleep(self.config.delay.value)
+        raise RuntimeError('Crashed')
+
+
+@source.register('test_sleep')
+class SleepSource(Source):
+    """
+    Source with a coroutine collect() sleeping the given time, in seconds.
+    """
+
+    def declare_config(self, config):
+        config.add_option('delay', default=0, optional=True)
+
+    async def collect(self):
+        await async_sleep(self.config.delay.value)
+        return {'slept': self.config.delay.value}
+
+
+@aggregator.register('test_exit')
+class ExitAggregator(Aggregator):
+    """
+    Aggregator killing the process executing it.
+    """
+
+    def accumulate(self, data):
+        _exit(1)
+
+
+@aggregator.register('test_mark')
+class MarkAggregator(Aggregator):
+    """
+    Aggregator marking the data with its id.
+    """
+
+    def accumulate(self, data):
+        data[self.id] = True
+
+
+@aggregator.register('test_spoil')
+class SpoilAggregator(Aggregator):
+    """
+    Aggregator spoiling the data, then hanging for the given time, in
+    seconds, or crashing if no time is given.
+    """
+
+    def declare_config(self, config):
+        config.add_option('delay', default=None, optional=True)
+
+    def accumulate(self, data):
+        data.clear()
+        data[self.id] = True
+
+        if self.config.delay.value is None:
+            raise RuntimeError('Crashed')
+        sleep(self.config.delay.value)
+
+
+@sink.register('test_nothing')
+class NothingSink(Sink):
+    """
+    Sink that does nothing with the data.
+    """
+
+    def distribute(self, data):
+        pass
+
+
+DISTRIBUTED = []
+"""
+Calls to the ``test_record`` sinks executed in the pipeline process.
+"""
+
+
+@sink.register('test_record')
+class RecordSink(Sink):
+    """
+    Sink recording how it was called.
+    """
+
+    def distribute(self, data):
+        DISTRIBUTED.append(('distribute', data))
+
+    def distribute_batch(self, batch):
+        DISTRIBUTED.append(('distribute_batch', batch))
+
+
+def create(tmpdir, sources, aggregators=(), execution=None, sinks=None):
+    """
+    Create a pipeline with the given sources and aggregators, and a sink.
+
+    :param tmpdir: Directory to write the journals to.
+    :param list sources: Definitions of the sources.
+    :param list aggregators: Definitions of the aggregators.
+    :param dict execution: Execution options of the pipeline.
+    :param list sinks: Definitions of the sinks. A sink that does nothing by
+     default.
+    """
+    definition = validate_definition({
+        'execution': execution or {},
+        'sources': sources,
+        'aggregators': list(aggregators),
+        'sinks': sinks or [{'type': 'test_nothing', 'id': 'nothing'}],
+    })
+
+    arguments = dict(definition['execution'])
+    arguments['journal_dir'] = str(tmpdir)
+    return Pipeline(definition, 'test', **arguments)
+
+
+def payloads():
+    """
+    Get the files of large payloads in the shared directory.
+    """
+    return set(glob(
+        join(get_shared_directory(), '**', 'flowbber-*.payload'),
+        recursive=True,
+    ))
+
+
+def test_payloads_removed_on_failure(tmpdir):
+    """
+    The payloads of the results that were never joined are removed when the
+    pipeline stops on a failure.
+    """
+    before = payloads()
+
+    # The inline source ends after the other one wrote its payload, and is
+    # joined first as it is declared first
+    pipeline = create(tmpdir, [
+        {
+            'type': 'test_crash', 'id': 'crash', 'executor': 'inline',
+            'config': {'delay': 1},
+        },
+        {'type': 'test_payload', 'id': 'payload'},
+    ])
+
+    with raises(CrashError):
+        pipeline.run()
+
+    assert payloads() == before
+
+
+def test_chain_crashed(tmpdir):
+    """
+    The journal entry of a fused chain whose process died is named after the
+    chain, and the pipeline doesn't wait for the result of the chain.
+    """
+    pipeline = create(
+        tmpdir,
+        [{'type': 'test_payload', 'id': 'payload', 'config': {'size': 0}}],
+        [{'type': 'test_exit', 'id': 'exit'}],
+        {'fuse_aggregators': True},
+    )
+
+    journal = []
+    with raises(TimeExceededError):
+        pipeline._run_chain(journal)
+
+    assert [(entry['id'], entry['status']) for entry in journal] == [
+        ('aggregators', 'killed'),
+    ]
+
+
+def test_chain_rollback(tmpdir):
+    """
+    The optional aggregators of a fused chain that fail are blamed in the
+    journal, and the chain continues with the data as it was before them.
+    """
+    pipeline = create(
+        tmpdir,
+        [{'type': 'test_payload', 'id': 'payload', 'config': {'size': 0}}],
+        [
+            {'type': 'test_mark', 'id': 'first'},
+            {'type': 'test_spoil', 'id': 'crash', 'optional': True},
+            {
+                'type': 'test_spoil', 'id': 'hang', 'optional': True,
+                'timeout': 1, 'config': {'delay': 10},
+            },
+            {'type': 'test_mark', 'id': 'last'},
+        ],
+        {'fuse_aggregators': True},
+    )
+
+    journal = pipeline.run()
+
+    assert [
+        (entry['id'], entry['status']) for entry in journal['aggregators']
+    ] == [
+        ('first', 'succeeded'),
+        ('crash', 'crashed'),
+        ('hang', 'timed out'),
+        ('last', 'succeeded'),
+    ]
+    assert list(pipeline.data) == ['payload', 'first', 'last']
+
+
+def test_chain_blame(tmpdir):
+    """
+    A non optional aggregator of a fused chain that fails is blamed in the
+    journal, and stops the chain.
+    """
+    pipeline = create(
+        tmpdir,
+        [{'type': 'test_payload', 'id': 'payload', 'config': {'size': 0}}],
+        [
+            {'type': 'test_mark', 'id': 'first'},
+            {'type': 'test_spoil', 'id': 'crash'},
+            {'type': 'test_mark', 'id': 'last'},
+        ],
+        {'fuse_aggregators': True},
+    )
+
+    journal = []
+    with raises(CrashError):
+        pipeline._run_chain(journal)
+
+    assert [(entry['id'], entry['status']) for entry in journal] == [
+        ('first', 'succeeded'),
+        ('crash', 'crashed'),
+    ]
+
+
+def test_max_rss(tmpdir):
+    """
+    Only the executions in a process of their own report their peak memory.
+    """
+    pipeline = create(
+        tmpdir,
+        [
+            {'type': 'test_payload', 'id': 'pooled', 'config': {'size': 0}},
+            {'type': 'test_sleep', 'id': 'grouped'},
+            # Limited components are never executed by the pool
+            {
+                'type': 'test_payload', 'id': 'limited', 'nice': 0,
+                'config': {'size': 0},
+            },
+        ],
+        execution={'pool': True},
+    )
+
+    journal = pipeline.run()
+
+    assert {
+        entry['id']: entry['max_rss'] is not None
+        for entry in journal['sources']
+    } == {
+        'pooled': False,
+        'grouped': False,
+        'limited': True,
+    }
+
+
+def test_profile_in_process(tmpdir):
+    """
+    The components executed in the pipeline process are profiled with the
+    sampling profiler when profiling deterministically.
+    """
+    profiles = tmpdir.join('profiles')
+    pipeline = create(
+        tmpdir,
+        [
+            {'type': 'test_payload', 'id': 'process', 'config': {'size': 0}},
+            {
+                'type': 'test_payload', 'id': 'thread', 'executor': 'thread',
+                'config': {'size': 0},
+            },
+            {
+                'type': 'test_payload', 'id': 'inline', 'executor': 'inline',
+                'config': {'size': 0},
+            },
+        ],
+        execution={
+            'profile': 'deterministic', 'profile_dir': str(profiles),
+        },
+    )
+
+    pipeline.run()
+
+    rundir, = [
+        directory for directory in profiles.listdir()
+        if directory.basename != 'spool'
+    ]
+    files = sorted(
+        (path.basename.split('.')[0], path.ext)
+        for path in rundir.listdir()
+    )
+
+    assert files == [
+        ('inline', '.collapsed'),
+        ('nothing', '.pstats'),
+        ('process', '.pstats'),
+        ('report', '.collapsed'),
+        ('report', '.pstats'),
+        ('report', '.txt'),
+        ('thread', '.collapsed'),
+    ]
+
+
+def test_distribute_batch(tmpdir):
+    """
+    The sinks distribute the data of a run, or a batch of data of several
+    runs when the pipeline distributes one.
+    """
+    del DISTRIBUTED[:]
+
+    pipeline = create(
+        tmpdir,
+        [{'type': 'test_payload', 'id': 'payload', 'config': {'size': 0}}],
+        sinks=[{'type': 'test_record', 'id': 'record', 'executor': 'inline'}],
+    )
+
+    pipeline.run()
+    assert [call for call, data in DISTRIBUTED] == ['distribute']
+    assert DISTRIBUTED[0][1] == {'payload': {'payload': ''}}
+
+    # A batch of a single run is still distributed as a batch
+    del DISTRIBUTED[:]
+    journal = pipeline.run(distribute=False)
+    assert not DISTRIBUTED
+
+    pipeline.distribute([pipeline.data], journals=[journal])
+    assert DISTRIBUTED == [
+        ('distribute_batch', [{'payload': {'payload': ''}}]),
+    ]
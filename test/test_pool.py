@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2018 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Test suite for module flowbber.components.pool.
+"""
+
+from time import sleep
+from os import getpid, _exit
+from pathlib import Path
+
+from flowbber.pipeline import Pipeline
+from flowbber.inputs import validate_definition
+from flowbber.loaders import source, sink
+from flowbber.components import Source, Sink
+
+
+@source.register('test_pid')
+class PidSource(Source):
+    """
+    Source returning the PID of the process executing it.
+    """
+
+    def collect(self):
+        return {'pid': getpid()}
+
+
+@source.register('test_hang')
+class HangSource(Source):
+    """
+    Source hanging for the given time, in seconds, unless the given file
+    exists. The file is created before hanging.
+    """
+
+    def declare_config(self, config):
+        config.add_option('flag', optional=False)
+        config.add_option('delay', default=10, optional=True)
+
+    def collect(self):
+        flag = Path(self.config.flag.value)
+        if not flag.exists():
+            flag.touch()
+            sleep(self.config.delay.value)
+        return {'pid': getpid()}
+
+
+@source.register('test_die')
+class DieSource(Source):
+    """
+    Source killing the process executing it.
+    """
+
+    def collect(self):
+        _exit(1)
+
+
+@sink.register('test_discard')
+class DiscardSink(Sink):
+    """
+    Sink that does nothing with the data.
+    """
+
+    def distribute(self, data):
+        pass
+
+
+def create(tmpdir, sources, **execution):
+    """
+    Create a pipeline with a pool of workers.
+
+    :param tmpdir: Directory to write the journals to.
+    :param list sources: Definitions of the sources.
+    :param execution: Execution options of the pipeline.
+    """
+    execution['pool'] = True
+    definition = validate_definition({
+        'execution': execution,
+        'sources': sources,
+        'sinks': [
+            {'type': 'test_discard', 'id': 'discard', 'executor': 'inline'},
+        ],
+    })
+
+    arguments = dict(definition['execution'])
+    arguments['journal_dir'] = str(tmpdir)
+    return Pipeline(definition, 'test', **arguments)
+
+
+def statuses(journal):
+    """
+    Get the status of each source in a journal.
+    """
+    return {entry['id']: entry['status'] for entry in journal['sources']}
+
+
+def test_reuse_and_max_runs(tmpdir):
+    """
+    A worker executes the components of several runs, until it reaches its
+    maximum number of runs.
+    """
+    pipeline = create(
+        tmpdir, [{'type': 'test_pid', 'id': 'pid'}], pool_max_runs=2,
+    )
+
+    pids = []
+    for _ in range(3):
+        pipeline.run()
+        pids.append(pipeline.data['pid']['pid'])
+
+    assert pids[0] == pids[1]
+    assert pids[2] != pids[1]
+    assert getpid() not in pids
+
+
+def test_max_rss(tmpdir):
+    """
+    A worker whose resident memory is above the ceiling is recycled.
+    """
+    pipeline = create(
+        tmpdir, [{'type': 'test_pid', 'id': 'pid'}], pool_max_rss=1,
+    )
+
+    pids = []
+    for _ in range(2):
+        pipeline.run()
+        pids.append(pipeline.data['pid']['pid'])
+
+    assert pids[0] != pids[1]
+
+
+def test_timeout(tmpdir):
+    """
+    A worker that exceeds the timeout of its component is terminated, and
+    replaced on the next run.
+    """
+    pipeline = create(tmpdir, [{
+        'type': 'test_hang', 'id': 'hang', 'timeout': 1, 'optional': True,
+        'config': {'flag': str(tmpdir.join('hanged'))},
+    }])
+
+    journal = pipeline.run()
+    assert statuses(journal) == {'hang': 'timed out'}
+    assert 'hang' not in pipeline.data
+
+    journal = pipeline.run()
+    assert statuses(journal) == {'hang': 'succeeded'}
+    assert pipeline.data['hang']['pid'] != getpid()
+    assert len(pipeline._pool) == 1
+
+
+def test_crash(tmpdir):
+    """
+    A worker killed by its component is replaced, and the other components
+    keep being executed by the pool.
+    """
+    pipeline = create(tmpdir, [
+        {'type': 'test_die', 'id': 'die', 'optional': True},
+        {'type': 'test_pid', 'id': 'pid'},
+    ])
+
+    for _ in range(2):
+        journal = pipeline.run()
+        assert statuses(journal) == {'die': 'killed', 'pid': 'succeeded'}
+        assert pipeline.data['pid']['pid'] != getpid()
+
+    # The killed workers are never returned to the idle workers
+    assert all(worker.is_alive() for worker in pipeline._pool._idle)
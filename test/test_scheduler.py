@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2018 KuraLabs S.R.L
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Test suite for module flowbber.scheduler.
+"""
+
+from time import sleep, time
+from types import SimpleNamespace
+from asyncio import new_event_loop, gather, sleep as async_sleep
+
+from pytest import approx, raises
+
+from flowbber.scheduler import Scheduler
+
+
+FREQUENCY = 0.5
+
+
+class FakePipeline:
+    """
+    Pipeline that takes a given time to run and records when its runs were
+    scheduled at and started.
+
+    :param list durations: Time in seconds each run takes. The runs after
+     the last one take no time.
+    """
+
+    name = 'fake'
+    shedding = False
+    sheddable = []
+
+    def __init__(self, durations=(), fail=False):
+        self.data = {}
+        self.scheduled = []
+        self.started = []
+        self.batches = []
+        self._durations = list(durations)
+        self._fail = fail
+
+    def run(self, scheduled=None, distribute=True):
+        self.scheduled.append(scheduled)
+        self.started.append(time())
+
+        if self._durations:
+            sleep(self._durations.pop(0))
+
+        return {}
+
+    def distribute(self, batch, journals=None):
+        if self._fail:
+            raise RuntimeError('Unable to distribute')
+
+        self.batches.append(len(batch))
+        return []
+
+    def replicate(self):
+        return self
+
+
+def schedule(catch_up, samples=2):
+    """
+    Run a schedule whose first run takes long enough to miss the two
+    following ticks.
+
+    :return: The scheduler and the pipeline after the schedule ended.
+    """
+    pipeline = FakePipeline([FREQUENCY * 2.5])
+    scheduler = Scheduler(
+        pipeline, FREQUENCY, samples=samples, catch_up=catch_up,
+    )
+    scheduler.run()
+
+    return scheduler, pipeline
+
+
+def offsets(pipeline):
+    """
+    Ticks of the runs of a pipeline relative to the first tick, in number of
+    periods of the schedule.
+    """
+    first = pipeline.scheduled[0]
+    return [
+        (scheduled - first) / FREQUENCY for scheduled in pipeline.scheduled
+    ]
+
+
+def test_catch_up_burst():
+    """
+    Each tick missed is run right away, one after the other.
+    """
+    scheduler, pipeline = schedule('burst', samples=3)
+
+    assert offsets(pipeline) == approx([0, 1, 2], abs=0.1)
+    assert pipeline.started[2] - pipeline.started[0] < FREQUENCY * 2.75
+
+    assert scheduler.runs['passed'] == 3
+    assert scheduler.runs['missed'] == 2
+
+
+def test_catch_up_coalesce():
+    """
+    The ticks missed are merged into a single run started right away.
+    """
+    scheduler, pipeline = schedule('coalesce')
+
+    assert offsets(pipeline) == approx([0, 2], abs=0.1)
+    assert pipeline.started[1] - pipeline.started[0] < FREQUENCY * 2.75
+
+    assert scheduler.runs['passed'] == 2
+    assert scheduler.runs['missed'] == 2
+
+
+def test_catch_up_skip():
+    """
+    The ticks missed are skipped, and the next run waits for the next tick.
+    """
+    scheduler, pipeline = schedule('skip')
+
+    assert offsets(pipeline) == approx([0, 3], abs=0.1)
+    assert pipeline.started[1] - pipeline.started[0] >= FREQUENCY * 2.9
+
+    assert scheduler.runs['passed'] == 2
+    assert scheduler.runs['missed'] == 2
+
+
+def test_catch_up_unknown():
+    with raises(ValueError):
+        Scheduler(FakePipeline(), FREQUENCY, catch_up='later')
+
+
+def test_serve():
+    """
+    The runs are executed in threads, so other tasks of the loop progress
+    while the pipeline runs.
+    """
+    pipeline = FakePipeline([0.3, 0.3])
+    scheduler = Scheduler(pipeline, FREQUENCY, samples=2)
+    ticks = []
+
+    async def other():
+        while len(ticks) < 10:
+            ticks.append(time())
+            await async_sleep(0.05)
+
+    async def both():
+        await gather(scheduler.serve(), other())
+
+    loop = new_event_loop()
+    try:
+        loop.run_until_complete(both())
+    finally:
+        loop.close()
+
+    assert scheduler.runs['passed'] == 2
+    assert len([
+        tick for tick in ticks
+        if pipeline.started[0] < tick < pipeline.started[0] + 0.3
+    ]) >= 3
+
+    # The second run waits for its tick
+    assert offsets(pipeline) == approx([0, 1], abs=0.1)
+    assert pipeline.started[1] - pipeline.started[0] >= FREQUENCY * 0.9
+
+
+def test_max_in_flight(tmpdir):
+    """
+    A run longer than the period doesn't delay the next tick when several
+    runs are allowed in flight.
+    """
+    metrics = tmpdir.join('fake.prom')
+    pipeline = FakePipeline([FREQUENCY * 1.5] * 3)
+    scheduler = Scheduler(
+        pipeline, FREQUENCY, samples=3, max_in_flight=2,
+        metrics_file=str(metrics),
+    )
+    scheduler.run()
+
+    assert offsets(pipeline)[:3] == approx([0, 1, 2], abs=0.1)
+    assert scheduler.runs['passed'] >= 3
+    assert scheduler.runs['overlapped'] >= 2
+    assert scheduler.runs['missed'] == 0
+
+    # Each run started is observed in the lateness histogram
+    assert scheduler.lateness['count'] == scheduler.runs['passed']
+
+    lines = metrics.read_text(encoding='utf-8').splitlines()
+    assert 'flowbber_runs_overlapped_total{{pipeline="fake"}} {}'.format(
+        scheduler.runs['overlapped']
+    ) in lines
+
+
+def test_batch():
+    """
+    The samples are distributed in batches, and the last batch when the
+    schedule ends.
+    """
+    pipeline = FakePipeline()
+    scheduler = Scheduler(pipeline, 0.1, samples=5, batch=2)
+    scheduler.run()
+
+    assert pipeline.batches == [2, 2, 1]
+    assert scheduler.runs['passed'] == 5
+
+
+def test_batch_failure():
+    """
+    The runs of a batch that fails to be distributed are counted as failed.
+    """
+    pipeline = FakePipeline(fail=True)
+    scheduler = Scheduler(
+        pipeline, 0.1, samples=5, batch=2, stop_on_failure=True,
+    )
+
+    with raises(RuntimeError):
+        scheduler.run()
+
+    assert scheduler.runs['passed'] == 0
+    assert scheduler.runs['failed'] == 2
+
+
+class SheddingPipeline(FakePipeline):
+    """
+    Fake pipeline that records if it was shedding on each run.
+    """
+
+    sheddable = [SimpleNamespace(id='optional')]
+
+    def __init__(self, durations=()):
+        super().__init__(durations)
+        self.shedding = False
+        self.shed_runs = []
+
+    def run(self, scheduled=None, distribute=True):
+        self.shed_runs.append(self.shedding)
+        return super().run(scheduled=scheduled, distribute=distribute)
+
+    def shed(self, shedding=True):
+        self.shedding = shedding
+
+
+def test_shed():
+    """
+    The components are shed after the given number of consecutive late
+    runs, and brought back after as many runs on time.
+    """
+    pipeline = SheddingPipeline([FREQUENCY * 1.5, FREQUENCY * 1.5])
+    scheduler = Scheduler(pipeline, FREQUENCY, samples=6, shed_after=2)
+    scheduler.run()
+
+    assert pipeline.shed_runs == [False, False, True, True, False, False]
+    assert scheduler.runs['shed'] == 2